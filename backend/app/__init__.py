@@ -1,9 +1,9 @@
 # backend/app/__init__.py (ATUALIZADO para CORS de Produção)
 import os
 import logging # Importa logging para melhor controle
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_cors import CORS
 from config import Config # Importa sua classe de configuração
 
@@ -11,12 +11,18 @@ from config import Config # Importa sua classe de configuração
 logging.basicConfig(level=logging.INFO) # Define o nível mínimo para INFO
 
 db = SQLAlchemy()
-migrate = Migrate()
 
 def create_app(config_class=Config):
     """Fábrica de aplicação Flask."""
     app = Flask(__name__)
     app.config.from_object(config_class)
+    # Respostas JSON com orjson (app/serialization.py)
+    from app.serialization import FastJSONProvider
+    app.json = FastJSONProvider(app)
+
+    # Uploads gravados direto no storage configurado, sem arquivo temporário intermediário
+    from app.storage import StreamingUploadRequest
+    app.request_class = StreamingUploadRequest
 
     # Garante que a pasta de uploads exista (CUIDADO: Não funcionará bem no Render sem disco persistente/S3)
     # É melhor confiar que o disco persistente ou o bucket S3 já existem.
@@ -31,9 +37,14 @@ def create_app(config_class=Config):
          app.logger.error(f"Could not create upload folder '{upload_folder}': {e}")
          # Considerar se deve parar a aplicação aqui ou continuar sem uploads funcionais
 
-    # Inicializa extensões do Flask
-    db.init_app(app)
-    migrate.init_app(app, db)
+    # Inicializa extensões do Flask (engine com o perfil DB_ENGINE_PROFILE, ver app/database.py)
+    from app.database import init_database
+    init_database(app, db)
+    # Flask-Migrate (e o alembic, o import mais caro do boot) só nos comandos de linha (flask db ...);
+    # workers do gunicorn não rodam dentro de um comando click
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
 
     # --- Configuração CORS (Específica para Produção/Desenvolvimento) ---
     # Lê a URL do frontend da variável de ambiente 'FRONTEND_URL'
@@ -44,6 +55,7 @@ def create_app(config_class=Config):
         app.logger.info(f"Configuring CORS for specific origin: {frontend_url}")
         # Permite requisições APENAS da URL especificada
         CORS(app, origins=[frontend_url], supports_credentials=True)
+        app.config['CORS_ORIGINS'] = [frontend_url] # Também usado pelas rotas nativas do modo ASGI
     else:
         # Se FRONTEND_URL não estiver definida (ambiente local de desenvolvimento)
         # Use a porta que o seu frontend Vite roda localmente (geralmente 5173)
@@ -51,6 +63,7 @@ def create_app(config_class=Config):
         app.logger.warning(f"FRONTEND_URL environment variable not set. Defaulting CORS to allow {dev_frontend_url} for local development.")
         # Permite requisições do localhost para desenvolvimento
         CORS(app, origins=[dev_frontend_url], supports_credentials=True)
+        app.config['CORS_ORIGINS'] = [dev_frontend_url]
         # ATENÇÃO: Se precisar permitir qualquer origem localmente (menos seguro):
         # CORS(app)
     # --- Fim Configuração CORS ---
@@ -64,11 +77,59 @@ def create_app(config_class=Config):
         app.logger.error("Could not import or register main blueprint from app.routes.")
         # Considerar levantar um erro aqui se o blueprint for essencial
 
+    # Métricas em /metrics (formato Prometheus) e spans opcionais para um coletor OTLP
+    from app.metrics import init_metrics
+    init_metrics(app)
+
+    # Invalidação do cache de leitura de perfis após o commit das escritas
+    from app.profile_cache import init_profile_cache
+    init_profile_cache()
+
+    # Comandos CLI: fila de validações (flask jobs work)
+    from app.jobs import jobs_cli
+    app.cli.add_command(jobs_cli)
+    # Recalcular tags normalizadas (flask tags rebuild)
+    from app.tags import tags_cli
+    app.cli.add_command(tags_cli)
+    # Score de engajamento dos fãs (flask scores refresh|status)
+    from app.scoring import scores_cli
+    app.cli.add_command(scores_cli)
+    # Rollups dos dashboards (flask analytics compact|rebuild)
+    from app.analytics import analytics_cli
+    app.cli.add_command(analytics_cli)
+    # Detecção de cadastros duplicados (flask dedup sweep|status)
+    from app.dedup import dedup_cli
+    app.cli.add_command(dedup_cli)
+    # Tempo de boot e imports mais caros (flask boot report)
+    from app.boot import boot_cli
+    app.cli.add_command(boot_cli)
+    # Estado do agendador de requisições externas (flask outbound status|reset)
+    from app.outbound import outbound_cli
+    app.cli.add_command(outbound_cli)
+
     # Mensagem indicando que a app foi criada
     app.logger.info("Flask app created successfully.")
 
     return app
 
+def reset_after_fork(app):
+    """
+    Chamado em cada worker logo após o fork quando o app é pré-carregado no master
+    (GUNICORN_PRELOAD, ver gunicorn.conf.py): nada que tenha socket ou thread é herdado.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            # create_app não conecta; conexões aqui indicam query no boot (compartilhadas entre processos)
+            pooled = getattr(engine.pool, 'checkedin', lambda: 0)() + getattr(engine.pool, 'checkedout', lambda: 0)()
+            if pooled:
+                app.logger.warning(f"{pooled} database connection(s) opened before fork; discarding them in the worker.")
+            engine.dispose(close=False) # Não fecha os sockets do master, só deixa de usá-los
+    from app.http_client import reset_http_session
+    from app.services import reset_link_validation_executor
+    reset_http_session()
+    reset_link_validation_executor()
+    # Métricas: o prometheus_client troca de arquivos ao ver o novo pid (modo multiprocesso)
+
 # Importa modelos DEPOIS da inicialização do db, para que eles possam usar 'db'
 # Isso também ajuda o Flask-Migrate a encontrar os modelos.
 from app import models
\ No newline at end of file
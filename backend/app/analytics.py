@@ -0,0 +1,165 @@
+# backend/app/analytics.py
+import time
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func
+from app import db
+from app.models import AnalyticsDaily, AnalyticsTagDaily, FanProfile, Tag, fan_profile_tag
+from app.utils import dialect_insert
+
+# Rollups para os dashboards (/api/analytics/*), agregados pelo dia de cadastro (UTC) dos perfis:
+# analytics_daily (cadastros e validações por dia) e analytics_tag_daily (perfis por tag e dia).
+# `flask analytics compact` recalcula só os dias com perfis alterados desde a última compactação
+# (pelo updated_at); as rotas leem no máximo uma linha por dia, seja qual for o total de perfis.
+# ATENÇÃO: `flask tags rebuild` não altera o updated_at dos perfis; rode `flask analytics rebuild` depois.
+
+def _day_range(day):
+    start = datetime(day.year, day.month, day.day)
+    return start, start + timedelta(days=1)
+
+def _compute_day(day, computed_at):
+    """Recalcula as linhas de um dia a partir dos perfis cadastrados nele (índice em created_at)."""
+    start, end = _day_range(day)
+    in_day = db.and_(FanProfile.created_at >= start, FanProfile.created_at < end)
+    signups, documents_validated, esports_links_validated = db.session.execute(
+        db.select(
+            func.count(),
+            func.coalesce(func.sum(db.case((FanProfile.document_validated == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(db.case((FanProfile.esports_links_validated == True, 1), else_=0)), 0),
+        ).where(in_day)
+    ).one()
+    tag_counts = db.session.execute(
+        db.select(fan_profile_tag.c.tag_id, func.count())
+        .join(FanProfile, FanProfile.id == fan_profile_tag.c.profile_id)
+        .where(in_day)
+        .group_by(fan_profile_tag.c.tag_id)
+    ).all()
+
+    db.session.execute(db.delete(AnalyticsTagDaily).where(AnalyticsTagDaily.day == day))
+    if not signups:
+        db.session.execute(db.delete(AnalyticsDaily).where(AnalyticsDaily.day == day))
+        return
+    table = AnalyticsDaily.__table__
+    values = {
+        'signups': signups,
+        'documents_validated': documents_validated,
+        'esports_links_validated': esports_links_validated,
+        'computed_at': computed_at,
+    }
+    stmt = dialect_insert(table).values(day=day, **values)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=[table.c.day], set_=values))
+    if tag_counts:
+        db.session.execute(
+            AnalyticsTagDaily.__table__.insert(),
+            [{'day': day, 'tag_id': tag_id, 'profiles': count} for tag_id, count in tag_counts],
+        )
+
+def _compaction_since():
+    """
+    Perfis alterados a partir daqui entram na próxima compactação: início da última, menos uma folga
+    (ANALYTICS_WATERMARK_SLACK) para escritas confirmadas depois dela. None = todos os perfis.
+    """
+    latest = db.session.scalar(db.select(func.max(AnalyticsDaily.computed_at)))
+    if latest is None:
+        return None
+    return latest - timedelta(seconds=current_app.config.get('ANALYTICS_WATERMARK_SLACK', 300))
+
+def _changed_days(since):
+    query = db.select(FanProfile.created_at).where(FanProfile.created_at.is_not(None))
+    if since is not None:
+        query = query.where(FanProfile.updated_at >= since) # Índice em updated_at
+    return {created_at.date() for created_at in db.session.scalars(query.execution_options(yield_per=5000))}
+
+def compact_rollups(full=False, echo=None):
+    """
+    Recalcula os rollups dos dias com perfis alterados desde a última compactação (todos, com full),
+    com um commit por dia. Retorna {'days', 'seconds'}.
+    """
+    started = time.perf_counter()
+    computed_at = datetime.utcnow()
+    days = sorted(_changed_days(None if full else _compaction_since()))
+    db.session.rollback() # Encerra a leitura antes das transações curtas por dia
+    for position, day in enumerate(days, 1):
+        _compute_day(day, computed_at)
+        db.session.commit()
+        if echo and (position % 100 == 0 or position == len(days)):
+            echo(f"Compacted {position}/{len(days)} day(s) (last {day.isoformat()}).")
+    seconds = time.perf_counter() - started
+    current_app.logger.info(f"Analytics compaction finished: {len(days)} day(s) in {seconds:.2f}s.")
+    return {'days': len(days), 'seconds': round(seconds, 3)}
+
+# --- Consultas (só leem os rollups) ---
+
+def first_day(days):
+    """Primeiro dia (UTC) da janela dos últimos `days` dias, incluindo hoje."""
+    return datetime.utcnow().date() - timedelta(days=days - 1)
+
+def last_compacted_at():
+    computed_at = db.session.scalar(db.select(func.max(AnalyticsDaily.computed_at)))
+    return computed_at.isoformat() + 'Z' if computed_at else None
+
+def signups_per_day(days):
+    """[{'day', 'signups'}] dos últimos `days` dias, com zero nos dias sem cadastro."""
+    first = first_day(days)
+    counts = dict(db.session.execute(
+        db.select(AnalyticsDaily.day, AnalyticsDaily.signups).where(AnalyticsDaily.day >= first)
+    ).all())
+    series = []
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        series.append({'day': day.isoformat(), 'signups': counts.get(day, 0)})
+    return series
+
+def validation_summary(days=None):
+    """Total de perfis e parcela com documento / links eSports validados (nos últimos `days` dias ou desde sempre)."""
+    query = db.select(
+        func.coalesce(func.sum(AnalyticsDaily.signups), 0),
+        func.coalesce(func.sum(AnalyticsDaily.documents_validated), 0),
+        func.coalesce(func.sum(AnalyticsDaily.esports_links_validated), 0),
+    )
+    if days:
+        query = query.where(AnalyticsDaily.day >= first_day(days))
+    profiles, documents_validated, esports_links_validated = db.session.execute(query).one()
+    return {
+        'profiles': profiles,
+        'documents_validated': documents_validated,
+        'document_validated_ratio': round(documents_validated / profiles, 4) if profiles else 0.0,
+        'esports_links_validated': esports_links_validated,
+        'esports_links_validated_ratio': round(esports_links_validated / profiles, 4) if profiles else 0.0,
+    }
+
+def top_tags(kind, days, limit):
+    """Tags do tipo `kind` mais frequentes entre os perfis cadastrados nos últimos `days` dias."""
+    total = func.sum(AnalyticsTagDaily.profiles).label('profiles')
+    rows = db.session.execute(
+        db.select(Tag.name, total)
+        .join(Tag, Tag.id == AnalyticsTagDaily.tag_id)
+        .where(Tag.kind == kind, AnalyticsTagDaily.day >= first_day(days))
+        .group_by(Tag.id, Tag.name)
+        .order_by(total.desc(), Tag.name)
+        .limit(limit)
+    ).all()
+    return [{'name': name, 'profiles': profiles} for name, profiles in rows]
+
+# --- Comandos CLI (flask analytics ...) ---
+
+analytics_cli = AppGroup('analytics', help='Rollups dos dashboards de analytics.')
+
+@analytics_cli.command('compact')
+@click.option('--every', type=float, default=None, help='Repete a compactação a cada N segundos.')
+def compact_command(every):
+    """Atualiza os rollups dos dias com perfis alterados desde a última compactação."""
+    while True:
+        summary = compact_rollups(echo=click.echo)
+        click.echo(f"Compacted {summary['days']} day(s) in {summary['seconds']:.2f}s.")
+        if every is None:
+            break
+        time.sleep(every)
+
+@analytics_cli.command('rebuild')
+def rebuild_command():
+    """Recalcula os rollups de todos os dias (backfill)."""
+    summary = compact_rollups(full=True, echo=click.echo)
+    click.echo(f"Rebuilt {summary['days']} day(s) in {summary['seconds']:.2f}s.")
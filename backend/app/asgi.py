@@ -0,0 +1,424 @@
+# backend/app/asgi.py
+import asyncio
+import json
+import os
+import re
+import socket
+import time
+from datetime import datetime
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+from config import Config
+from app import create_app, dedup, metrics, tracing
+from app.async_services import AsyncLinkChecker, build_async_http_client
+from app.database import configure_engine, engine_options
+from app.jobs import (
+    JOB_DOCUMENT_VALIDATION, JOB_ESPORTS_LINK_VALIDATION, apply_link_verdicts, build_job,
+    dispatch_job, mark_job_failed, mark_job_succeeded, scoped_idempotency_key,
+)
+from app.models import FanProfile, ValidationJob
+from app.services import allowed_file
+from app.storage import get_storage
+from app.utils import cpf_lookup_keys
+
+# Modo ASGI (opcional): a mesma API servida por uvicorn (ver gunicorn.conf.py e asgi.py na raiz).
+# As duas rotas presas a I/O rodam no event loop, com banco assíncrono (aiosqlite/asyncpg)
+# sobre os mesmos modelos de app/models.py:
+# - POST /api/profile/<cpf>/upload_document: o multipart é lido do ASGI em streaming para o storage
+# - POST /api/profile/<cpf>/link_esports: o job de validação roda no próprio event loop (httpx),
+#   sem ocupar uma thread por link nem depender do worker da fila
+# As demais rotas continuam no app Flask, via a2wsgi (em threads).
+
+_WRITE_BATCH_SIZE = 1024 * 1024
+
+_ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+def async_database_url(config):
+    """URL do banco com o driver assíncrono equivalente (ASGI_DATABASE_URL tem precedência)."""
+    url = make_url(config.get('ASGI_DATABASE_URL') or config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise RuntimeError(f"Modo ASGI não suportado para o banco '{backend}'.")
+    if url.drivername == _ASYNC_DRIVERS[backend]:
+        return url
+    return url.set(drivername=_ASYNC_DRIVERS[backend])
+
+class HttpError(Exception):
+    """Resposta de erro das rotas nativas: vira {"error": message} com o status informado."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class _Request:
+    def __init__(self, scope, receive):
+        self.scope = scope
+        self._receive = receive
+        self.method = scope['method']
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+    @property
+    def content_length(self):
+        value = self.headers.get('content-length', '')
+        return int(value) if value.isdigit() else None
+
+    async def iter_body(self):
+        """Chunks do corpo conforme chegam do servidor (sem juntar tudo em memória)."""
+        while True:
+            message = await self._receive()
+            if message['type'] == 'http.disconnect':
+                raise HttpError(400, "Conexão encerrada pelo cliente.")
+            body = message.get('body', b'')
+            if body:
+                yield body
+            if not message.get('more_body'):
+                return
+
+    async def json(self, max_bytes=1024 * 1024):
+        chunks, size = [], 0
+        async for chunk in self.iter_body():
+            size += len(chunk)
+            if size > max_bytes:
+                raise HttpError(413, "Corpo da requisição muito grande.")
+            chunks.append(chunk)
+        try:
+            return json.loads(b''.join(chunks) or b'null')
+        except ValueError:
+            return None
+
+class AsgiApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        # Rotas síncronas num pool de threads próprio (ASGI_WSGI_THREADS)
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config.get('ASGI_WSGI_THREADS', 8))
+        self.worker_id = f"asgi:{socket.gethostname()}:{os.getpid()}"
+        self.engine = None
+        self.sessionmaker = None
+        self.http = None
+        self.link_checker = None
+        self._tasks = set()
+        self._started = None
+        # (método, regex do path, handler, regra usada nas métricas)
+        self.routes = [
+            ('POST', re.compile(r'^/api/profile/(?P<cpf>[^/]+)/upload_document$'), self.upload_document, '/api/profile/<cpf>/upload_document'),
+            ('POST', re.compile(r'^/api/profile/(?P<cpf>[^/]+)/link_esports$'), self.link_esports, '/api/profile/<cpf>/link_esports'),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] == 'http':
+            for method, pattern, handler, rule in self.routes:
+                match = pattern.match(scope['path'])
+                if match and scope['method'] == method:
+                    return await self._handle(handler, rule, match.groupdict(), scope, receive, send)
+        return await self.wsgi(scope, receive, send)
+
+    # --- Ciclo de vida ---
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def startup(self):
+        """Cria a engine assíncrona e o cliente HTTP no event loop do processo (depois do fork)."""
+        if self._started is None:
+            self._started = asyncio.ensure_future(self._start())
+        await self._started
+
+    async def _start(self):
+        config = self.flask_app.config
+        url = async_database_url(config)
+        options = engine_options(config)
+        if url.get_backend_name() == 'sqlite':
+            # Uma conexão por processo: o SQLite só aceita um escritor, e transações concorrentes no
+            # mesmo event loop falham ao promover a leitura para escrita ("database is locked")
+            options.update(pool_size=1, max_overflow=0)
+        self.engine = create_async_engine(url, **options)
+        configure_engine(self.engine.sync_engine, config) # PRAGMAs do SQLite (app/database.py)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.http = build_async_http_client(config)
+        self.link_checker = AsyncLinkChecker.from_config(self.http, config)
+        self.flask_app.logger.info(f"ASGI app started ({self.engine.dialect.name}+{self.engine.dialect.driver}).")
+
+    async def shutdown(self):
+        if self._tasks:
+            # Validações em andamento têm até o prazo delas para terminar; as demais voltam à fila (requeue_stale_jobs)
+            timeout = self.flask_app.config.get('ESPORTS_VALIDATION_DEADLINE', 15) + 5
+            await asyncio.wait(list(self._tasks), timeout=timeout)
+        if self.http is not None:
+            await self.http.aclose()
+        if self.engine is not None:
+            await self.engine.dispose()
+
+    def _spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    # --- Requisições ---
+
+    def _cors_headers(self, request):
+        origin = request.headers.get('origin')
+        if origin and origin in self.flask_app.config.get('CORS_ORIGINS', []):
+            return [(b'access-control-allow-origin', origin.encode('latin-1')),
+                    (b'access-control-allow-credentials', b'true'), (b'vary', b'Origin')]
+        return []
+
+    async def _handle(self, handler, rule, params, scope, receive, send):
+        await self.startup() # Servidores sem lifespan
+        request = _Request(scope, receive)
+        started = time.perf_counter()
+        with self.flask_app.app_context():
+            span = tracing.start_span(
+                f"{request.method} {rule}", tracing.SPAN_KIND_SERVER,
+                {'http.method': request.method, 'http.route': rule},
+                root=True, traceparent=request.headers.get('traceparent'),
+            )
+            try:
+                status, payload = await handler(request, **params)
+            except HttpError as e:
+                status, payload = e.status, {"error": e.message}
+            except Exception as e:
+                self.flask_app.logger.error(f"Unhandled error on ASGI route {rule}: {e}")
+                status, payload = 500, {"error": "Erro interno."}
+            body = self.flask_app.json.dumps(payload).encode('utf-8')
+            await send({
+                'type': 'http.response.start',
+                'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+                           + self._cors_headers(request),
+            })
+            await send({'type': 'http.response.body', 'body': body})
+            metrics.http_requests.labels(method=request.method, route=rule, status=status).inc()
+            metrics.http_request_duration.labels(method=request.method, route=rule).observe(time.perf_counter() - started)
+            if span is not None:
+                span.set_attribute('http.status_code', status)
+            tracing.end_span(span, error=f"status {status}" if status >= 500 else None)
+
+    async def _get_profile(self, session, cpf):
+        # CPF com ou sem pontuação, como nas rotas do Flask (inclusive cadastros antigos com CPF inválido)
+        return (await session.scalars(select(FanProfile).where(FanProfile.cpf.in_(cpf_lookup_keys(cpf))))).first()
+
+    async def _save_profile_changes(self, cpf, apply):
+        """
+        Como profiles.save_profile_changes: `await apply(session, profile)` grava o perfil e faz o
+        commit; se outra requisição mudou a versão no meio, relê o perfil numa sessão nova e
+        aplica de novo. Após PROFILE_WRITE_ATTEMPTS tentativas, 409.
+        """
+        attempts = max(self.flask_app.config.get('PROFILE_WRITE_ATTEMPTS', 3), 1)
+        for attempt in range(attempts):
+            async with self.sessionmaker() as session:
+                profile = await self._get_profile(session, cpf)
+                if profile is None:
+                    raise HttpError(404, "Perfil não encontrado.")
+                try:
+                    return await apply(session, profile)
+                except StaleDataError:
+                    await session.rollback()
+            self.flask_app.logger.info(f"Profile {cpf} changed concurrently; retrying write ({attempt + 1}/{attempts}).")
+        raise HttpError(409, "O perfil foi alterado por outra requisição. Tente novamente.")
+
+    async def _existing_job(self, session, kind, profile, request):
+        """Job já criado com a mesma Idempotency-Key (reenvio). Retorna (job existente, chave)."""
+        idempotency_key = request.headers.get('idempotency-key')
+        if not idempotency_key:
+            return None, None
+        idempotency_key = scoped_idempotency_key(kind, profile.id, idempotency_key)
+        existing = (await session.scalars(
+            select(ValidationJob).where(ValidationJob.idempotency_key == idempotency_key)
+        )).first()
+        return existing, idempotency_key
+
+    async def upload_document(self, request, cpf):
+        """Mesmo contrato de routes.upload_document; o arquivo vai do socket para o storage em streaming."""
+        config = self.flask_app.config
+        async with self.sessionmaker() as session:
+            if await self._get_profile(session, cpf) is None:
+                raise HttpError(404, "Perfil não encontrado.")
+
+        mimetype, options = parse_options_header(request.headers.get('content-type', ''))
+        if mimetype != 'multipart/form-data' or not options.get('boundary'):
+            raise HttpError(400, "Nenhum arquivo enviado.")
+        max_length = config.get('MAX_CONTENT_LENGTH')
+        if max_length and (request.content_length or 0) > max_length:
+            raise HttpError(413, "Arquivo maior que o limite permitido.")
+
+        decoder = MultipartDecoder(options['boundary'].encode('latin-1'), max_form_memory_size=config.get('MAX_FORM_MEMORY_SIZE'))
+        writer, filename, target, received = None, None, None, 0
+        pending, pending_size = [], 0
+        try:
+            async for chunk in _chunks_then_none(request.iter_body()):
+                if chunk is not None:
+                    received += len(chunk)
+                    if max_length and received > max_length:
+                        raise HttpError(413, "Arquivo maior que o limite permitido.")
+                decoder.receive_data(chunk)
+                event = decoder.next_event()
+                while not isinstance(event, (NeedData, Epilogue)):
+                    if isinstance(event, File):
+                        target = None
+                        if event.name == 'document' and writer is None:
+                            filename = event.filename
+                            if not filename:
+                                raise HttpError(400, "Nome de arquivo vazio.")
+                            if not allowed_file(filename):
+                                raise HttpError(400, "Tipo de arquivo não permitido.")
+                            writer = target = get_storage(self.flask_app).open_upload(
+                                filename=filename, content_type=event.headers.get('content-type'))
+                    elif isinstance(event, Field):
+                        target = None
+                    elif isinstance(event, Data) and target is not None:
+                        pending.append(event.data)
+                        pending_size += len(event.data)
+                    event = decoder.next_event()
+                if pending and (pending_size >= _WRITE_BATCH_SIZE or chunk is None):
+                    # Disco/S3 são bloqueantes: a escrita vai para uma thread, em lotes de até 1MB
+                    await asyncio.to_thread(writer.write, b''.join(pending))
+                    pending, pending_size = [], 0
+            if writer is None:
+                raise HttpError(400, "Nenhum arquivo enviado.")
+            document_key = await asyncio.to_thread(writer.finalize, filename.rsplit('.', 1)[1].lower())
+        finally:
+            if writer is not None:
+                await asyncio.to_thread(writer.close) # Descarta uploads não finalizados
+
+        async def save_document(session, profile):
+            existing, idempotency_key = await self._existing_job(session, JOB_DOCUMENT_VALIDATION, profile, request)
+            if existing is not None:
+                return profile, existing, False
+            profile.document_path = document_key
+            profile.document_sha256 = writer.sha256
+            profile.document_validated = False # Pendente até o job de validação terminar
+            # Índices de duplicados são síncronos: rodam na sessão síncrona por baixo da AsyncSession
+            await session.run_sync(lambda sync_session: dedup.index_document_sha256(profile, session=sync_session))
+            job = build_job(JOB_DOCUMENT_VALIDATION, profile.id, {'document_key': document_key}, idempotency_key)
+            session.add(job)
+            await session.commit()
+            return profile, job, True
+
+        profile, job, created = await self._save_profile_changes(cpf, save_document)
+        if not created:
+            return 202, {"message": "Requisição já recebida.", "job": job.to_dict()}
+        job_dict, validated = job.to_dict(), profile.document_validated
+        if config.get('JOBS_EAGER'):
+            # OCR é CPU: roda numa thread, como na versão síncrona
+            job_dict, validated = await asyncio.to_thread(self._dispatch_sync, job.id)
+        return 202, {
+            "message": "Documento enviado, validação em andamento.",
+            "file_path": document_key,
+            "document_key": document_key,
+            "sha256": writer.sha256,
+            "size": writer.size,
+            "deduplicated": writer.deduplicated,
+            "validated": validated,
+            "job": job_dict,
+        }
+
+    def _dispatch_sync(self, job_id):
+        from app import db
+        with self.flask_app.app_context():
+            try:
+                job = db.session.get(ValidationJob, job_id)
+                dispatch_job(job)
+                profile = db.session.get(FanProfile, job.profile_id)
+                return job.to_dict(), profile.document_validated
+            finally:
+                db.session.remove()
+
+    async def link_esports(self, request, cpf):
+        """Mesmo contrato de routes.link_esports_profiles; a validação roda no event loop deste processo."""
+        data = await request.json() # Lido antes de abrir a transação
+
+        async def save_links(session, profile):
+            if not data or not isinstance(data, dict):
+                raise HttpError(400, "Dados inválidos. Envie um JSON com os links.")
+            existing, idempotency_key = await self._existing_job(session, JOB_ESPORTS_LINK_VALIDATION, profile, request)
+            if existing is not None:
+                return profile, existing, False
+
+            profile.esports_profile_links = data
+            profile.esports_link_validations = None # Resultado por link é gravado pelo job
+            profile.esports_links_validated = False
+            await session.run_sync(lambda sync_session: dedup.index_profile_links(profile, 'esports', session=sync_session))
+            job = build_job(JOB_ESPORTS_LINK_VALIDATION, profile.id, {'links': data}, idempotency_key)
+            # Já nasce 'running' com o lock deste processo: o worker da fila não o pega, e se o
+            # processo morrer no meio, requeue_stale_jobs devolve o job para a fila
+            job.status = 'running'
+            job.attempts = 1
+            job.locked_by = self.worker_id
+            job.locked_at = datetime.utcnow()
+            session.add(job)
+            await session.commit()
+            return profile, job, True
+
+        profile, job, created = await self._save_profile_changes(cpf, save_links)
+        if not created:
+            return 202, {"message": "Requisição já recebida.", "job": job.to_dict()}
+        task = self._spawn(self._run_link_job(job.id, data))
+        if self.flask_app.config.get('JOBS_EAGER'):
+            job = await task
+        return 202, {
+            "message": "Links eSports atualizados, validação em andamento.",
+            "job": job.to_dict(),
+            "profile": profile.to_dict(),
+        }
+
+    async def _run_link_job(self, job_id, links):
+        """Executa o job de validação de links no event loop e grava o resultado como o worker faria."""
+        with self.flask_app.app_context():
+            span = tracing.start_span(f"job {JOB_ESPORTS_LINK_VALIDATION}", attributes={'job.count': 1}, root=True)
+            try:
+                try:
+                    verdicts, error = await self.link_checker.check_links(links, defer_unavailable=True), None
+                except Exception as e:
+                    verdicts, error = None, e
+                try:
+                    async with self.sessionmaker() as session:
+                        job = await session.get(ValidationJob, job_id)
+                        profile = await session.get(FanProfile, job.profile_id) if error is None else None
+                        if error is None and profile is None:
+                            error = LookupError(f"Profile {job.profile_id} no longer exists")
+                        if error is None:
+                            mark_job_succeeded(job, apply_link_verdicts(profile, links, verdicts))
+                        else:
+                            mark_job_failed(job, error)
+                        await session.commit()
+                        return job
+                except Exception as e:
+                    # Ex: perfil alterado no meio (versão diferente): nova tentativa pela fila
+                    async with self.sessionmaker() as session:
+                        job = await session.get(ValidationJob, job_id)
+                        mark_job_failed(job, e)
+                        await session.commit()
+                        return job
+            finally:
+                tracing.end_span(span)
+
+async def _chunks_then_none(chunks):
+    """Repassa os chunks e termina com None (fim do corpo), como o MultipartDecoder espera."""
+    async for chunk in chunks:
+        yield chunk
+    yield None
+
+def create_asgi_app(config_class=Config):
+    """App ASGI: rotas nativas assíncronas + o app Flask para o restante."""
+    return AsgiApp(create_app(config_class))
@@ -0,0 +1,190 @@
+# backend/app/async_services.py
+import asyncio
+from urllib.parse import urlsplit
+import httpx
+from flask import current_app
+from app import link_cache, outbound
+from app.html_head import HeadMetadataExtractor
+from app.http_client import DEFAULT_HEADERS
+from app.metrics import OutboundCall
+from app.services import (
+    url_passes_keyword_check, conditional_headers_for, verdict_from_fetch,
+    new_fetch_result, score_head_text,
+)
+
+# Validação de links eSports no event loop (modo ASGI, ver app/asgi.py), com httpx.
+# Mesmas etapas e mesmo cache de services.check_esports_link; só o scraping é assíncrono.
+# As consultas ao cache de links (memória + banco síncrono) rodam em threads (asyncio.to_thread).
+
+# 429 não é repetido: vai direto para o breaker, que respeita o Retry-After (app/outbound.py)
+RETRY_STATUSES = (500, 502, 503, 504)
+
+def build_async_http_client(config):
+    """Cliente httpx do processo: keep-alive, timeouts e headers iguais aos da sessão síncrona."""
+    max_per_host = config.get('HTTP_POOL_MAXSIZE', 4)
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        timeout=httpx.Timeout(
+            config.get('HTTP_READ_TIMEOUT', 10),
+            connect=config.get('HTTP_CONNECT_TIMEOUT', 3.05),
+        ),
+        limits=httpx.Limits(
+            max_connections=config.get('HTTP_POOL_CONNECTIONS', 10) * max_per_host,
+            max_keepalive_connections=config.get('HTTP_POOL_CONNECTIONS', 10) * max_per_host,
+        ),
+        follow_redirects=True,
+        transport=httpx.AsyncHTTPTransport(retries=1), # Só erros de conexão; 429/5xx são tratados abaixo
+    )
+
+class AsyncLinkChecker:
+    """Valida links com um cliente httpx compartilhado, limitando as conexões simultâneas por host."""
+
+    def __init__(self, client, max_per_host=4, max_retries=2, backoff_factor=0.5):
+        self.client = client
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self._host_semaphores = {}
+
+    @classmethod
+    def from_config(cls, client, config):
+        return cls(
+            client,
+            max_per_host=config.get('OUTBOUND_HOST_CONCURRENCY', 4),
+            max_retries=config.get('HTTP_MAX_RETRIES', 2),
+            backoff_factor=config.get('HTTP_BACKOFF_FACTOR', 0.5),
+        )
+
+    def _semaphore(self, url):
+        host = (urlsplit(url).hostname or '').lower()
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return semaphore
+
+    def _retry_delay(self, attempt, response):
+        # Retry-After em segundos (como o urllib3 da sessão síncrona); senão backoff exponencial
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(int(retry_after), 30)
+        return self.backoff_factor * (2 ** attempt)
+
+    async def check_link(self, profile_url):
+        """Versão assíncrona de services.check_esports_link; retorna o veredito completo."""
+        current_app.logger.info(f"Attempting relevance validation for URL: {profile_url}")
+        if not url_passes_keyword_check(profile_url):
+            return link_cache.make_verdict(False)
+
+        cached = await asyncio.to_thread(link_cache.lookup, profile_url)
+        if cached and cached['fresh']:
+            current_app.logger.info(f"Link '{profile_url}' verdict served from cache ({cached['relevant']}).")
+            return link_cache.make_verdict(cached['relevant'], cached['matched_keywords'], cached['checked_at'])
+
+        result = await self.fetch_and_score(profile_url, conditional_headers_for(cached))
+        return await asyncio.to_thread(verdict_from_fetch, profile_url, cached, result)
+
+    async def check_links(self, links, defer_unavailable=False):
+        """Versão assíncrona de services.check_esports_links: {plataforma: veredito}, com prazo total."""
+        if not links:
+            return {}
+        deadline = current_app.config.get('ESPORTS_VALIDATION_DEADLINE', 15)
+        tasks = {platform: asyncio.ensure_future(self.check_link(url)) for platform, url in links.items()}
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+        for task in pending:
+            task.cancel() # Diferente das threads, a requisição em andamento é de fato interrompida
+        results = {}
+        unavailable = []
+        for platform, task in tasks.items():
+            if task in pending:
+                current_app.logger.warning(f"Validation of '{platform}' link exceeded the {deadline}s deadline.")
+                results[platform] = link_cache.make_verdict(False)
+            elif isinstance(task.exception(), outbound.HostUnavailable):
+                current_app.logger.warning(f"Validation of '{platform}' link not attempted: {task.exception()}")
+                unavailable.append(task.exception())
+                results[platform] = link_cache.make_verdict(False)
+            elif task.exception() is not None:
+                current_app.logger.error(f"Unexpected error validating '{platform}' link: {task.exception()}")
+                results[platform] = link_cache.make_verdict(False)
+            else:
+                results[platform] = task.result()
+        if defer_unavailable and unavailable:
+            raise max(unavailable, key=lambda e: e.retry_after)
+        return results
+
+    async def fetch_and_score(self, profile_url, conditional_headers=None):
+        """Versão assíncrona de services._fetch_and_score_link_content (mesmo formato de resultado)."""
+        config = current_app.config
+        result = new_fetch_result()
+        # Vaga, token e breaker do host (app/outbound.py); levanta HostUnavailable
+        permit = await outbound.acquire_async(profile_url, self._semaphore(profile_url))
+        failure, retry_after = None, None # Falha do host, registrada no breaker ao final
+        call = OutboundCall(profile_url) # Latência por host em /metrics
+        try:
+            for attempt in range(self.max_retries + 1):
+                async with self.client.stream('GET', profile_url, headers=conditional_headers or None) as response:
+                    call.status = response.status_code
+                    if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                        delay = self._retry_delay(attempt, response)
+                    else:
+                        if response.status_code == 304:
+                            result['not_modified'] = True
+                            return result
+                        response.raise_for_status()
+                        result['etag'] = response.headers.get('ETag')
+                        result['last_modified'] = response.headers.get('Last-Modified')
+
+                        content_type = response.headers.get('content-type', '').lower()
+                        if 'html' not in content_type:
+                            current_app.logger.warning(f"Content type for '{profile_url}' is not HTML ({content_type}).")
+                            result['cacheable'] = True
+                            return result
+
+                        # Só o <head> é lido; sem charset no Content-Type, UTF-8
+                        extractor = HeadMetadataExtractor(
+                            response.charset_encoding or 'utf-8',
+                            config.get('HTML_HEAD_MAX_BYTES', 256 * 1024),
+                        )
+                        # Páginas pequenas são lidas até o fim para a conexão voltar ao pool
+                        content_length = response.headers.get('Content-Length')
+                        drain = bool(content_length and content_length.isdigit()
+                                     and int(content_length) <= config.get('HTML_HEAD_DRAIN_MAX_BYTES', 64 * 1024))
+                        head_done = False
+                        async for chunk in response.aiter_bytes(config.get('HTML_HEAD_CHUNK_SIZE', 8192)):
+                            if not head_done:
+                                head_done = extractor.feed(chunk)
+                            if head_done and not drain:
+                                break
+                        title_text, meta_text, bytes_read = extractor.finish(complete=not head_done)
+                        break
+                await asyncio.sleep(delay)
+            current_app.logger.debug(f"Read {bytes_read} bytes of '{profile_url}' to extract title/meta.")
+            return score_head_text(profile_url, title_text, meta_text, result)
+
+        # Falhas transitórias não vão para o cache (mesmas regras da versão síncrona)
+        except httpx.TimeoutException:
+            current_app.logger.warning(f"Timeout occurred while fetching content for '{profile_url}'")
+            failure = 'timeout'
+            return result
+        except httpx.TooManyRedirects:
+            current_app.logger.warning(f"Too many redirects for '{profile_url}'")
+            return result
+        except httpx.HTTPStatusError as e:
+            status_code = e.response.status_code
+            current_app.logger.error(f"Failed to fetch/process content for '{profile_url}': {e}")
+            # 4xx (ex: 403 anti-scraping, 404) é resposta definitiva do site; 429 e 5xx não
+            result['cacheable'] = 400 <= status_code < 500 and status_code != 429
+            failure, retry_after = outbound.failure_for_status(status_code, e.response.headers)
+            return result
+        except httpx.TransportError as e:
+            current_app.logger.error(f"Failed to fetch/process content for '{profile_url}': {e}")
+            failure = 'connection error'
+            return result
+        except httpx.HTTPError as e:
+            current_app.logger.error(f"Failed to fetch/process content for '{profile_url}': {e}")
+            return result
+        except Exception as e:
+            current_app.logger.error(f"Unexpected error during content validation of '{profile_url}': {e}")
+            return result
+        finally:
+            call.finish()
+            await outbound.release_async(permit, failure, retry_after)
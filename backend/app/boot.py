@@ -0,0 +1,99 @@
+# backend/app/boot.py
+import json
+import os
+import subprocess
+import sys
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+# Relatório do tempo de boot de um worker (`flask boot report`): sobe um interpretador novo com
+# `python -X importtime`, importa e cria o app como o gunicorn faz e resume os imports mais caros.
+# Com --max-ms e os módulos de BOOT_LAZY_MODULES, sai com código 1 em caso de regressão.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Alvo -> (import, criação do app), como em run.py e asgi.py
+_TARGETS = {
+    'wsgi': ('from app import create_app', 'create_app()'),
+    'asgi': ('from app.asgi import create_asgi_app', 'create_asgi_app()'),
+}
+
+_PROBE = """
+import json, logging, time
+logging.disable(logging.CRITICAL)
+started = time.perf_counter()
+{import_line}
+imported = time.perf_counter()
+{factory}
+created = time.perf_counter()
+print(json.dumps({{'import_ms': (imported - started) * 1000, 'create_ms': (created - imported) * 1000}}))
+"""
+
+def parse_importtime(output):
+    """Linhas de `-X importtime` -> [(módulo, self_us, cumulativo_us, profundidade)]."""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+def measure_boot(target='wsgi'):
+    """Roda o boot num processo novo. Retorna {'import_ms', 'create_ms', 'entries'}."""
+    import_line, factory = _TARGETS[target]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get('PYTHONPATH')])))
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _PROBE.format(import_line=import_line, factory=factory)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise click.ClickException(f"Boot failed:\n{completed.stderr[-2000:]}")
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {**timings, 'entries': parse_importtime(completed.stderr)}
+
+def _by_package(entries):
+    totals = {}
+    for name, self_us, _, _ in entries:
+        package = name.split('.')[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+# --- Comandos CLI (flask boot ...) ---
+
+boot_cli = AppGroup('boot', help='Tempo de boot dos workers.')
+
+@boot_cli.command('report')
+@click.option('--target', type=click.Choice(list(_TARGETS)), default='wsgi', help='App medido (run:app ou asgi:app).')
+@click.option('--top', type=int, default=15, help='Quantidade de imports e pacotes listados.')
+@click.option('--runs', type=int, default=3, help='Execuções (vale a mais rápida; a 1ª aquece os .pyc).')
+@click.option('--max-ms', type=float, default=None, help='Falha (código 1) se import + create_app passar disso.')
+def report_command(target, top, runs, max_ms):
+    """Mede import + create_app num processo novo e lista os imports mais caros."""
+    best = min((measure_boot(target) for _ in range(max(1, runs))), key=lambda r: r['import_ms'] + r['create_ms'])
+    entries = best['entries']
+    total_ms = best['import_ms'] + best['create_ms']
+    click.echo(f"Boot ({target}): {total_ms:.1f} ms (import {best['import_ms']:.1f} ms + create_app {best['create_ms']:.1f} ms), "
+               f"{len(entries)} modules imported")
+
+    click.echo("\nSlowest top-level imports (cumulative):")
+    for name, _, cumulative_us, _ in sorted((e for e in entries if e[3] == 0), key=lambda e: e[2], reverse=True)[:top]:
+        click.echo(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    click.echo("\nSlowest packages (self time):")
+    for package, self_us in _by_package(entries)[:top]:
+        click.echo(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    failures = []
+    imported = {name for name, _, _, _ in entries}
+    lazy_modules = [m.strip() for m in current_app.config.get('BOOT_LAZY_MODULES', '').split(',') if m.strip()]
+    eager = [module for module in lazy_modules if module in imported]
+    if eager:
+        failures.append(f"modules that should load lazily were imported at boot: {', '.join(eager)}")
+    if max_ms is not None and total_ms > max_ms:
+        failures.append(f"boot took {total_ms:.1f} ms (limit {max_ms:.1f} ms)")
+    for failure in failures:
+        click.echo(f"\nFAIL: {failure}", err=True)
+    if failures:
+        sys.exit(1)
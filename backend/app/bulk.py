@@ -0,0 +1,197 @@
+# backend/app/bulk.py
+import csv
+import io
+import json
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models import FanProfile
+from app.utils import dialect_insert
+from app.tags import TAG_FIELDS, replace_profile_tags
+from app.profile_cache import mark_profiles_changed
+from app.profiles import resolve_cpf
+from app.serialization import PROFILE_FIELDS, iter_ndjson, iter_profile_rows, stream_json_array
+
+# Importação/exportação em massa de perfis (NDJSON ou CSV), sem carregar o arquivo inteiro na memória.
+
+# Campos aceitos na importação (mesmos do POST /profile)
+PROFILE_IMPORT_FIELDS = (
+    'cpf', 'full_name', 'address', 'interests', 'activities_last_year',
+    'events_last_year', 'purchases_last_year',
+)
+_MAX_REPORTED_ERRORS = 1000
+
+def _column_lengths():
+    """Tamanho máximo das colunas String (None para Text), para validar linha a linha."""
+    return {name: getattr(FanProfile.__table__.c[name].type, 'length', None) for name in PROFILE_IMPORT_FIELDS}
+
+def iter_ndjson_rows(stream):
+    """Lê um NDJSON linha a linha do stream. Gera (nº da linha, dict ou None, erro ou None)."""
+    for line_number, raw_line in enumerate(stream, start=1):
+        line = raw_line.decode('utf-8', errors='replace').strip() if isinstance(raw_line, bytes) else raw_line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Cada linha deve ser um objeto JSON."
+            continue
+        yield line_number, row, None
+
+def iter_csv_rows(stream):
+    """Lê um CSV (com cabeçalho) do stream. Gera (nº da linha, dict ou None, erro ou None)."""
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8', errors='replace', newline='')
+    reader = csv.DictReader(text_stream)
+    for row in reader:
+        # line_num conta as linhas físicas lidas (inclui o cabeçalho)
+        yield reader.line_num, {k: (v if v != '' else None) for k, v in row.items() if k}, None
+
+def _clean_row(row, lengths):
+    """Filtra os campos conhecidos e valida CPF e tamanhos. Retorna (valores, erro)."""
+    values = {}
+    for field in PROFILE_IMPORT_FIELDS:
+        value = row.get(field)
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            value = str(value)
+        max_length = lengths[field]
+        if max_length and len(value) > max_length:
+            return None, f"Campo '{field}' excede {max_length} caracteres."
+        values[field] = value
+    if not values.get('cpf'):
+        return None, "CPF é obrigatório."
+    # Forma canônica: variantes de formatação do mesmo CPF caem no mesmo perfil
+    # (CPF inválido só atualiza um perfil antigo já gravado com ele, ver resolve_cpf)
+    values['cpf'] = resolve_cpf(values['cpf'])
+    if values['cpf'] is None:
+        return None, "CPF inválido."
+    return values, None
+
+def _upsert_batch(batch):
+    """
+    Upsert de um lote com INSERT ... ON CONFLICT (cpf) DO UPDATE (PostgreSQL/SQLite).
+    Campos ausentes na linha mantêm o valor atual do perfil (COALESCE), e linhas iguais
+    às gravadas não são reescritas: version e updated_at (ETag, cache, watermarks do
+    score e das agregações) só mudam quando algum campo muda de fato.
+    """
+    now = datetime.utcnow()
+    # O mesmo CPF duas vezes no lote quebraria o ON CONFLICT: mescla mantendo a última ocorrência
+    merged = {}
+    for values in batch:
+        merged.setdefault(values['cpf'], {}).update(values)
+    rows = [
+        dict({field: None for field in PROFILE_IMPORT_FIELDS}, **values,
+             version=1, document_validated=False, esports_links_validated=False, created_at=now, updated_at=now)
+        for values in merged.values()
+    ]
+    table = FanProfile.__table__
+    fields = [field for field in PROFILE_IMPORT_FIELDS if field != 'cpf']
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.cpf],
+        set_={
+            **{field: func.coalesce(stmt.excluded[field], table.c[field]) for field in fields},
+            'version': table.c.version + 1,
+            'updated_at': now,
+        },
+        # Só reescreve se algum campo presente na linha difere do valor gravado
+        where=db.or_(*(db.and_(stmt.excluded[field].is_not(None), stmt.excluded[field].is_distinct_from(table.c[field]))
+                       for field in fields)),
+    )
+    # RETURNING traz só as linhas inseridas ou de fato atualizadas
+    written = db.session.execute(stmt.returning(table.c.id, table.c.cpf, *[table.c[field] for field in TAG_FIELDS]), rows).mappings().all()
+    if not written:
+        return
+
+    # Tags normalizadas a partir dos valores gravados (campos ausentes mantiveram o valor anterior)
+    replace_profile_tags([dict(row) for row in written])
+    mark_profiles_changed([row['cpf'] for row in written]) # Invalida o cache de leitura após o commit
+
+def import_profiles(row_iter, batch_size=None):
+    """
+    Consome (nº da linha, dict, erro) e faz upsert em transações de `batch_size` linhas.
+    Se um lote falhar no banco, refaz linha a linha para isolar as linhas com erro.
+    Retorna um resumo com contagens e os erros por linha.
+    """
+    batch_size = batch_size or current_app.config.get('BULK_IMPORT_BATCH_SIZE', 1000)
+    lengths = _column_lengths()
+    summary = {'processed': 0, 'upserted': 0, 'failed': 0, 'errors': []}
+
+    def report(line_number, error):
+        summary['failed'] += 1
+        if len(summary['errors']) < _MAX_REPORTED_ERRORS:
+            summary['errors'].append({'line': line_number, 'error': error})
+
+    def flush(batch):
+        if not batch:
+            return
+        try:
+            _upsert_batch([values for _, values in batch])
+            db.session.commit()
+            summary['upserted'] += len(batch)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Bulk import batch failed, retrying row by row: {e}")
+            for line_number, values in batch:
+                try:
+                    _upsert_batch([values])
+                    db.session.commit()
+                    summary['upserted'] += 1
+                except SQLAlchemyError as row_e:
+                    db.session.rollback()
+                    report(line_number, f"Erro ao salvar: {row_e.__class__.__name__}")
+
+    batch = []
+    for line_number, row, error in row_iter:
+        summary['processed'] += 1
+        if error is None:
+            values, error = _clean_row(row, lengths)
+        if error:
+            report(line_number, error)
+            continue
+        batch.append((line_number, values))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    flush(batch)
+    return summary
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False) # Colunas JSON (links) viram texto JSON na célula
+    if isinstance(value, datetime):
+        return value.isoformat() + 'Z'
+    return value
+
+def _iter_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=PROFILE_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({key: _csv_value(value) for key, value in row.items()})
+        # Envia em pedaços de ~64KB em vez de um write por linha
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_profiles(fmt='ndjson', batch_size=None):
+    """
+    Gera o export de todos os perfis em pedaços (NDJSON, array JSON ou CSV), com os mesmos
+    campos de FanProfile.to_dict. Lê só as colunas, sem objetos do ORM (app/serialization.py).
+    """
+    batch_size = batch_size or current_app.config.get('BULK_EXPORT_BATCH_SIZE', 1000)
+    rows = iter_profile_rows(batch_size=batch_size)
+    if fmt == 'json':
+        return stream_json_array(rows)
+    if fmt == 'csv':
+        return _iter_csv(rows)
+    return iter_ndjson(rows)
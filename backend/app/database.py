@@ -0,0 +1,77 @@
+# backend/app/database.py
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Perfil da engine do banco (DB_ENGINE_PROFILE):
+# - 'tuned' (padrão): pool dimensionado e pre-ping no PostgreSQL; WAL, synchronous=NORMAL,
+#   busy_timeout e mmap no SQLite, aplicados em cada conexão nova (evento 'connect').
+# - 'default': configurações padrão do SQLAlchemy/driver, como antes.
+# SQLALCHEMY_ENGINE_OPTIONS definido explicitamente na config tem precedência.
+# Só PostgreSQL e SQLite são suportados: os upserts usam INSERT ... ON CONFLICT (app/utils.py).
+
+SUPPORTED_DIALECTS = ('postgresql', 'sqlite')
+
+def engine_options(config):
+    """Opções de create_engine para a URL configurada, conforme o perfil."""
+    if config.get('DB_ENGINE_PROFILE', 'tuned') != 'tuned':
+        return {}
+    backend = make_url(config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    if backend == 'postgresql':
+        return {
+            'pool_size': config.get('DB_POOL_SIZE', 5),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+            'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+        }
+    if backend == 'sqlite':
+        # Espera do driver pelo lock (segundos); o PRAGMA busy_timeout abaixo vale para a conexão toda
+        return {'connect_args': {'timeout': config.get('SQLITE_BUSY_TIMEOUT', 5000) / 1000}}
+    return {}
+
+def _sqlite_pragmas(config):
+    pragmas = [
+        ('busy_timeout', int(config.get('SQLITE_BUSY_TIMEOUT', 5000))),
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('mmap_size', int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))),
+    ]
+    journal_mode = config.get('SQLITE_JOURNAL_MODE', 'WAL')
+    if journal_mode:
+        # Primeiro: com WAL, leitores não bloqueiam o escritor (e vice-versa)
+        pragmas.insert(0, ('journal_mode', journal_mode))
+    return pragmas
+
+def configure_engine(engine, config):
+    """Registra os PRAGMAs do SQLite no evento 'connect' da engine (nada a fazer nos outros bancos)."""
+    if config.get('DB_ENGINE_PROFILE', 'tuned') != 'tuned' or engine.dialect.name != 'sqlite':
+        return
+    pragmas = _sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def check_dialect(uri):
+    """Recusa no boot um banco sem INSERT ... ON CONFLICT, em vez de falhar no primeiro upsert."""
+    url = make_url(uri)
+    if url.get_backend_name() not in SUPPORTED_DIALECTS:
+        raise RuntimeError(
+            f"Unsupported database '{url.get_backend_name()}' ({url.render_as_string(hide_password=True)}): "
+            f"use {' or '.join(SUPPORTED_DIALECTS)} (upserts rely on INSERT ... ON CONFLICT)."
+        )
+
+def init_database(app, db):
+    """Inicializa o Flask-SQLAlchemy com as opções do perfil e configura as engines criadas."""
+    check_dialect(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**engine_options(app.config), **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+    db.init_app(app)
+    with app.app_context():
+        # Engines são criadas no init_app, mas só conectam na primeira query
+        for engine in db.engines.values():
+            configure_engine(engine, app.config)
+        app.logger.info(f"Database engine profile '{app.config.get('DB_ENGINE_PROFILE', 'tuned')}' ({db.engine.dialect.name}).")
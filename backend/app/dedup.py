@@ -0,0 +1,396 @@
+# backend/app/dedup.py
+import hashlib
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func
+from app import db
+from app.models import DocumentFingerprint, DuplicateMatch, FanProfile, ProfileLink
+from app.link_cache import normalize_url
+from app.profile_cache import mark_profiles_changed
+from app.utils import canonical_cpf, dialect_insert, format_cpf, normalize_cpf
+
+# Detecção de cadastros duplicados (a mesma pessoa com vários perfis) por índices consultados
+# na escrita, sem comparar perfis dois a dois:
+# - CPF: gravado na forma canônica com dígitos verificadores conferidos (utils.canonical_cpf);
+#   variantes de formatação caem no mesmo perfil.
+# - profile_link: índice reverso URL normalizada -> perfis (links eSports e redes sociais).
+# - document_fingerprint: dHash de 64 bits da miniatura do documento, em 4 bandas de 16 bits
+#   indexadas. Dois hashes a até 3 bits de distância têm ao menos uma banda idêntica, então a busca
+#   é por igualdade nas bandas e a distância exata só é calculada nos candidatos.
+# Os pares encontrados ficam em duplicate_match (GET /profile/<cpf>/duplicates).
+# `flask dedup sweep` cobre os perfis já existentes (e grava os CPFs antigos na forma canônica).
+
+# Origem do link -> coluna JSON do perfil
+LINK_SOURCES = {'esports': 'esports_profile_links', 'social': 'social_media_links'}
+MATCH_REASONS = ('cpf', 'document', 'similar_document', 'esports_link', 'social_link')
+
+DHASH_BANDS = 4
+_BAND_BITS = 64 // DHASH_BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+_HASH_MASK = (1 << 64) - 1
+# Imagens quase uniformes (ex: folha em branco) têm dHash perto de 0 ou de 2^64-1 e casariam com todas
+_MIN_HASH_BITS = 8
+# Limite de candidatos por busca: bandas muito comuns (ex: documentos do mesmo modelo) não viram varredura
+_MAX_CANDIDATES = 500
+
+# --- Pares de duplicados ---
+
+def _store_matches(pairs, session):
+    """Grava os pares [(profile_id, outro, motivo, detalhe)] com o menor id primeiro (upsert)."""
+    records = {}
+    now = datetime.utcnow()
+    for profile_id, other_id, reason, detail in pairs:
+        if profile_id == other_id:
+            continue
+        low, high = sorted((profile_id, other_id))
+        records[(low, high, reason)] = {
+            'profile_id': low, 'other_profile_id': high, 'reason': reason,
+            'detail': str(detail)[:300] if detail is not None else None, 'detected_at': now,
+        }
+    if not records:
+        return 0
+    table = DuplicateMatch.__table__
+    stmt = dialect_insert(table, bind=session.get_bind())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.profile_id, table.c.other_profile_id, table.c.reason],
+        set_={'detail': stmt.excluded.detail, 'detected_at': stmt.excluded.detected_at},
+    )
+    session.execute(stmt, list(records.values()))
+    return len(records)
+
+def _replace_matches(profile_id, reason, others, session):
+    """Troca os pares do perfil com este motivo pelos encontrados agora ([(outro profile_id, detalhe)])."""
+    session.execute(db.delete(DuplicateMatch).where(
+        DuplicateMatch.reason == reason,
+        db.or_(DuplicateMatch.profile_id == profile_id, DuplicateMatch.other_profile_id == profile_id),
+    ))
+    _store_matches([(profile_id, other_id, reason, detail) for other_id, detail in others], session)
+    if others:
+        current_app.logger.info(f"Profile {profile_id} looks like a duplicate of {len(others)} profile(s) ({reason}).")
+
+def _group_matches(groups, reason, session):
+    """Pares de grupos de perfis com o mesmo valor: cada um com o primeiro do grupo (não todos x todos)."""
+    pairs = []
+    for detail, profile_ids in groups:
+        first, *others = sorted(set(profile_ids))
+        pairs.extend((first, other_id, reason, detail) for other_id in others)
+    return _store_matches(pairs, session)
+
+def profile_duplicates(profile_id):
+    """Pares do perfil nos dois sentidos, com o CPF e o nome do outro perfil."""
+    matches = db.session.scalars(
+        db.select(DuplicateMatch)
+        .where(db.or_(DuplicateMatch.profile_id == profile_id, DuplicateMatch.other_profile_id == profile_id))
+        .order_by(DuplicateMatch.detected_at.desc())
+    ).all()
+    others = {match.other_profile_id if match.profile_id == profile_id else match.profile_id for match in matches}
+    profiles = {
+        row.id: row for row in db.session.execute(
+            db.select(FanProfile.id, FanProfile.cpf, FanProfile.full_name).where(FanProfile.id.in_(others))
+        )
+    } if others else {}
+    items = []
+    for match in matches:
+        other_id = match.other_profile_id if match.profile_id == profile_id else match.profile_id
+        other = profiles.get(other_id)
+        items.append({
+            'profile_id': other_id,
+            'cpf': other.cpf if other else None,
+            'full_name': other.full_name if other else None,
+            'reason': match.reason,
+            'detail': match.detail,
+            'detected_at': match.detected_at.isoformat() + 'Z',
+        })
+    return items
+
+# --- Links (índice reverso por URL normalizada) ---
+
+def _url_hash(normalized_url):
+    return hashlib.sha256(normalized_url.encode('utf-8')).hexdigest()
+
+def _link_rows(profile_id, source, links):
+    rows = {}
+    if not isinstance(links, dict):
+        return []
+    for platform, url in links.items():
+        if not isinstance(url, str) or not url.strip():
+            continue
+        try:
+            normalized = normalize_url(url)
+        except ValueError: # Ex: porta inválida
+            continue
+        platform = str(platform)[:50]
+        rows[platform] = {
+            'url_hash': _url_hash(normalized), 'profile_id': profile_id,
+            'source': source, 'platform': platform, 'url': normalized,
+        }
+    return list(rows.values())
+
+def index_profile_links(profile, source, session=None):
+    """
+    Atualiza as entradas do perfil no índice de links (`source`: 'esports' ou 'social') e registra
+    os perfis com alguma das mesmas URLs. Retorna [(outro profile_id, url)]. O commit fica com o chamador.
+    `session` permite usar a sessão síncrona de uma AsyncSession (run_sync, ver app/asgi.py).
+    """
+    session = session or db.session
+    rows = _link_rows(profile.id, source, getattr(profile, LINK_SOURCES[source]))
+    session.execute(db.delete(ProfileLink).where(ProfileLink.profile_id == profile.id, ProfileLink.source == source))
+    others = []
+    if rows:
+        session.execute(ProfileLink.__table__.insert(), rows)
+        # Chave primária (url_hash, ...): busca por igualdade no índice, sem varrer perfis
+        shared = session.execute(
+            db.select(ProfileLink.profile_id, func.min(ProfileLink.url))
+            .where(ProfileLink.url_hash.in_({row['url_hash'] for row in rows}), ProfileLink.profile_id != profile.id)
+            .group_by(ProfileLink.profile_id)
+        ).all()
+        others = [tuple(row) for row in shared]
+    _replace_matches(profile.id, f'{source}_link', others, session)
+    return others
+
+# --- Documentos (SHA-256 idêntico e dHash parecido) ---
+
+def index_document_sha256(profile, session=None):
+    """
+    Registra os perfis com exatamente o mesmo arquivo (índice em document_sha256).
+    Chamado no upload, antes da validação. Retorna [(outro profile_id, sha256)].
+    """
+    session = session or db.session
+    others = []
+    if profile.document_sha256:
+        others = [(other_id, profile.document_sha256) for other_id in session.scalars(
+            db.select(FanProfile.id).where(FanProfile.document_sha256 == profile.document_sha256, FanProfile.id != profile.id)
+        )]
+    _replace_matches(profile.id, 'document', others, session)
+    return others
+
+def document_dhash(path):
+    """dHash de 64 bits: imagem reduzida a 9x8 em tons de cinza; cada bit diz se o pixel é mais claro que o da direita."""
+    from PIL import Image
+    with Image.open(path) as image:
+        image.draft('L', (64, 64)) # JPEG: decodifica já reduzido
+        pixels = image.convert('L').resize((9, 8), Image.LANCZOS).tobytes()
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            value = (value << 1) | (pixels[row * 9 + column] > pixels[row * 9 + column + 1])
+    return value
+
+def _signed(value):
+    # BIGINT tem sinal: 64 bits sem sinal -> complemento de dois
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _bands(value):
+    """Bandas de 16 bits do hash, ou None se a imagem for quase uniforme."""
+    if not _MIN_HASH_BITS <= value.bit_count() <= 64 - _MIN_HASH_BITS:
+        return [None] * DHASH_BANDS
+    return [(value >> (_BAND_BITS * (DHASH_BANDS - 1 - i))) & _BAND_MASK for i in range(DHASH_BANDS)]
+
+def similar_documents(dhash, exclude_profile_id=None, max_distance=None, session=None):
+    """Perfis com documento a até `max_distance` bits do hash. Retorna [(profile_id, distância)], mais parecidos primeiro."""
+    session = session or db.session
+    if max_distance is None:
+        max_distance = current_app.config.get('DEDUP_DHASH_MAX_DISTANCE', 3)
+    bands = _bands(dhash)
+    if bands[0] is None:
+        return []
+    columns = [DocumentFingerprint.band0, DocumentFingerprint.band1, DocumentFingerprint.band2, DocumentFingerprint.band3]
+    query = db.select(DocumentFingerprint.profile_id, DocumentFingerprint.dhash).where(
+        db.or_(*(column == band for column, band in zip(columns, bands)))
+    )
+    if exclude_profile_id is not None:
+        query = query.where(DocumentFingerprint.profile_id != exclude_profile_id)
+    matches = []
+    for profile_id, other in session.execute(query.limit(_MAX_CANDIDATES)):
+        distance = ((dhash ^ other) & _HASH_MASK).bit_count()
+        if distance <= max_distance:
+            matches.append((profile_id, distance))
+    return sorted(matches, key=lambda match: match[1])
+
+def index_document_fingerprint(profile_id, document_key, dhash, session=None):
+    """
+    Grava o dHash do documento do perfil e registra os perfis com documento parecido.
+    Retorna [(outro profile_id, distância)]. O commit fica com o chamador.
+    """
+    session = session or db.session
+    table = DocumentFingerprint.__table__
+    values = {
+        'document_key': document_key, 'dhash': _signed(dhash), 'computed_at': datetime.utcnow(),
+        **{f'band{i}': band for i, band in enumerate(_bands(dhash))},
+    }
+    stmt = dialect_insert(table, bind=session.get_bind()).values(profile_id=profile_id, **values)
+    session.execute(stmt.on_conflict_do_update(index_elements=[table.c.profile_id], set_=values))
+    others = similar_documents(dhash, exclude_profile_id=profile_id, session=session)
+    _replace_matches(profile_id, 'similar_document', others, session)
+    return others
+
+def fingerprint_documents(entries):
+    """
+    dHash das miniaturas já geradas pelo pré-processamento: [(profile_id, chave do documento,
+    chave da miniatura)]. Retorna {profile_id: [(outro profile_id, distância)]}; falhas são só logadas.
+    """
+    from app.storage import get_storage
+    results = {}
+    for profile_id, document_key, thumbnail_key in entries:
+        try:
+            with get_storage().local_path(thumbnail_key) as path:
+                dhash = document_dhash(path)
+        except Exception as e:
+            current_app.logger.warning(f"Could not fingerprint document {document_key}: {e}")
+            continue
+        results[profile_id] = index_document_fingerprint(profile_id, document_key, dhash)
+    return results
+
+# --- Varredura dos perfis existentes ---
+
+def _sweep_cpfs(echo=None):
+    """
+    Grava formatados (XXX.XXX.XXX-XX) os CPFs antigos sem conflito com outro perfil e registra os
+    perfis com o mesmo CPF em formatos diferentes. CPFs com dígitos verificadores inválidos (cadastros
+    anteriores à validação) também são formatados e continuam consultáveis e atualizáveis pelo CPF
+    (profiles.resolve_cpf); só não é possível criar um perfil novo com eles.
+    Retorna {'canonicalized', 'invalid', 'groups'}.
+    """
+    groups = {}
+    invalid = 0
+    for profile_id, cpf in db.session.execute(db.select(FanProfile.id, FanProfile.cpf).execution_options(yield_per=5000)):
+        if canonical_cpf(cpf) is None:
+            invalid += 1
+            if format_cpf(cpf) is None:
+                continue # Sem 11 dígitos: fica como está
+        groups.setdefault(normalize_cpf(cpf), []).append((profile_id, cpf))
+    db.session.rollback() # Encerra a leitura antes das escritas
+
+    renames = []
+    for rows in groups.values():
+        profile_id, cpf = rows[0]
+        # Com outro perfil no mesmo CPF, a forma formatada violaria o UNIQUE: fica só o par registrado
+        if len(rows) == 1 and cpf != format_cpf(cpf):
+            renames.append((profile_id, cpf, format_cpf(cpf)))
+    for position, (profile_id, cpf, formatted) in enumerate(renames, 1):
+        db.session.execute(db.update(FanProfile).where(FanProfile.id == profile_id).values(cpf=formatted))
+        mark_profiles_changed([cpf, formatted])
+        if position % 1000 == 0 or position == len(renames):
+            db.session.commit()
+    duplicated = [(format_cpf(digits), [profile_id for profile_id, _ in rows])
+                  for digits, rows in groups.items() if len(rows) > 1]
+    _group_matches(duplicated, 'cpf', db.session)
+    db.session.commit()
+    if echo and (renames or invalid or duplicated):
+        echo(f"CPFs: {len(renames)} canonicalized, {invalid} with invalid check digits (kept, updatable), "
+             f"{len(duplicated)} shared by several profiles.")
+    return {'canonicalized': len(renames), 'invalid': invalid, 'groups': len(duplicated)}
+
+def _sweep_links(batch_size, echo=None):
+    """Reconstrói o índice de links em lotes por faixa de id e registra as URLs compartilhadas."""
+    last_id = indexed = 0
+    while True:
+        rows = db.session.execute(
+            db.select(FanProfile.id, FanProfile.esports_profile_links, FanProfile.social_media_links)
+            .where(FanProfile.id > last_id).order_by(FanProfile.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        entries = [entry for row in rows for source, column in LINK_SOURCES.items()
+                   for entry in _link_rows(row.id, source, getattr(row, column))]
+        db.session.execute(db.delete(ProfileLink).where(ProfileLink.profile_id.in_(ids)))
+        if entries:
+            db.session.execute(ProfileLink.__table__.insert(), entries)
+        db.session.commit()
+        last_id = ids[-1]
+        indexed += len(entries)
+    # URLs com mais de um perfil: uma consulta agrupada no índice
+    shared = db.session.execute(
+        db.select(ProfileLink.url_hash, ProfileLink.source)
+        .group_by(ProfileLink.url_hash, ProfileLink.source)
+        .having(func.count(func.distinct(ProfileLink.profile_id)) > 1)
+    ).all()
+    groups = 0
+    for url_hash, source in shared:
+        links = db.session.execute(
+            db.select(ProfileLink.profile_id, ProfileLink.url).where(ProfileLink.url_hash == url_hash, ProfileLink.source == source)
+        ).all()
+        groups += 1
+        _group_matches([(links[0].url, [link.profile_id for link in links])], f'{source}_link', db.session)
+    db.session.commit()
+    if echo:
+        echo(f"Links: {indexed} indexed, {groups} URL(s) shared by several profiles.")
+    return {'links': indexed, 'groups': groups}
+
+def _sweep_documents(batch_size, echo=None):
+    """Registra os arquivos idênticos (SHA-256) e calcula o dHash dos documentos ainda sem hash atualizado."""
+    shared = db.session.execute(
+        db.select(FanProfile.document_sha256)
+        .where(FanProfile.document_sha256.is_not(None))
+        .group_by(FanProfile.document_sha256)
+        .having(func.count() > 1)
+    ).scalars().all()
+    for sha256 in shared:
+        profile_ids = db.session.scalars(db.select(FanProfile.id).where(FanProfile.document_sha256 == sha256)).all()
+        _group_matches([(sha256, profile_ids)], 'document', db.session)
+    db.session.commit()
+
+    from app.documents import preprocess_documents
+    last_id = fingerprinted = similar = 0
+    while True:
+        rows = db.session.execute(
+            db.select(FanProfile.id, FanProfile.document_path)
+            .outerjoin(DocumentFingerprint, DocumentFingerprint.profile_id == FanProfile.id)
+            .where(FanProfile.id > last_id, FanProfile.document_path.is_not(None),
+                   db.or_(DocumentFingerprint.profile_id.is_(None), DocumentFingerprint.document_key != FanProfile.document_path))
+            .order_by(FanProfile.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        # Miniaturas já geradas na validação são reaproveitadas; as que faltam saem do pool de processos
+        derivatives = preprocess_documents([row.document_path for row in rows])
+        entries = [
+            (row.id, row.document_path, derivatives[row.document_path]['thumbnail'])
+            for row in rows if not isinstance(derivatives[row.document_path], Exception)
+        ]
+        results = fingerprint_documents(entries)
+        db.session.commit()
+        fingerprinted += len(results)
+        similar += sum(1 for others in results.values() if others)
+        if echo:
+            echo(f"Fingerprinted {fingerprinted} document(s) (last id {last_id}).")
+    if echo:
+        echo(f"Documents: {len(shared)} file(s) shared by several profiles, {similar} similar to another profile's.")
+    return {'shared_files': len(shared), 'fingerprinted': fingerprinted, 'similar': similar}
+
+def sweep(batch_size=None, documents=True, echo=None):
+    """Passa os perfis existentes pelos índices de duplicados. Retorna o resumo por etapa."""
+    batch_size = batch_size or current_app.config.get('DEDUP_SWEEP_BATCH_SIZE', 1000)
+    started = time.perf_counter()
+    summary = {'cpfs': _sweep_cpfs(echo), 'links': _sweep_links(batch_size, echo)}
+    if documents:
+        summary['documents'] = _sweep_documents(batch_size, echo)
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    current_app.logger.info(f"Dedup sweep finished in {summary['seconds']:.2f}s.")
+    return summary
+
+# --- Comandos CLI (flask dedup ...) ---
+
+dedup_cli = AppGroup('dedup', help='Detecção de cadastros duplicados.')
+
+@dedup_cli.command('sweep')
+@click.option('--batch-size', type=int, default=None, help='Perfis por lote.')
+@click.option('--skip-documents', is_flag=True, help='Não calcula o dHash dos documentos (só CPFs e links).')
+def sweep_command(batch_size, skip_documents):
+    """Indexa os perfis existentes e registra os duplicados encontrados."""
+    summary = sweep(batch_size=batch_size, documents=not skip_documents, echo=click.echo)
+    click.echo(f"Sweep finished in {summary['seconds']:.2f}s.")
+
+@dedup_cli.command('status')
+def status_command():
+    """Mostra o tamanho dos índices e os pares de duplicados por motivo."""
+    counts = dict(db.session.execute(db.select(DuplicateMatch.reason, func.count()).group_by(DuplicateMatch.reason)).all())
+    for reason in MATCH_REASONS:
+        click.echo(f"{reason:<17} {counts.get(reason, 0):>8}")
+    click.echo(f"{'indexed links':<17} {db.session.scalar(db.select(func.count()).select_from(ProfileLink)):>8}")
+    click.echo(f"{'fingerprints':<17} {db.session.scalar(db.select(func.count()).select_from(DocumentFingerprint)):>8}")
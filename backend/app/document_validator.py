@@ -0,0 +1,212 @@
+# backend/app/document_validator.py
+import os
+import re
+import shutil
+import tempfile
+import time
+from threading import Lock
+from flask import current_app
+from prometheus_client import Counter
+from app.utils import normalize_cpf, is_valid_cpf
+
+# Validação offline dos documentos: o motor (OCR local) é carregado uma vez por
+# processo e recebe lotes de imagens normalizadas (app/documents.py), para diluir
+# o custo de inicialização. O resultado confere o CPF lido com o do perfil.
+# Motores: 'ocr_cpf' (pytesseract + binário tesseract), 'placeholder' (sempre válido)
+# e 'auto' (ocr_cpf se o tesseract estiver instalado). Sem tesseract, 'auto' só cai no
+# placeholder com DEBUG; fora dele a validação falha e os jobs são refeitos até virar 'failed'.
+
+# Trocas comuns do OCR em campos numéricos (letra lida no lugar do dígito)
+_OCR_DIGIT_FIXES = str.maketrans({'O': '0', 'o': '0', 'D': '0', 'I': '1', 'l': '1', '|': '1', 'S': '5', 'B': '8'})
+_D = r'[\dOoDIl|SB]'
+# CPF com ou sem pontuação, tolerando espaços que o OCR costuma inserir
+_CPF_RE = re.compile(rf'(?<![\w])({_D}{{3}})\s?[.,]?\s?({_D}{{3}})\s?[.,]?\s?({_D}{{3}})\s?[-–.]?\s?({_D}{{2}})(?![\w])')
+
+_stats = {'batches': 0, 'documents': 0, 'stages': {}}
+_stats_lock = Lock()
+
+stage_seconds = Counter('kyf_document_validation_stage_seconds', 'Tempo acumulado por etapa da validação de documentos.', ('stage',))
+stage_items = Counter('kyf_document_validation_stage_items', 'Documentos processados por etapa da validação.', ('stage',))
+
+_validator = None
+_validator_pid = None
+_validator_lock = Lock()
+
+def record_stage(stage, seconds, count=1):
+    """Acumula o tempo de uma etapa (load, preprocess, ocr, match) para dimensionar os workers."""
+    with _stats_lock:
+        entry = _stats['stages'].setdefault(stage, {'calls': 0, 'items': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        ms = seconds * 1000
+        entry['calls'] += 1
+        entry['items'] += count
+        entry['total_ms'] += ms
+        entry['max_ms'] = max(entry['max_ms'], ms)
+    stage_seconds.labels(stage=stage).inc(seconds)
+    stage_items.labels(stage=stage).inc(count)
+
+def get_validation_stats():
+    """Tempos por etapa (por processo): total, máximo e média por documento."""
+    with _stats_lock:
+        stats = {
+            'engine': _validator.name if _validator is not None else None,
+            'batches': _stats['batches'],
+            'documents': _stats['documents'],
+            'stages': {},
+        }
+        for stage, entry in _stats['stages'].items():
+            stats['stages'][stage] = dict(
+                entry,
+                total_ms=round(entry['total_ms'], 2),
+                max_ms=round(entry['max_ms'], 2),
+                avg_ms_per_item=round(entry['total_ms'] / entry['items'], 2) if entry['items'] else None,
+            )
+    return stats
+
+def find_cpfs(text):
+    """CPFs válidos (dígitos verificadores corretos) encontrados no texto, na ordem de leitura."""
+    found = []
+    for line in (text or '').splitlines():
+        for match in _CPF_RE.finditer(line):
+            cpf = ''.join(match.groups()).translate(_OCR_DIGIT_FIXES)
+            # O dígito verificador descarta a maioria das leituras erradas
+            if is_valid_cpf(cpf) and cpf not in found:
+                found.append(cpf)
+    return found
+
+def match_document_text(text, expected_cpf):
+    """Confere o texto do documento com o CPF do perfil. Retorna (válido, motivo, CPFs encontrados)."""
+    if not (text or '').strip():
+        return False, 'no_text', []
+    cpfs = find_cpfs(text)
+    if not cpfs:
+        return False, 'cpf_not_found', []
+    if normalize_cpf(expected_cpf) in cpfs:
+        return True, 'cpf_match', cpfs
+    return False, 'cpf_mismatch', cpfs
+
+class DocumentValidator:
+    """
+    Interface dos validadores. validate_batch recebe itens {'image_path', 'expected_cpf'}
+    e devolve, na mesma ordem, {'valid', 'reason', ...}.
+    """
+
+    name = None
+
+    def validate_batch(self, items):
+        raise NotImplementedError
+
+    def validate(self, image_path, expected_cpf=None):
+        return self.validate_batch([{'image_path': image_path, 'expected_cpf': expected_cpf}])[0]
+
+class PlaceholderValidator(DocumentValidator):
+    """Comportamento original: aceita qualquer documento (dev sem motor de OCR)."""
+
+    name = 'placeholder'
+
+    def validate_batch(self, items):
+        return [{'valid': True, 'reason': 'placeholder'} for _ in items]
+
+class OcrCpfValidator(DocumentValidator):
+    """
+    OCR local com tesseract (via pytesseract) + busca de CPF com dígitos verificadores.
+    Um lote vira uma única execução do tesseract (lista de imagens num arquivo .txt),
+    que carrega o modelo do idioma uma vez só; as páginas saem separadas por form feed.
+    """
+
+    name = 'ocr_cpf'
+
+    def __init__(self, lang='por', tesseract_cmd=None, config=''):
+        try:
+            import pytesseract
+        except ImportError as e:
+            raise RuntimeError("DOCUMENT_VALIDATOR=ocr_cpf requires pytesseract (pip install pytesseract) and the tesseract binary.") from e
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        self._pytesseract = pytesseract
+        self.version = str(pytesseract.get_tesseract_version()) # Falha cedo se o binário não existir
+        available = set(pytesseract.get_languages(config=''))
+        missing = [code for code in lang.split('+') if code not in available]
+        if missing:
+            raise RuntimeError(f"Tesseract language data not installed: {', '.join(missing)}")
+        self.lang = lang
+        self.config = config
+
+    def _ocr_batch(self, paths):
+        if len(paths) == 1:
+            return [self._pytesseract.image_to_string(paths[0], lang=self.lang, config=self.config)]
+        workdir = tempfile.mkdtemp(prefix='ocr-batch-')
+        try:
+            list_path = os.path.join(workdir, 'images.txt')
+            with open(list_path, 'w') as f:
+                f.write('\n'.join(paths) + '\n')
+            pages = self._pytesseract.image_to_string(list_path, lang=self.lang, config=self.config).split('\f')
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        # Último elemento após o form feed final é vazio
+        if pages and not pages[-1].strip():
+            pages = pages[:-1]
+        if len(pages) != len(paths):
+            # Separação de páginas inesperada: refaz imagem por imagem
+            current_app.logger.warning(f"OCR batch returned {len(pages)} pages for {len(paths)} images, retrying one by one.")
+            return [self._pytesseract.image_to_string(path, lang=self.lang, config=self.config) for path in paths]
+        return pages
+
+    def validate_batch(self, items):
+        started = time.perf_counter()
+        texts = self._ocr_batch([item['image_path'] for item in items])
+        record_stage('ocr', time.perf_counter() - started, len(items))
+
+        started = time.perf_counter()
+        results = []
+        for item, text in zip(items, texts):
+            valid, reason, cpfs = match_document_text(text, item.get('expected_cpf'))
+            # Só os últimos dígitos dos CPFs lidos vão para o resultado do job
+            results.append({'valid': valid, 'reason': reason, 'cpfs_found': [f"***{cpf[-4:]}" for cpf in cpfs]})
+        record_stage('match', time.perf_counter() - started, len(items))
+        return results
+
+def _build_validator(config):
+    engine = (config.get('DOCUMENT_VALIDATOR') or 'auto').lower()
+    if engine == 'placeholder':
+        return PlaceholderValidator()
+    kwargs = {
+        'lang': config.get('OCR_LANG', 'por'),
+        'tesseract_cmd': config.get('TESSERACT_CMD'),
+        'config': config.get('OCR_TESSERACT_CONFIG', ''),
+    }
+    if engine == 'ocr_cpf':
+        return OcrCpfValidator(**kwargs)
+    if engine == 'auto':
+        try:
+            return OcrCpfValidator(**kwargs)
+        except Exception as e:
+            if not config.get('DEBUG'):
+                # Nenhum documento é aprovado sem OCR, a não ser com DOCUMENT_VALIDATOR=placeholder explícito
+                raise RuntimeError(f"OCR engine unavailable ({e}); set DOCUMENT_VALIDATOR=placeholder to accept documents without OCR.") from e
+            current_app.logger.warning(f"OCR engine unavailable ({e}); DEBUG is on, documents will be accepted by the placeholder validator.")
+            return PlaceholderValidator()
+    raise RuntimeError(f"Unknown DOCUMENT_VALIDATOR '{engine}' (use 'auto', 'ocr_cpf' or 'placeholder').")
+
+def get_document_validator():
+    """Validador do processo, carregado na primeira chamada (e de novo após fork)."""
+    global _validator, _validator_pid
+    pid = os.getpid()
+    if _validator is None or _validator_pid != pid:
+        with _validator_lock:
+            if _validator is None or _validator_pid != pid:
+                started = time.perf_counter()
+                _validator = _build_validator(current_app.config)
+                _validator_pid = pid
+                record_stage('load', time.perf_counter() - started)
+                current_app.logger.info(f"Document validator '{_validator.name}' loaded.")
+    return _validator
+
+def validate_documents(items):
+    """Valida um lote de documentos com o validador do processo (ver DocumentValidator)."""
+    if not items:
+        return []
+    results = get_document_validator().validate_batch(items)
+    with _stats_lock:
+        _stats['batches'] += 1
+        _stats['documents'] += len(items)
+    return results
@@ -0,0 +1,170 @@
+# backend/app/documents.py
+import io
+import multiprocessing
+import os
+import time
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from flask import current_app
+from app.storage import get_storage
+from app.document_validator import record_stage
+
+# Pré-processamento dos documentos enviados: derivados normalizados para a validação
+# (escala de cinza, rotação EXIF aplicada, lado máximo limitado; 1ª página de PDFs)
+# e miniaturas para pré-visualização. O trabalho de CPU roda num ProcessPoolExecutor;
+# os derivados ficam no storage ao lado do original e são reaproveitados.
+
+# Nome do derivado -> (sufixo da chave, content-type)
+DERIVATIVES = {
+    'normalized': ('normalized.png', 'image/png'),
+    'thumbnail': ('thumb.jpg', 'image/jpeg'),
+}
+
+_executor = None
+_executor_pid = None
+_executor_lock = Lock()
+
+class DocumentPreprocessingError(Exception):
+    """Documento que não pode ser decodificado (corrompido ou formato sem suporte)."""
+
+def derivative_key(document_key, name):
+    """Chave de um derivado, ao lado do original: documents/ab/<sha>.thumb.jpg"""
+    base = os.path.splitext(document_key)[0]
+    return f"{base}.{DERIVATIVES[name][0]}"
+
+def _get_preprocess_executor():
+    """
+    Pool de processos compartilhado (um por processo do app, recriado após fork).
+    Usa 'forkserver' quando disponível: fazer fork de um processo com threads
+    (pool HTTP, executors) pode herdar locks travados.
+    """
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _executor_lock:
+            if _executor is None or _executor_pid != pid:
+                workers = current_app.config.get('DOCUMENT_PREPROCESS_WORKERS') or os.cpu_count() or 1
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+                _executor_pid = pid
+    return _executor
+
+def shutdown_preprocess_executor(wait=True):
+    """Encerra o pool de processos (o próximo uso cria outro)."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=not wait)
+            _executor = None
+
+# --- Funções executadas nos processos do pool (sem acesso ao app/banco) ---
+
+def _load_first_page(path, max_side):
+    """Abre a imagem (ou rasteriza a 1ª página do PDF) já reduzida para ~max_side."""
+    from PIL import Image, ImageOps
+
+    if path.lower().endswith('.pdf'):
+        try:
+            import pypdfium2 as pdfium
+        except ImportError as e:
+            raise DocumentPreprocessingError("PDF preprocessing requires pypdfium2 (pip install pypdfium2).") from e
+        pdf = pdfium.PdfDocument(path)
+        try:
+            if len(pdf) == 0:
+                raise DocumentPreprocessingError("PDF has no pages.")
+            page = pdf[0]
+            width, height = page.get_size() # Em pontos (1/72")
+            scale = min(max_side / max(width, height), 300 / 72) # No máximo 300 dpi
+            return page.render(scale=scale).to_pil()
+        finally:
+            pdf.close()
+
+    image = Image.open(path)
+    # JPEG: decodifica direto numa escala reduzida (bem mais rápido que decodificar e reduzir)
+    image.draft('RGB', (max_side, max_side))
+    return ImageOps.exif_transpose(image)
+
+def render_derivatives(path, normalized_max_side=1600, thumbnail_max_side=256):
+    """Gera os derivados de um arquivo local. Retorna {nome: bytes codificados}."""
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        image = _load_first_page(path, normalized_max_side)
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as e:
+        raise DocumentPreprocessingError(f"Could not decode document: {e}") from e
+
+    normalized = image.convert('L')
+    normalized.thumbnail((normalized_max_side, normalized_max_side), Image.LANCZOS)
+    thumbnail = image.convert('RGB')
+    thumbnail.thumbnail((thumbnail_max_side, thumbnail_max_side), Image.LANCZOS)
+
+    outputs = {}
+    buffer = io.BytesIO()
+    normalized.save(buffer, format='PNG', optimize=False)
+    outputs['normalized'] = buffer.getvalue()
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, format='JPEG', quality=80)
+    outputs['thumbnail'] = buffer.getvalue()
+    return outputs
+
+# --- Orquestração (processo do app) ---
+
+def preprocess_documents(document_keys, force=False):
+    """
+    Garante os derivados de vários documentos, decodificando em paralelo no pool.
+    Retorna {chave do documento: {nome: chave do derivado}} ou a exceção daquele documento.
+    Derivados que já existem no storage (mesmo conteúdo enviado antes, ou validação
+    repetida) são reaproveitados: o original não é decodificado de novo.
+    """
+    storage = get_storage()
+    config = current_app.config
+    results = {}
+    pending = {}
+    for document_key in dict.fromkeys(document_keys):
+        keys = {name: derivative_key(document_key, name) for name in DERIVATIVES}
+        if not force and all(storage.exists(key) for key in keys.values()):
+            results[document_key] = keys
+        else:
+            pending[document_key] = keys
+    if not pending:
+        return results
+
+    started = time.perf_counter()
+    with ExitStack() as stack:
+        futures = {}
+        for document_key in pending:
+            try:
+                path = stack.enter_context(storage.local_path(document_key))
+            except Exception as e:
+                results[document_key] = e
+                continue
+            futures[document_key] = _get_preprocess_executor().submit(
+                render_derivatives, path,
+                config.get('DOCUMENT_NORMALIZED_MAX_SIDE', 1600),
+                config.get('DOCUMENT_THUMBNAIL_MAX_SIDE', 256),
+            )
+        for document_key, future in futures.items():
+            try:
+                outputs = future.result(timeout=config.get('DOCUMENT_PREPROCESS_TIMEOUT', 60))
+                for name, data in outputs.items():
+                    storage.put(pending[document_key][name], data, content_type=DERIVATIVES[name][1])
+                results[document_key] = pending[document_key]
+            except BrokenProcessPool as e:
+                # Um processo do pool morreu (ex: OOM): descarta o pool; o job tenta de novo
+                shutdown_preprocess_executor(wait=False)
+                results[document_key] = e
+            except Exception as e:
+                results[document_key] = e
+    record_stage('preprocess', time.perf_counter() - started, len(pending))
+    current_app.logger.info(f"Preprocessed {len(pending)} document(s).")
+    return results
+
+def preprocess_document(document_key, force=False):
+    """Derivados de um documento ({nome: chave}); levanta a exceção do pré-processamento."""
+    result = preprocess_documents([document_key], force=force)[document_key]
+    if isinstance(result, Exception):
+        raise result
+    return result
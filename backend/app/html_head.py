@@ -0,0 +1,87 @@
+# backend/app/html_head.py
+import codecs
+from html.parser import HTMLParser
+
+class HeadMetadataParser(HTMLParser):
+    """
+    Parser incremental que extrai apenas o <title> e o <meta name="description">.
+    Marca 'done' ao encontrar </head> ou <body>, para o chamador parar de ler a resposta.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.description = None
+        self.done = False
+        self._in_title = False
+        self._title_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title' and self.title is None:
+            self._in_title = True
+        elif tag == 'meta' and self.description is None:
+            attributes = {name.lower(): value for name, value in attrs}
+            if (attributes.get('name') or '').lower() == 'description' and attributes.get('content'):
+                self.description = attributes['content']
+        elif tag == 'body':
+            self.done = True
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == 'title' and self._in_title:
+            self._in_title = False
+            self.title = ' '.join(''.join(self._title_parts).split())
+        elif tag == 'head':
+            self.done = True
+
+class HeadMetadataExtractor:
+    """
+    Alimentado chunk a chunk (bytes) até </head>, <body> ou max_bytes; serve tanto para
+    respostas lidas de forma síncrona (requests) quanto assíncrona (httpx).
+    """
+
+    def __init__(self, encoding='utf-8', max_bytes=256 * 1024):
+        try:
+            self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._parser = HeadMetadataParser()
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def feed(self, chunk):
+        """Processa um chunk. Retorna True quando não é preciso ler mais nada."""
+        if chunk:
+            chunk = chunk[:self.max_bytes - self.bytes_read]
+            self.bytes_read += len(chunk)
+            self._parser.feed(self._decoder.decode(chunk))
+        return self._parser.done or self.bytes_read >= self.max_bytes
+
+    def finish(self, complete=False):
+        """Retorna (title, description, bytes_lidos). `complete`: a resposta foi lida até o fim."""
+        parser = self._parser
+        if complete:
+            parser.feed(self._decoder.decode(b'', final=True))
+        # <title> sem fechamento dentro do limite: usa o que foi lido
+        if parser.title is None and parser._title_parts:
+            parser.title = ' '.join(''.join(parser._title_parts).split())
+        parser.close()
+        return parser.title, parser.description, self.bytes_read
+
+def extract_head_metadata(chunks, encoding='utf-8', max_bytes=256 * 1024):
+    """
+    Lê os chunks (bytes) de uma resposta HTML até </head>, <body> ou max_bytes,
+    alimentando o parser incremental. Retorna (title, description, bytes_lidos).
+    A memória usada fica limitada ao tamanho do <head>, não ao da página.
+    """
+    extractor = HeadMetadataExtractor(encoding, max_bytes)
+    for chunk in chunks:
+        if extractor.feed(chunk):
+            return extractor.finish()
+    return extractor.finish(complete=True)
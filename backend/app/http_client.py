@@ -0,0 +1,71 @@
+# backend/app/http_client.py
+import os
+from threading import Lock
+from flask import current_app
+
+# Headers padrão para simular um navegador nas requisições de scraping
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9,pt-BR;q=0.8,pt;q=0.7',
+}
+
+# Sessão única por processo (keep-alive + pool de conexões por host)
+_session = None
+_session_pid = None
+_session_lock = Lock()
+
+def _build_session(config):
+    """Cria uma requests.Session com pool de conexões e retry com backoff."""
+    # requests/urllib3 só são importados na primeira requisição externa do processo
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    retry = Retry(
+        total=config.get('HTTP_MAX_RETRIES', 2),
+        backoff_factor=config.get('HTTP_BACKOFF_FACTOR', 0.5),
+        status_forcelist=(500, 502, 503, 504), # 429 vai direto para o circuit breaker (app/outbound.py)
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False, # Devolve a última resposta; raise_for_status trata o erro
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config.get('HTTP_POOL_CONNECTIONS', 10), # Nº de hosts com pool mantido
+        pool_maxsize=config.get('HTTP_POOL_MAXSIZE', 4), # Conexões simultâneas por host
+        pool_block=True, # Respeita o limite por host em vez de abrir conexões extras
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def get_http_session():
+    """
+    Retorna a sessão HTTP compartilhada pelo processo, criando-a na primeira chamada.
+    Se o processo foi "forkado" (ex: gunicorn), cria uma sessão nova para não
+    compartilhar sockets com o processo pai.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session(current_app.config)
+                _session_pid = pid
+    return _session
+
+def reset_http_session():
+    """Descarta a sessão do processo (ex: após fork com --preload); a próxima chamada cria outra."""
+    global _session, _session_pid
+    with _session_lock:
+        _session = None
+        _session_pid = None
+
+def get_http_timeout():
+    """Timeout (connect, read) configurado para requisições externas."""
+    return (
+        current_app.config.get('HTTP_CONNECT_TIMEOUT', 3.05),
+        current_app.config.get('HTTP_READ_TIMEOUT', 10),
+    )
@@ -0,0 +1,357 @@
+# backend/app/jobs.py
+import json
+import math
+import os
+import socket
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app import db
+from app.models import FanProfile, ValidationJob
+from app import tracing
+from prometheus_client import Counter
+
+# Fila de validações em background baseada na tabela validation_job.
+# As rotas só gravam o job (202 + id); `flask jobs work` executa os handlers.
+
+JOB_DOCUMENT_VALIDATION = 'document_validation'
+JOB_ESPORTS_LINK_VALIDATION = 'esports_link_validation'
+
+_handlers = {}
+_batch_handlers = {}
+
+class RetryLater(Exception):
+    """Falha transitória com prazo conhecido (ex: host externo indisponível): a próxima tentativa espera ao menos retry_after segundos."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+jobs_finished = Counter('kyf_jobs_finished', 'Execuções de jobs por tipo e resultado.', ('kind', 'status'))
+
+def job_handler(kind):
+    """Registra a função que processa jobs do tipo `kind`: handler(job, profile, payload) -> dict."""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+def batch_job_handler(kind):
+    """
+    Registra a versão em lote de um handler: handler([(job, profile, payload), ...]) ->
+    lista (na mesma ordem) de dicts de resultado ou exceções por job.
+    Usada pelo worker quando pega mais de um job do mesmo tipo.
+    """
+    def decorator(func):
+        _batch_handlers[kind] = func
+        return func
+    return decorator
+
+def enqueue_job(kind, profile, payload, idempotency_key=None):
+    """
+    Adiciona um job na sessão atual (o commit fica a cargo da rota, junto com a
+    alteração do perfil). Com idempotency_key, reenvios devolvem o job já existente.
+    Retorna (job, created).
+    """
+    if idempotency_key:
+        idempotency_key = scoped_idempotency_key(kind, profile.id, idempotency_key)
+        existing = ValidationJob.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing:
+            return existing, False
+
+    job = build_job(kind, profile.id, payload, idempotency_key)
+    db.session.add(job)
+    return job, True
+
+def scoped_idempotency_key(kind, profile_id, idempotency_key):
+    """Idempotency-Key do cliente restrita ao tipo de job e ao perfil."""
+    return f"{kind}:{profile_id}:{idempotency_key}"[:160]
+
+def build_job(kind, profile_id, payload, idempotency_key=None):
+    """Novo job na fila (ainda fora da sessão)."""
+    return ValidationJob(
+        id=uuid.uuid4().hex,
+        kind=kind,
+        profile_id=profile_id,
+        payload=json.dumps(payload),
+        idempotency_key=idempotency_key,
+        status='queued',
+        max_attempts=current_app.config.get('JOB_MAX_ATTEMPTS', 3),
+        run_after=datetime.utcnow(),
+    )
+
+def dispatch_job(job):
+    """Chamado após o commit: com JOBS_EAGER (dev local sem worker) executa o job na hora."""
+    if current_app.config.get('JOBS_EAGER') and job.status == 'queued':
+        if _claim(job.id, 'eager'):
+            db.session.refresh(job)
+            run_job(job)
+
+def get_queue_depth():
+    """Quantidade de jobs aguardando execução."""
+    return ValidationJob.query.filter_by(status='queued').count()
+
+def set_job_progress(job, progress):
+    """Atualiza o progresso (0-100) de um job em execução."""
+    job.progress = max(0, min(100, int(progress)))
+    db.session.commit()
+
+def _claim(job_id, worker_id):
+    """Marca o job como 'running' se ainda estiver 'queued' (UPDATE condicional, seguro entre workers)."""
+    table = ValidationJob.__table__
+    now = datetime.utcnow()
+    claimed = db.session.execute(
+        table.update()
+        .where(table.c.id == job_id, table.c.status == 'queued')
+        .values(status='running', locked_by=worker_id, locked_at=now,
+                attempts=table.c.attempts + 1, updated_at=now)
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+def claim_jobs(worker_id, limit=1):
+    """Pega até `limit` jobs prontos para execução, em ordem de chegada."""
+    candidates = db.session.execute(
+        db.select(ValidationJob.id)
+        .where(ValidationJob.status == 'queued', ValidationJob.run_after <= datetime.utcnow())
+        .order_by(ValidationJob.created_at)
+        .limit(limit * 2) # Margem para jobs pegos por outros workers no meio do caminho
+    ).scalars().all()
+    claimed = []
+    for job_id in candidates:
+        if len(claimed) >= limit:
+            break
+        if _claim(job_id, worker_id):
+            claimed.append(db.session.get(ValidationJob, job_id))
+    return claimed
+
+def requeue_stale_jobs():
+    """Devolve para a fila jobs 'running' cujo worker morreu (lock mais antigo que JOB_LOCK_TIMEOUT)."""
+    timeout = current_app.config.get('JOB_LOCK_TIMEOUT', 300)
+    table = ValidationJob.__table__
+    requeued = db.session.execute(
+        table.update()
+        .where(table.c.status == 'running', table.c.locked_at < datetime.utcnow() - timedelta(seconds=timeout))
+        .values(status='queued', locked_by=None, locked_at=None)
+    ).rowcount
+    db.session.commit()
+    if requeued:
+        current_app.logger.warning(f"Requeued {requeued} stale job(s).")
+    return requeued
+
+def mark_job_succeeded(job, result):
+    """Grava o resultado no job (o commit fica com o chamador)."""
+    job.result = json.dumps(result or {})
+    job.status = 'succeeded'
+    job.progress = 100
+    job.error = None
+    job.locked_by = job.locked_at = None
+    jobs_finished.labels(kind=job.kind, status='succeeded').inc()
+    current_app.logger.info(f"Job {job.id} ({job.kind}) succeeded.")
+
+def _is_deferral(job, e):
+    """RetryLater dentro de JOB_MAX_DEFER_SECONDS desde a criação do job (depois disso conta como falha)."""
+    if not isinstance(e, RetryLater) or job.created_at is None:
+        return False
+    max_defer = current_app.config.get('JOB_MAX_DEFER_SECONDS', 6 * 3600)
+    return job.created_at > datetime.utcnow() - timedelta(seconds=max_defer)
+
+def mark_job_failed(job, e):
+    """Registra o erro e agenda nova tentativa com backoff (ou no prazo de um RetryLater), ou marca como 'failed' (o commit fica com o chamador)."""
+    job.error = str(e)
+    job.locked_by = job.locked_at = None
+    if _is_deferral(job, e):
+        # Ex: circuito do host aberto; a tentativa não chegou a ser feita
+        delay = math.ceil(e.retry_after)
+        job.attempts = max(job.attempts - 1, 0)
+        job.status = 'queued'
+        job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+        current_app.logger.warning(f"Job {job.id} ({job.kind}) deferred for {delay}s: {e}")
+        jobs_finished.labels(kind=job.kind, status='deferred').inc()
+        return
+    if job.attempts < job.max_attempts:
+        backoff = current_app.config.get('JOB_RETRY_BACKOFF', 30) * (2 ** (job.attempts - 1))
+        job.status = 'queued'
+        job.run_after = datetime.utcnow() + timedelta(seconds=backoff)
+        current_app.logger.warning(f"Job {job.id} ({job.kind}) failed on attempt {job.attempts}, retrying in {backoff}s: {e}")
+    else:
+        job.status = 'failed'
+        current_app.logger.error(f"Job {job.id} ({job.kind}) failed permanently after {job.attempts} attempts: {e}")
+    jobs_finished.labels(kind=job.kind, status='failed' if job.status == 'failed' else 'retried').inc()
+
+def _complete_job(job, result):
+    mark_job_succeeded(job, result)
+    db.session.commit()
+    return job
+
+def _fail_job(job_id, e):
+    db.session.rollback()
+    job = db.session.get(ValidationJob, job_id)
+    mark_job_failed(job, e)
+    db.session.commit()
+    return job
+
+def run_job(job):
+    """Executa o handler do job, registrando resultado, erro e nova tentativa com backoff."""
+    handler = _handlers.get(job.kind)
+    job_id = job.id # Um commit que falha expira o job: ler o id depois dele exigiria o rollback antes
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job kind '{job.kind}'")
+        profile = db.session.get(FanProfile, job.profile_id)
+        if profile is None:
+            raise LookupError(f"Profile {job.profile_id} no longer exists")
+        return _complete_job(job, handler(job, profile, json.loads(job.payload or '{}')))
+    except Exception as e:
+        # Ex: perfil alterado no meio (versão diferente): nova tentativa pela fila
+        return _fail_job(job_id, e)
+
+def run_job_batch(jobs):
+    """
+    Executa jobs do mesmo tipo num único lote (ex: OCR de vários documentos de uma vez).
+    Cada job é confirmado separadamente; se o lote inteiro falhar, roda um a um.
+    """
+    handler = _batch_handlers.get(jobs[0].kind) if jobs else None
+    if handler is None or len(jobs) == 1:
+        return [run_job(job) for job in jobs]
+    entries = []
+    for job in jobs:
+        profile = db.session.get(FanProfile, job.profile_id)
+        if profile is None:
+            _fail_job(job.id, LookupError(f"Profile {job.profile_id} no longer exists"))
+            continue
+        entries.append((job, profile, json.loads(job.payload or '{}')))
+    try:
+        results = handler(entries)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning(f"Batch of {len(entries)} {jobs[0].kind} job(s) failed, running one by one: {e}")
+        return [run_job(db.session.get(ValidationJob, job.id)) for job, _, _ in entries]
+    # Sucessos primeiro: as alterações nos perfis vão no commit deles, antes do rollback de _fail_job
+    outcomes = list(zip([job for job, _, _ in entries], results))
+    finished = [_complete_job(job, result) for job, result in outcomes if not isinstance(result, Exception)]
+    finished += [_fail_job(job.id, result) for job, result in outcomes if isinstance(result, Exception)]
+    return finished
+
+def run_worker(burst=False, poll_interval=None, batch_size=None):
+    """Loop do worker. Com burst=True processa o que houver na fila e retorna."""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    poll_interval = poll_interval or current_app.config.get('JOB_POLL_INTERVAL', 2)
+    batch_size = batch_size or current_app.config.get('JOB_BATCH_SIZE', 4)
+    current_app.logger.info(f"Job worker {worker_id} started (burst={burst}).")
+    processed = 0
+    while True:
+        requeue_stale_jobs()
+        jobs = claim_jobs(worker_id, limit=batch_size)
+        by_kind = {}
+        for job in jobs:
+            by_kind.setdefault(job.kind, []).append(job)
+        for kind, kind_jobs in by_kind.items():
+            span = tracing.start_span(f"job {kind}", attributes={'job.count': len(kind_jobs)}, root=True)
+            try:
+                run_job_batch(kind_jobs)
+            finally:
+                tracing.end_span(span)
+            processed += len(kind_jobs)
+        db.session.remove()
+        if not jobs:
+            if burst:
+                break
+            time.sleep(poll_interval)
+    return processed
+
+# --- Handlers ---
+
+@job_handler(JOB_ESPORTS_LINK_VALIDATION)
+def _validate_esports_links_job(job, profile, payload):
+    from app.services import check_esports_links
+    links = payload.get('links') or {}
+    return apply_link_verdicts(profile, links, check_esports_links(links, defer_unavailable=True))
+
+def apply_link_verdicts(profile, links, verdicts):
+    """Grava os vereditos no perfil e retorna o resultado do job de validação de links."""
+    validation_results = {platform: verdict['relevant'] for platform, verdict in verdicts.items()}
+    # Só aplica o resultado se os links do perfil ainda forem os deste job
+    if profile.esports_profile_links != links:
+        return {'validation_results': validation_results, 'superseded': True}
+    profile.esports_link_validations = {
+        platform: dict(verdict, url=links[platform]) for platform, verdict in verdicts.items()
+    }
+    profile.esports_links_validated = all(validation_results.values())
+    return {'validation_results': validation_results, 'validated': profile.esports_links_validated}
+
+@job_handler(JOB_DOCUMENT_VALIDATION)
+def _validate_document_job(job, profile, payload):
+    result = _validate_documents_batch([(job, profile, payload)])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+@batch_job_handler(JOB_DOCUMENT_VALIDATION)
+def _validate_documents_batch(entries):
+    from app.documents import preprocess_documents, DocumentPreprocessingError
+    from app.document_validator import validate_documents
+    from app.storage import get_storage
+    # Jobs antigos guardavam o caminho do arquivo em 'file_path'
+    keys = [payload.get('document_key') or payload.get('file_path') for _, _, payload in entries]
+    derivatives = preprocess_documents(keys)
+
+    results = [None] * len(entries)
+    to_validate = []
+    for index, key in enumerate(keys):
+        prepared = derivatives[key]
+        if isinstance(prepared, DocumentPreprocessingError):
+            # Arquivo ilegível: não adianta tentar de novo
+            current_app.logger.warning(f"Document {key} could not be preprocessed: {prepared}")
+            results[index] = {'valid': False, 'reason': 'unreadable_document'}
+        elif isinstance(prepared, Exception):
+            results[index] = prepared
+        else:
+            to_validate.append(index)
+
+    if to_validate:
+        # O validador recebe as imagens normalizadas, nunca o original
+        with ExitStack() as stack:
+            items = [{
+                'image_path': stack.enter_context(get_storage().local_path(derivatives[keys[index]]['normalized'])),
+                'expected_cpf': entries[index][1].cpf,
+            } for index in to_validate]
+            for index, verdict in zip(to_validate, validate_documents(items)):
+                results[index] = dict(verdict, derivatives=derivatives[keys[index]])
+
+    # dHash da miniatura para o índice de documentos parecidos (app/dedup.py)
+    from app.dedup import fingerprint_documents
+    fingerprint_documents([
+        (profile.id, key, derivatives[key]['thumbnail'])
+        for (_, profile, _), key in zip(entries, keys)
+        if profile.document_path == key and not isinstance(derivatives[key], Exception)
+    ])
+
+    outcomes = []
+    for (job, profile, _), key, verdict in zip(entries, keys, results):
+        if isinstance(verdict, Exception):
+            outcomes.append(verdict)
+            continue
+        outcome = {'validated': verdict['valid'], 'details': verdict}
+        if profile.document_path != key:
+            outcome['superseded'] = True
+        else:
+            profile.document_validated = verdict['valid']
+        outcomes.append(outcome)
+    return outcomes
+
+# --- Comandos CLI (flask jobs ...) ---
+
+jobs_cli = AppGroup('jobs', help='Fila de validações em background.')
+
+@jobs_cli.command('work')
+@click.option('--burst', is_flag=True, help='Processa os jobs pendentes e sai.')
+@click.option('--poll-interval', type=float, default=None, help='Segundos entre consultas à fila vazia.')
+def work_command(burst, poll_interval):
+    """Inicia um worker que processa a fila de validações."""
+    processed = run_worker(burst=burst, poll_interval=poll_interval)
+    click.echo(f"Processed {processed} job(s).")
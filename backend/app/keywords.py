@@ -0,0 +1,125 @@
+# backend/app/keywords.py
+import re
+from threading import Lock
+from flask import current_app
+
+# Keywords padrão procuradas na URL (substring) e no title/meta das páginas (palavra inteira).
+# Podem ser sobrescritas por ESPORTS_URL_KEYWORDS / ESPORTS_CONTENT_KEYWORDS na config.
+URL_KEYWORDS = [
+    "hltv", "faceit", "steamcommunity", "challengermode", "op.gg",
+    "twitch.tv", "gamersclub", "liquipedia", "furia", "player",
+    "team", "profile", "stats", "user", "pro", "esports", "u", "id"
+]
+CONTENT_KEYWORDS = [
+    "furia", "esports", "e-sports", "csgo", "cs:go", "counter-strike",
+    "valorant", "league of legends", "lol", "player", "jogador", "team",
+    "time", "stats", "statistics", "estatisticas", "ranking", "match",
+    "partida", "hltv", "faceit", "gamers club", "challengermode",
+    "steam", "twitch", "streamer", "pro player", "professional player",
+    "game", "jogo", "art", "fallen", "kscerato", "yuurih", "guerri", "gaules"
+]
+# Mínimo de keywords distintas no title/meta para considerar o link relevante
+MIN_CONTENT_KEYWORD_THRESHOLD = 2
+
+def _trie_regex(words):
+    """
+    Monta uma alternação em forma de trie (ex: 'pro(?: player)?') a partir das palavras.
+    O motor de regex descarta ramos pelo primeiro caractere, então cada posição do
+    texto é testada uma vez contra todas as keywords, em vez de uma vez por keyword.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {} # Fim de palavra
+
+    def build(node):
+        is_end = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if is_end:
+            # Ramo opcional e guloso: tenta primeiro a keyword mais longa
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    return build(trie)
+
+class KeywordMatcher:
+    """
+    Casa várias keywords em uma única passada pelo texto.
+    Com whole_words=True segue a mesma regra de r'\\b<keyword>\\b' por keyword.
+    """
+
+    def __init__(self, keywords, whole_words=True):
+        self.keywords = list(dict.fromkeys(k.lower() for k in keywords if k))
+        self.whole_words = whole_words
+        self._order = {keyword: index for index, keyword in enumerate(self.keywords)}
+        alternation = _trie_regex(self.keywords) if self.keywords else '(?!)'
+        if whole_words:
+            # Lookahead para não consumir texto: keywords sobrepostas ('pro player'/'player') casam todas
+            self._regex = re.compile(r'\b(?=(' + alternation + r')\b)')
+        else:
+            self._regex = re.compile(alternation)
+        # Keywords que são prefixo de outra com fronteira de palavra no ponto de corte
+        # ('gamers' dentro de 'gamers club'): quando a maior casa, a menor também casaria
+        self._implied = {}
+        if whole_words:
+            boundary = re.compile(r'\b')
+            for longer in self.keywords:
+                for shorter in self.keywords:
+                    if shorter != longer and longer.startswith(shorter) \
+                            and boundary.match(longer, len(shorter)) is not None:
+                        self._implied.setdefault(longer, []).append(shorter)
+
+    def search(self, text):
+        """True se alguma keyword aparecer no texto (texto já em minúsculas)."""
+        return self._regex.search(text) is not None
+
+    def find_all(self, text):
+        """Keywords distintas encontradas no texto (já em minúsculas), na ordem da lista configurada."""
+        if self.whole_words:
+            found = set()
+            for match in self._regex.finditer(text):
+                keyword = match.group(1)
+                found.add(keyword)
+                found.update(self._implied.get(keyword, ()))
+        else:
+            found = set(self._regex.findall(text))
+        return sorted(found, key=self._order.__getitem__)
+
+# Compilados uma vez no import; a config só gera novos matchers se mudar as listas
+_DEFAULT_URL_MATCHER = KeywordMatcher(URL_KEYWORDS, whole_words=False)
+_DEFAULT_CONTENT_MATCHER = KeywordMatcher(CONTENT_KEYWORDS, whole_words=True)
+_matchers = {}
+_matchers_lock = Lock()
+
+def _matcher_for(keywords, whole_words, default):
+    if not keywords:
+        return default
+    key = (tuple(keywords), whole_words)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        with _matchers_lock:
+            matcher = _matchers.get(key)
+            if matcher is None:
+                matcher = _matchers[key] = KeywordMatcher(keywords, whole_words=whole_words)
+    return matcher
+
+def get_url_matcher():
+    """Matcher de keywords da URL (substring), conforme ESPORTS_URL_KEYWORDS."""
+    return _matcher_for(current_app.config.get('ESPORTS_URL_KEYWORDS'), False, _DEFAULT_URL_MATCHER)
+
+def get_content_matcher():
+    """Matcher de keywords do title/meta (palavra inteira), conforme ESPORTS_CONTENT_KEYWORDS."""
+    return _matcher_for(current_app.config.get('ESPORTS_CONTENT_KEYWORDS'), True, _DEFAULT_CONTENT_MATCHER)
+
+def get_min_content_keywords():
+    return current_app.config.get('ESPORTS_MIN_CONTENT_KEYWORDS', MIN_CONTENT_KEYWORD_THRESHOLD)
+
+def reload_keyword_matchers():
+    """Descarta os matchers compilados a partir da config (ex: após alterar as listas em runtime)."""
+    with _matchers_lock:
+        _matchers.clear()
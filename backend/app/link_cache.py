@@ -0,0 +1,192 @@
+# backend/app/link_cache.py
+import json
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from flask import current_app
+from prometheus_client import Counter, Gauge
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app import db
+from app.models import LinkValidationCache
+
+# Cache de vereditos de relevância de links eSports em dois níveis:
+# 1. LRU em memória (por processo)
+# 2. Tabela link_validation_cache (compartilhada entre workers)
+
+_memory = OrderedDict()
+_memory_lock = Lock()
+
+_stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'stale': 0, 'revalidated': 0, 'stores': 0}
+_stats_lock = Lock()
+
+# Parâmetros de rastreamento que não mudam o conteúdo da página
+_TRACKING_PARAMS_PREFIXES = ('utm_',)
+_TRACKING_PARAMS = {'fbclid', 'gclid', 'ref'}
+
+cache_events = Counter('kyf_link_cache_events', 'Eventos do cache de links.', ('event',))
+cache_hit_ratio = Gauge('kyf_link_cache_hit_ratio', 'Fração de consultas ao cache de links atendidas (memória ou banco).', multiprocess_mode='liveall')
+
+def _hit_ratio(stats):
+    lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses'] + stats['stale']
+    return round((stats['memory_hits'] + stats['db_hits']) / lookups, 4) if lookups else None
+
+def _count(stat):
+    with _stats_lock:
+        _stats[stat] += 1
+        ratio = _hit_ratio(_stats)
+    cache_events.labels(event=stat).inc()
+    if ratio is not None:
+        cache_hit_ratio.set(ratio)
+
+def get_cache_stats():
+    """Contadores de hit/miss do cache (por processo) e tamanho atual do LRU."""
+    with _stats_lock:
+        stats = dict(_stats)
+    with _memory_lock:
+        stats['memory_entries'] = len(_memory)
+    stats['hit_ratio'] = _hit_ratio(stats)
+    return stats
+
+def clear_memory_cache():
+    """Esvazia o nível em memória (o nível do banco é mantido)."""
+    with _memory_lock:
+        _memory.clear()
+
+def normalize_url(url):
+    """
+    Normaliza a URL para servir de chave do cache: esquema/host em minúsculas, sem porta
+    padrão, sem fragmento, sem barra final e com a query ordenada e sem parâmetros de rastreamento.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    port = parts.port
+    netloc = host if not port or (scheme, port) in (('http', 80), ('https', 443)) else f"{host}:{port}"
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith(_TRACKING_PARAMS_PREFIXES)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+def _url_hash(normalized_url):
+    return hashlib.sha256(normalized_url.encode('utf-8')).hexdigest()
+
+def make_verdict(relevant, matched_keywords=None, checked_at=None):
+    """Formato público do veredito de um link (usado nas respostas da API)."""
+    checked_at = checked_at or datetime.utcnow()
+    return {
+        'relevant': bool(relevant),
+        'matched_keywords': list(matched_keywords or []),
+        'checked_at': checked_at.isoformat() + 'Z',
+    }
+
+def _ttl_for(relevant):
+    config = current_app.config
+    seconds = config.get('LINK_CACHE_POSITIVE_TTL', 7 * 24 * 3600) if relevant else config.get('LINK_CACHE_NEGATIVE_TTL', 3600)
+    return timedelta(seconds=seconds)
+
+def _remember(key, entry):
+    max_entries = current_app.config.get('LINK_CACHE_MAX_ENTRIES', 2048)
+    with _memory_lock:
+        _memory[key] = entry
+        _memory.move_to_end(key)
+        while len(_memory) > max_entries:
+            _memory.popitem(last=False)
+
+def _db_enabled():
+    return current_app.config.get('LINK_CACHE_DB_ENABLED', True)
+
+def lookup(url):
+    """
+    Procura o veredito de uma URL. Retorna None (miss) ou a entrada com a chave
+    'fresh' indicando se ainda está dentro do TTL. Entradas expiradas continuam
+    úteis para revalidação condicional (ETag/Last-Modified).
+    """
+    key = _url_hash(normalize_url(url))
+    now = datetime.utcnow()
+
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            _memory.move_to_end(key)
+    if entry is not None and entry['expires_at'] > now:
+        _count('memory_hits')
+        return dict(entry, fresh=True)
+
+    # Entrada expirada na memória: outro worker pode já ter revalidado a URL no banco
+    if _db_enabled():
+        try:
+            with db.engine.connect() as conn:
+                row = conn.execute(
+                    db.select(LinkValidationCache.__table__).where(LinkValidationCache.url_hash == key)
+                ).mappings().first()
+        except SQLAlchemyError as e:
+            current_app.logger.warning(f"Link cache DB lookup failed for '{url}': {e}")
+            row = None
+        if row is not None and (entry is None or row['checked_at'] >= entry['checked_at']):
+            entry = {
+                'url': row['url'],
+                'relevant': bool(row['relevant']),
+                'matched_keywords': json.loads(row['matched_keywords'] or '[]'),
+                'etag': row['etag'],
+                'last_modified': row['last_modified'],
+                'checked_at': row['checked_at'],
+                'expires_at': row['expires_at'],
+            }
+            _remember(key, entry)
+            if entry['expires_at'] > now:
+                _count('db_hits')
+                return dict(entry, fresh=True)
+
+    if entry is None:
+        _count('misses')
+        return None
+    _count('stale')
+    return dict(entry, fresh=False)
+
+def store(url, relevant, matched_keywords, etag=None, last_modified=None):
+    """Grava o veredito nos dois níveis do cache e retorna a entrada gravada."""
+    normalized = normalize_url(url)
+    key = _url_hash(normalized)
+    now = datetime.utcnow()
+    entry = {
+        'url': normalized,
+        'relevant': bool(relevant),
+        'matched_keywords': list(matched_keywords or []),
+        'etag': etag,
+        'last_modified': last_modified,
+        'checked_at': now,
+        'expires_at': now + _ttl_for(relevant),
+    }
+    _remember(key, entry)
+    _count('stores')
+
+    if _db_enabled():
+        values = dict(entry, matched_keywords=json.dumps(entry['matched_keywords']))
+        table = LinkValidationCache.__table__
+        try:
+            with db.engine.begin() as conn:
+                updated = conn.execute(
+                    table.update().where(table.c.url_hash == key).values(**values)
+                ).rowcount
+                if not updated:
+                    conn.execute(table.insert().values(url_hash=key, **values))
+        except IntegrityError:
+            # Outro worker gravou a mesma URL ao mesmo tempo; o veredito dele é equivalente
+            pass
+        except SQLAlchemyError as e:
+            current_app.logger.warning(f"Link cache DB store failed for '{url}': {e}")
+    return entry
+
+def revalidate(url, cached):
+    """Renova o TTL de uma entrada após resposta 304 (conteúdo não mudou)."""
+    _count('revalidated')
+    return store(
+        url, cached['relevant'], cached['matched_keywords'],
+        etag=cached.get('etag'), last_modified=cached.get('last_modified'),
+    )
@@ -0,0 +1,200 @@
+# backend/app/metrics.py
+import os
+import time
+from contextvars import ContextVar
+from urllib.parse import urlsplit
+from flask import Response, current_app, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, disable_created_metrics,
+    generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import tracing
+
+# Métricas expostas em /metrics no formato texto do Prometheus (prometheus_client): latência por
+# rota, queries SQL (via eventos do SQLAlchemy), latência das requisições externas por host, caches,
+# fila de jobs e etapas da validação de documentos. Os módulos declaram as próprias métricas
+# (ex: jobs_finished em app/jobs.py) e as incrementam direto.
+# Com gunicorn, PROMETHEUS_MULTIPROC_DIR (definida no gunicorn.conf.py antes de carregar o app)
+# põe o prometheus_client no modo multiprocesso: cada worker grava seus valores em arquivos
+# mmap nessa pasta e /metrics soma os de todos os workers (MultiProcessCollector). Contadores
+# de workers encerrados continuam somados; os gauges deles saem em child_exit (mark_process_dead).
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+disable_created_metrics() # Sem as séries *_created: só valores
+
+# Estado da requisição atual (queries executadas), visível nos eventos do SQLAlchemy
+_request_state = ContextVar('kyf_request_state', default=None)
+
+def _multiproc_dir():
+    return os.environ.get('PROMETHEUS_MULTIPROC_DIR') or None
+
+def render_metrics():
+    """Todas as métricas no formato texto do Prometheus, somadas entre os workers no modo multiprocesso."""
+    if _multiproc_dir() is None:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(_shared_state)
+    return generate_latest(registry)
+
+# --- Métricas da aplicação ---
+
+http_requests = Counter('kyf_http_requests', 'Requisições HTTP atendidas.', ('method', 'route', 'status'))
+http_request_duration = Histogram('kyf_http_request_duration_seconds', 'Latência das requisições HTTP (até o início da resposta).', ('method', 'route'))
+http_request_queries = Histogram('kyf_http_request_db_queries', 'Queries SQL por requisição.', ('method', 'route'), buckets=QUERY_COUNT_BUCKETS)
+db_queries = Counter('kyf_db_queries', 'Queries SQL executadas.', ('operation',))
+db_query_duration = Histogram('kyf_db_query_duration_seconds', 'Duração das queries SQL.', ('operation',))
+db_query_errors = Counter('kyf_db_query_errors', 'Queries SQL que falharam.', ('operation',))
+outbound_duration = Histogram('kyf_outbound_request_duration_seconds', 'Latência das requisições externas (scraping) por host.', ('host', 'status'))
+
+class _SharedStateCollector:
+    """
+    Estado comum a todos os workers (banco), lido na coleta por quem atende /metrics:
+    profundidade da fila de jobs e circuit breaker de cada host externo.
+    """
+
+    def _families(self):
+        depth = GaugeMetricFamily('kyf_job_queue_depth', 'Jobs de validação aguardando execução.')
+        circuits = GaugeMetricFamily(
+            'kyf_outbound_circuit_state', 'Estado do circuit breaker de cada host externo (1 no estado atual).',
+            labels=('host', 'state'))
+        return depth, circuits
+
+    def describe(self):
+        # Nomes para o registro, sem consultar o banco (o registro é feito fora do contexto do app)
+        return list(self._families())
+
+    def collect(self):
+        from app.jobs import get_queue_depth
+        from app.outbound import get_host_states
+        depth, circuits = self._families()
+        try:
+            depth.add_metric((), get_queue_depth())
+            for host in get_host_states():
+                circuits.add_metric((host['host'], host['state']), 1)
+        except Exception as e:
+            current_app.logger.warning(f"Could not read shared metrics state: {e}")
+        return [depth, circuits]
+
+_shared_state = _SharedStateCollector()
+if _multiproc_dir() is None:
+    REGISTRY.register(_shared_state) # No modo multiprocesso, entra no registro montado a cada scrape
+
+# --- Chamadas externas ---
+
+class OutboundCall:
+    """Mede uma requisição externa: crie antes do request, defina `status` e chame finish()."""
+
+    __slots__ = ('host', 'status', '_started', '_span')
+
+    def __init__(self, url):
+        self.host = (urlsplit(url).hostname or 'unknown').lower()
+        self.status = None
+        self._started = time.perf_counter()
+        self._span = tracing.start_span(f"GET {self.host}", tracing.SPAN_KIND_CLIENT, {'http.method': 'GET', 'server.address': self.host})
+
+    def finish(self):
+        status = str(self.status) if self.status is not None else 'error'
+        outbound_duration.labels(host=self.host, status=status).observe(time.perf_counter() - self._started)
+        if self._span is not None:
+            self._span.set_attribute('http.status_code', self.status)
+            tracing.end_span(self._span, error=None if self.status and self.status < 500 else f"status {status}")
+
+# --- Instrumentação (registrada em create_app) ---
+
+def _operation(statement):
+    head = statement.lstrip()[:10].split(None, 1)
+    operation = head[0].upper() if head else ''
+    return operation if operation in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH') else 'OTHER'
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = tracing.start_span('db.query', tracing.SPAN_KIND_CLIENT, {'db.system': conn.dialect.name, 'db.operation': _operation(statement)})
+    conn.info.setdefault('kyf_query_start', []).append((time.perf_counter(), span))
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started, span = conn.info['kyf_query_start'].pop()
+    elapsed = time.perf_counter() - started
+    operation = _operation(statement)
+    db_queries.labels(operation=operation).inc()
+    db_query_duration.labels(operation=operation).observe(elapsed)
+    state = _request_state.get()
+    if state is not None:
+        state['queries'] += 1
+    tracing.end_span(span)
+
+def _handle_db_error(exception_context):
+    stack = exception_context.connection.info.get('kyf_query_start') if exception_context.connection is not None else None
+    if stack:
+        _, span = stack.pop()
+        tracing.end_span(span, error=exception_context.original_exception)
+    db_query_errors.labels(operation=_operation(exception_context.statement or '')).inc()
+
+_db_events_registered = False
+
+def _register_db_events():
+    global _db_events_registered
+    if not _db_events_registered:
+        # Em Engine (classe): vale para todas as engines, inclusive as das migrações
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_db_error)
+        _db_events_registered = True
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_state_token = _request_state.set({'queries': 0})
+    g.metrics_span = tracing.start_span(
+        f"{request.method} {_route_label()}", tracing.SPAN_KIND_SERVER,
+        {'http.method': request.method, 'http.route': _route_label()},
+        root=True, traceparent=request.headers.get('traceparent'),
+    )
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    route = _route_label()
+    elapsed = time.perf_counter() - started
+    http_requests.labels(method=request.method, route=route, status=response.status_code).inc()
+    http_request_duration.labels(method=request.method, route=route).observe(elapsed)
+    state = _request_state.get()
+    if state is not None:
+        http_request_queries.labels(method=request.method, route=route).observe(state['queries'])
+    span = g.pop('metrics_span', None)
+    if span is not None:
+        span.set_attribute('http.status_code', response.status_code)
+        if state is not None:
+            span.set_attribute('db.query_count', state['queries'])
+        tracing.end_span(span, error=f"status {response.status_code}" if response.status_code >= 500 else None)
+    return response
+
+def _teardown_request(exc):
+    # Fecha o que _after_request não fechou (ex: exceção antes da resposta)
+    tracing.end_span(g.pop('metrics_span', None), error=exc)
+    token = g.pop('metrics_state_token', None)
+    if token is not None:
+        try:
+            _request_state.reset(token)
+        except ValueError:
+            _request_state.set(None)
+
+def metrics_view():
+    return Response(render_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+def init_metrics(app):
+    """Registra a instrumentação e a rota /metrics (fora do prefixo /api)."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    _register_db_events()
+    tracing.init_tracing(app.config)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view, methods=['GET'])
@@ -1,8 +1,34 @@
 # backend/app/models.py
+import json
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB
 from app import db
 
+# JSON nativo: JSONB no PostgreSQL (indexável com GIN), JSON1 no SQLite
+JSONType = db.JSON().with_variant(JSONB(), 'postgresql')
+
+# Associação N:N entre perfis e tags normalizadas (interesses, atividades, eventos, compras)
+fan_profile_tag = db.Table(
+    'fan_profile_tag',
+    db.Column('profile_id', db.Integer, db.ForeignKey('fan_profile.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True),
+    # Consultas de segmento partem da tag para os perfis
+    db.Index('ix_fan_profile_tag_tag_id_profile_id', 'tag_id', 'profile_id'),
+)
+
 class FanProfile(db.Model):
+    __table_args__ = (
+        # Paginação por cursor (keyset) em GET /profiles: ordem (created_at, id), com e sem filtros de validação
+        db.Index('ix_fan_profile_created_at_id', 'created_at', 'id'),
+        db.Index('ix_fan_profile_doc_validated_created_at_id', 'document_validated', 'created_at', 'id'),
+        db.Index('ix_fan_profile_esports_validated_created_at_id', 'esports_links_validated', 'created_at', 'id'),
+        # Consultas por conteúdo dos links (@>) no PostgreSQL; no SQLite as consultas usam JSON1 sem índice
+        db.Index('ix_fan_profile_esports_profile_links_gin', 'esports_profile_links',
+                 postgresql_using='gin', postgresql_ops={'esports_profile_links': 'jsonb_path_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_fan_profile_esports_link_validations_gin', 'esports_link_validations',
+                 postgresql_using='gin', postgresql_ops={'esports_link_validations': 'jsonb_path_ops'}).ddl_if(dialect='postgresql'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     # Dados Básicos
     full_name = db.Column(db.String(150), index=True)
@@ -14,16 +40,26 @@ class FanProfile(db.Model):
     events_last_year = db.Column(db.Text) # Ex: "Final CBLOL, IEM Cologne"
     purchases_last_year = db.Column(db.Text) # Ex: "Camisa Furia 2024, Mousepad"
     # Upload de Documentos
-    document_path = db.Column(db.String(256)) # Caminho para o arquivo no servidor
+    document_path = db.Column(db.String(256)) # Chave do documento no storage (app/storage.py)
+    document_sha256 = db.Column(db.String(64), index=True) # Hash do conteúdo do documento
     document_validated = db.Column(db.Boolean, default=False)
     # Redes Sociais (simplificado como texto, idealmente seriam IDs/Tokens após OAuth)
-    social_media_links = db.Column(db.Text) # Ex: {"twitter": "url", "instagram": "url"} - JSON como string ou usar JSONB se DB suportar
+    social_media_links = db.Column(JSONType) # Ex: {"twitter": "url", "instagram": "url"}
     # Links de Perfis eSports
-    esports_profile_links = db.Column(db.Text) # Ex: {"hltv": "url", "faceit": "url"} - JSON como string
+    esports_profile_links = db.Column(JSONType) # Ex: {"hltv": "url", "faceit": "url"}
     esports_links_validated = db.Column(db.Boolean, default=False)
+    # Resultado por link: {"faceit": {"url", "relevant", "checked_at", "matched_keywords"}}
+    esports_link_validations = db.Column(JSONType)
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # Versão da linha (controle de concorrência otimista): incrementada a cada escrita, vira o ETag do perfil
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Tags canônicas extraídas dos campos de texto acima (ver app/tags.py)
+    tags = db.relationship('Tag', secondary=fan_profile_tag, lazy='select', back_populates='profiles')
+
+    # Escritas pelo ORM (links, documento, jobs) também incrementam a versão e falham se ela mudou no meio
+    __mapper_args__ = {'version_id_col': version}
 
     def __repr__(self):
         return f'<FanProfile {self.full_name} ({self.cpf})>'
@@ -40,10 +76,203 @@ class FanProfile(db.Model):
             'events_last_year': self.events_last_year,
             'purchases_last_year': self.purchases_last_year,
             'document_path': self.document_path,
+            'document_sha256': self.document_sha256,
             'document_validated': self.document_validated,
             'social_media_links': self.social_media_links,
             'esports_profile_links': self.esports_profile_links,
             'esports_links_validated': self.esports_links_validated,
+            'esports_link_validations': self.esports_link_validations,
+            'created_at': self.created_at.isoformat() + 'Z',
+            'updated_at': self.updated_at.isoformat() + 'Z',
+            'version': self.version,
+        }
+
+class Tag(db.Model):
+    __table_args__ = (db.UniqueConstraint('kind', 'name', name='uq_tag_kind_name'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False) # interest, activity, event, purchase
+    name = db.Column(db.String(100), nullable=False) # Nome canônico (ex: "counter-strike")
+    profiles = db.relationship('FanProfile', secondary=fan_profile_tag, lazy='dynamic', back_populates='tags')
+
+    def __repr__(self):
+        return f'<Tag {self.kind}:{self.name}>'
+
+    def to_dict(self):
+        return {'id': self.id, 'kind': self.kind, 'name': self.name}
+
+class LinkValidationCache(db.Model):
+    # Cache compartilhado dos vereditos de relevância de links eSports (ver app/link_cache.py)
+    url_hash = db.Column(db.String(64), primary_key=True) # SHA-256 da URL normalizada
+    url = db.Column(db.Text) # URL normalizada
+    relevant = db.Column(db.Boolean, default=False)
+    matched_keywords = db.Column(db.Text) # Lista JSON das keywords encontradas
+    etag = db.Column(db.String(256)) # Para revalidação condicional (If-None-Match)
+    last_modified = db.Column(db.String(64)) # Para revalidação condicional (If-Modified-Since)
+    checked_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, index=True)
+
+    def __repr__(self):
+        return f'<LinkValidationCache {self.url} relevant={self.relevant}>'
+
+class OutboundHost(db.Model):
+    # Estado compartilhado do agendador de requisições externas por host (ver app/outbound.py).
+    # Instantes em segundos desde a época (float) para a conta do token bucket rodar no próprio UPDATE.
+    host = db.Column(db.String(255), primary_key=True) # Hostname sem "www."
+    tokens = db.Column(db.Float, nullable=False, default=0) # Tokens do bucket no instante refilled_at
+    refilled_at = db.Column(db.Float, nullable=False, default=0)
+    failures = db.Column(db.Integer, nullable=False, default=0) # Falhas seguidas (zera no primeiro sucesso)
+    opened_until = db.Column(db.Float) # Circuit breaker aberto até este instante
+    last_error = db.Column(db.String(255))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<OutboundHost {self.host} failures={self.failures}>'
+
+class FanScore(db.Model):
+    # Score de engajamento pré-calculado por perfil (ver app/scoring.py); serve GET /profiles/top
+    __table_args__ = (
+        # Ranking geral e por segmento: ordem (score, profile_id) decrescente, com cursor
+        db.Index('ix_fan_score_score_profile_id', 'score', 'profile_id'),
+        db.Index('ix_fan_score_segment_score_profile_id', 'segment', 'score', 'profile_id'),
+    )
+
+    profile_id = db.Column(db.Integer, db.ForeignKey('fan_profile.id', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Float, nullable=False) # 0-100
+    segment = db.Column(db.String(20), nullable=False) # hardcore, engaged, casual, dormant
+    # Features usadas no cálculo (contagens de tags e links do perfil)
+    interest_count = db.Column(db.Integer, nullable=False, default=0)
+    activity_count = db.Column(db.Integer, nullable=False, default=0)
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+    purchase_count = db.Column(db.Integer, nullable=False, default=0)
+    esports_link_count = db.Column(db.Integer, nullable=False, default=0)
+    validated_link_count = db.Column(db.Integer, nullable=False, default=0)
+    social_link_count = db.Column(db.Integer, nullable=False, default=0)
+    document_validated = db.Column(db.Integer, nullable=False, default=0) # 0/1
+    # updated_at do perfil no cálculo: o recálculo incremental só pega perfis alterados depois
+    profile_updated_at = db.Column(db.DateTime, index=True)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<FanScore {self.profile_id} {self.score:.1f} {self.segment}>'
+
+    def to_dict(self):
+        return {
+            'profile_id': self.profile_id,
+            'score': self.score,
+            'segment': self.segment,
+            'features': {
+                'interest_count': self.interest_count,
+                'activity_count': self.activity_count,
+                'event_count': self.event_count,
+                'purchase_count': self.purchase_count,
+                'esports_link_count': self.esports_link_count,
+                'validated_link_count': self.validated_link_count,
+                'social_link_count': self.social_link_count,
+                'document_validated': bool(self.document_validated),
+            },
+            'computed_at': self.computed_at.isoformat() + 'Z',
+        }
+
+class AnalyticsDaily(db.Model):
+    # Rollup diário dos perfis pelo dia de cadastro (UTC), mantido por app/analytics.py
+    day = db.Column(db.Date, primary_key=True)
+    signups = db.Column(db.Integer, nullable=False, default=0)
+    documents_validated = db.Column(db.Integer, nullable=False, default=0) # Perfis do dia com documento validado
+    esports_links_validated = db.Column(db.Integer, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True) # Início da compactação que gerou a linha
+
+    def __repr__(self):
+        return f'<AnalyticsDaily {self.day} signups={self.signups}>'
+
+class AnalyticsTagDaily(db.Model):
+    # Perfis cadastrados no dia com cada tag (interesses, eventos, ...), mantido por app/analytics.py
+    day = db.Column(db.Date, primary_key=True)
+    tag_id = db.Column(db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True)
+    profiles = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<AnalyticsTagDaily {self.day} tag={self.tag_id} profiles={self.profiles}>'
+
+class ProfileLink(db.Model):
+    # Índice reverso URL normalizada -> perfis (links eSports e redes sociais), mantido por app/dedup.py
+    url_hash = db.Column(db.String(64), primary_key=True) # SHA-256 da URL normalizada (busca por igualdade)
+    profile_id = db.Column(db.Integer, db.ForeignKey('fan_profile.id', ondelete='CASCADE'), primary_key=True, index=True)
+    source = db.Column(db.String(10), primary_key=True) # 'esports' ou 'social'
+    platform = db.Column(db.String(50), primary_key=True) # Chave do link no perfil (ex: "faceit")
+    url = db.Column(db.Text) # URL normalizada
+
+    def __repr__(self):
+        return f'<ProfileLink {self.profile_id} {self.source}:{self.platform}>'
+
+class DocumentFingerprint(db.Model):
+    # Hash perceptual (dHash) do documento atual de cada perfil, com 4 bandas de 16 bits indexadas (ver app/dedup.py)
+    profile_id = db.Column(db.Integer, db.ForeignKey('fan_profile.id', ondelete='CASCADE'), primary_key=True)
+    document_key = db.Column(db.String(256)) # Documento que gerou o hash (FanProfile.document_path no cálculo)
+    dhash = db.Column(db.BigInteger, nullable=False) # 64 bits, com sinal (BIGINT)
+    # Nulas em imagens quase uniformes (o hash casaria com todas)
+    band0 = db.Column(db.Integer, index=True)
+    band1 = db.Column(db.Integer, index=True)
+    band2 = db.Column(db.Integer, index=True)
+    band3 = db.Column(db.Integer, index=True)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DocumentFingerprint {self.profile_id} {self.dhash & 0xFFFFFFFFFFFFFFFF:016x}>'
+
+class DuplicateMatch(db.Model):
+    # Par de perfis que parecem ser da mesma pessoa (menor id em profile_id), registrado por app/dedup.py
+    profile_id = db.Column(db.Integer, db.ForeignKey('fan_profile.id', ondelete='CASCADE'), primary_key=True)
+    other_profile_id = db.Column(db.Integer, db.ForeignKey('fan_profile.id', ondelete='CASCADE'), primary_key=True, index=True)
+    reason = db.Column(db.String(20), primary_key=True) # cpf, document, similar_document, esports_link, social_link
+    detail = db.Column(db.String(300)) # URL compartilhada, distância do dHash ou CPF
+    detected_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<DuplicateMatch {self.profile_id}-{self.other_profile_id} {self.reason}>'
+
+    def to_dict(self):
+        return {
+            'profile_id': self.profile_id,
+            'other_profile_id': self.other_profile_id,
+            'reason': self.reason,
+            'detail': self.detail,
+            'detected_at': self.detected_at.isoformat() + 'Z',
+        }
+
+class ValidationJob(db.Model):
+    # Fila de validações em background (ver app/jobs.py); processada por `flask jobs work`
+    id = db.Column(db.String(32), primary_key=True) # uuid4 hex
+    kind = db.Column(db.String(40), index=True) # 'document_validation' ou 'esports_link_validation'
+    profile_id = db.Column(db.Integer, db.ForeignKey('fan_profile.id'), index=True)
+    payload = db.Column(db.Text) # Parâmetros do job em JSON
+    idempotency_key = db.Column(db.String(160), unique=True) # Header Idempotency-Key (opcional)
+    status = db.Column(db.String(20), default='queued', index=True) # queued, running, succeeded, failed
+    progress = db.Column(db.Integer, default=0) # 0-100
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    result = db.Column(db.Text) # Resultado em JSON
+    error = db.Column(db.Text)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow, index=True) # Backoff entre tentativas
+    locked_by = db.Column(db.String(64)) # Worker que pegou o job
+    locked_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ValidationJob {self.id} {self.kind} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'profile_id': self.profile_id,
+            'status': self.status,
+            'progress': self.progress,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
             'created_at': self.created_at.isoformat() + 'Z',
             'updated_at': self.updated_at.isoformat() + 'Z',
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,442 @@
+# backend/app/outbound.py
+import asyncio
+import time
+import click
+from threading import BoundedSemaphore, Lock
+from urllib.parse import urlsplit
+from flask import current_app
+from flask.cli import AppGroup
+from prometheus_client import Counter
+from sqlalchemy import case, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.jobs import RetryLater
+from app.models import OutboundHost
+from app.utils import dialect_insert
+
+# Agendador das requisições externas (scraping dos links eSports), por host:
+# 1. Token bucket: até OUTBOUND_RATE_PER_SECOND requisições/s com rajadas de OUTBOUND_BURST
+#    (por domínio em OUTBOUND_HOST_RATES, ex: "hltv.org=0.5:2,faceit.com=3")
+# 2. Limite de requisições simultâneas ao host em cada processo (OUTBOUND_HOST_CONCURRENCY)
+# 3. Circuit breaker: após OUTBOUND_FAILURE_THRESHOLD falhas seguidas (timeout, erro de conexão,
+#    429, 5xx) o host fica aberto por OUTBOUND_OPEN_SECONDS e as chamadas falham na hora
+#    (HostUnavailable; nos jobs, nova tentativa depois do prazo). Passado o prazo, uma única
+#    requisição de teste decide se o circuito fecha. 429 com Retry-After abre o circuito na hora.
+# Tokens e breaker ficam na tabela outbound_host, compartilhada entre workers (cada operação é
+# um UPDATE atômico), ou só no processo com OUTBOUND_STATE_STORE=memory.
+
+outbound_rejections = Counter('kyf_outbound_rejections', 'Requisições externas adiadas pelo agendador, por host e motivo.', ('host', 'reason'))
+
+_stats = {'granted': 0, 'waited': 0, 'rate_limited': 0, 'circuit_open': 0, 'busy': 0, 'failures': 0, 'recoveries': 0, 'store_errors': 0}
+_stats_lock = Lock()
+
+_host_slots = {}
+_host_slots_lock = Lock()
+
+def _count(stat):
+    with _stats_lock:
+        _stats[stat] += 1
+
+class HostUnavailable(RetryLater):
+    """Requisição não feita: circuito do host aberto, sem token ou sem vaga dentro de OUTBOUND_MAX_WAIT."""
+
+    def __init__(self, host, reason, retry_after):
+        super().__init__(f"Outbound requests to '{host}' deferred ({reason}), retry in {retry_after:.1f}s", retry_after)
+        self.host = host
+        self.reason = reason
+
+class Permit:
+    """Autorização para uma requisição ao host; o resultado volta ao breaker em release()."""
+
+    __slots__ = ('host', 'policy', 'failures', 'release_slot')
+
+    def __init__(self, host, policy, failures, release_slot=None):
+        self.host = host
+        self.policy = policy
+        self.failures = failures # Falhas seguidas do host no momento da reserva
+        self.release_slot = release_slot
+
+def scheduler_enabled():
+    return current_app.config.get('OUTBOUND_SCHEDULER_ENABLED', True)
+
+def host_key(url):
+    """Host usado nos limites e no breaker: hostname em minúsculas, sem "www."."""
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+_host_rates = (None, {})
+
+def _parse_host_rates(value):
+    """'hltv.org=0.5:2,faceit.com=3' -> {'hltv.org': (0.5, 2.0), 'faceit.com': (3.0, None)}"""
+    global _host_rates
+    if _host_rates[0] == value:
+        return _host_rates[1]
+    rates = {}
+    for part in (value or '').split(','):
+        domain, _, spec = part.strip().partition('=')
+        if not domain or not spec:
+            continue
+        rate, _, burst = spec.partition(':')
+        try:
+            rates[domain.strip().lower()] = (float(rate), float(burst) if burst else None)
+        except ValueError:
+            current_app.logger.warning(f"Ignoring invalid OUTBOUND_HOST_RATES entry '{part}'.")
+    _host_rates = (value, rates)
+    return rates
+
+def policy_for(host):
+    """Limites do host (taxa por domínio, se houver, e parâmetros do breaker)."""
+    config = current_app.config
+    rate = config.get('OUTBOUND_RATE_PER_SECOND', 2.0)
+    burst = config.get('OUTBOUND_BURST', 5)
+    for domain, (domain_rate, domain_burst) in _parse_host_rates(config.get('OUTBOUND_HOST_RATES', '')).items():
+        if host == domain or host.endswith('.' + domain):
+            rate, burst = domain_rate, domain_burst or burst
+            break
+    return {
+        'rate': max(float(rate), 0.001),
+        'burst': max(float(burst), 1.0),
+        'threshold': config.get('OUTBOUND_FAILURE_THRESHOLD', 5),
+        'open_seconds': config.get('OUTBOUND_OPEN_SECONDS', 30),
+        'max_open_seconds': config.get('OUTBOUND_MAX_OPEN_SECONDS', 600),
+    }
+
+def _opens_until(policy, now, retry_after):
+    # Retry-After do host (429/503) abre o circuito na hora, limitado a OUTBOUND_MAX_OPEN_SECONDS
+    return now + min(max(retry_after, 1), policy['max_open_seconds'])
+
+# --- Armazenamento do estado ---
+
+class MemoryStore:
+    """Estado só do processo (um worker, ou desenvolvimento local)."""
+
+    def __init__(self):
+        self._hosts = {}
+        self._lock = Lock()
+
+    def _row(self, host, now, policy):
+        row = self._hosts.get(host)
+        if row is None:
+            row = self._hosts[host] = {
+                'tokens': policy['burst'], 'refilled_at': now, 'failures': 0, 'opened_until': None, 'last_error': None,
+            }
+        return row
+
+    def reserve(self, host, now, policy):
+        with self._lock:
+            row = self._row(host, now, policy)
+            if row['opened_until'] is not None and row['opened_until'] > now:
+                return 'open', row['opened_until'] - now, row['failures']
+            tokens = min(policy['burst'], row['tokens'] + (now - row['refilled_at']) * policy['rate'])
+            if tokens < 1:
+                return 'rate_limited', (1 - tokens) / policy['rate'], row['failures']
+            row['tokens'], row['refilled_at'] = tokens - 1, now
+            if row['failures'] >= policy['threshold']:
+                # Requisição de teste (half-open): as demais continuam recusadas até o resultado dela
+                row['opened_until'] = now + policy['open_seconds']
+            return 'granted', 0.0, row['failures']
+
+    def record(self, host, now, policy, error=None, retry_after=None):
+        with self._lock:
+            row = self._row(host, now, policy)
+            if error is None:
+                row['failures'], row['opened_until'] = 0, None
+                return
+            row['failures'] += 1
+            row['last_error'] = error[:255]
+            if retry_after:
+                row['opened_until'] = _opens_until(policy, now, retry_after)
+            elif row['failures'] >= policy['threshold']:
+                row['opened_until'] = now + policy['open_seconds']
+
+    def states(self):
+        with self._lock:
+            return [dict(row, host=host) for host, row in sorted(self._hosts.items())]
+
+    def reset(self, host=None):
+        with self._lock:
+            if host is None:
+                self._hosts.clear()
+            else:
+                self._hosts.pop(host, None)
+
+class DatabaseStore:
+    """Estado na tabela outbound_host, compartilhado entre workers e processos."""
+
+    def __init__(self):
+        self._known_hosts = set()
+
+    def _ensure_host(self, conn, host, now, policy):
+        if host in self._known_hosts:
+            return
+        table = OutboundHost.__table__
+        conn.execute(
+            dialect_insert(table, bind=conn)
+            .values(host=host, tokens=policy['burst'], refilled_at=now, failures=0)
+            .on_conflict_do_nothing(index_elements=[table.c.host])
+        )
+        self._known_hosts.add(host)
+
+    def reserve(self, host, now, policy):
+        table = OutboundHost.__table__
+        refilled = table.c.tokens + (now - table.c.refilled_at) * policy['rate']
+        available = case((refilled > policy['burst'], policy['burst']), else_=refilled)
+        with db.engine.begin() as conn:
+            self._ensure_host(conn, host, now, policy)
+            # Breaker fechado (ou prazo vencido) e token disponível: consome o token no mesmo UPDATE
+            failures = conn.execute(
+                table.update()
+                .where(
+                    table.c.host == host,
+                    or_(table.c.opened_until.is_(None), table.c.opened_until <= now),
+                    available >= 1,
+                )
+                .values(
+                    tokens=available - 1,
+                    refilled_at=now,
+                    # Requisição de teste (half-open): as demais continuam recusadas até o resultado dela
+                    opened_until=case(
+                        (table.c.failures >= policy['threshold'], now + policy['open_seconds']),
+                        else_=table.c.opened_until,
+                    ),
+                )
+                .returning(table.c.failures)
+            ).scalar()
+            if failures is not None:
+                return 'granted', 0.0, failures
+            row = conn.execute(
+                select(table.c.tokens, table.c.refilled_at, table.c.failures, table.c.opened_until)
+                .where(table.c.host == host)
+            ).first()
+        if row is None:
+            # Linha removida (flask outbound reset) depois de vista por este processo
+            self._known_hosts.discard(host)
+            return self.reserve(host, now, policy)
+        if row.opened_until is not None and row.opened_until > now:
+            return 'open', row.opened_until - now, row.failures
+        tokens = min(policy['burst'], row.tokens + (now - row.refilled_at) * policy['rate'])
+        return 'rate_limited', max((1 - tokens) / policy['rate'], 0.001), row.failures
+
+    def record(self, host, now, policy, error=None, retry_after=None):
+        table = OutboundHost.__table__
+        if error is None:
+            values = {'failures': 0, 'opened_until': None}
+        else:
+            failures = table.c.failures + 1
+            if retry_after:
+                opened_until = _opens_until(policy, now, retry_after)
+            else:
+                opened_until = case((failures >= policy['threshold'], now + policy['open_seconds']), else_=table.c.opened_until)
+            values = {'failures': failures, 'opened_until': opened_until, 'last_error': error[:255]}
+        with db.engine.begin() as conn:
+            conn.execute(table.update().where(table.c.host == host).values(**values))
+
+    def states(self):
+        table = OutboundHost.__table__
+        with db.engine.connect() as conn:
+            return [dict(row) for row in conn.execute(select(table).order_by(table.c.host)).mappings()]
+
+    def reset(self, host=None):
+        table = OutboundHost.__table__
+        with db.engine.begin() as conn:
+            conn.execute(table.delete() if host is None else table.delete().where(table.c.host == host))
+        self._known_hosts.clear()
+
+_stores = {'memory': MemoryStore(), 'db': DatabaseStore()}
+
+def get_store():
+    return _stores.get(current_app.config.get('OUTBOUND_STATE_STORE', 'db'), _stores['db'])
+
+# --- Reserva e resultado ---
+
+def reject(host, reason, retry_after):
+    """Conta e devolve a exceção de requisição adiada (o chamador a levanta)."""
+    _count(reason)
+    outbound_rejections.labels(host=host, reason=reason).inc()
+    current_app.logger.warning(f"Outbound request to '{host}' not sent ({reason}); retry in {retry_after:.1f}s.")
+    return HostUnavailable(host, reason, retry_after)
+
+def reserve(host, policy):
+    """
+    Uma tentativa de reserva no estado compartilhado: ('granted', 0, falhas),
+    ('rate_limited', segundos até o próximo token, falhas) ou ('open', segundos até o teste, falhas).
+    Se o estado estiver inacessível, libera a requisição (o agendador não derruba a validação).
+    """
+    try:
+        return get_store().reserve(host, time.time(), policy)
+    except SQLAlchemyError as e:
+        _count('store_errors')
+        current_app.logger.warning(f"Outbound scheduler state unavailable for '{host}': {e}")
+        return 'granted', 0.0, 0
+
+def _host_slot(host):
+    slot = _host_slots.get(host)
+    if slot is None:
+        with _host_slots_lock:
+            slot = _host_slots.get(host)
+            if slot is None:
+                slot = _host_slots[host] = BoundedSemaphore(current_app.config.get('OUTBOUND_HOST_CONCURRENCY', 4))
+    return slot
+
+def acquire(url):
+    """
+    Reserva uma requisição ao host da URL, esperando no máximo OUTBOUND_MAX_WAIT segundos
+    por vaga e token. Retorna um Permit (None com o agendador desligado) ou levanta HostUnavailable.
+    """
+    if not scheduler_enabled():
+        return None
+    host = host_key(url)
+    policy = policy_for(host)
+    max_wait = current_app.config.get('OUTBOUND_MAX_WAIT', 2.0)
+    deadline = time.monotonic() + max_wait
+    slot = _host_slot(host)
+    if not slot.acquire(timeout=max_wait):
+        raise reject(host, 'busy', max_wait)
+    try:
+        while True:
+            status, wait, failures = reserve(host, policy)
+            if status == 'granted':
+                _count('granted')
+                return Permit(host, policy, failures, slot.release)
+            if status == 'open':
+                raise reject(host, 'circuit_open', wait)
+            if time.monotonic() + wait > deadline:
+                raise reject(host, 'rate_limited', wait)
+            _count('waited')
+            time.sleep(wait)
+    except BaseException:
+        slot.release()
+        raise
+
+async def acquire_async(url, slot):
+    """
+    Versão para o event loop (modo ASGI) de acquire(): `slot` é o asyncio.Semaphore do host
+    no processo; o estado compartilhado é consultado numa thread. Libere com release_async().
+    """
+    host = host_key(url)
+    if not scheduler_enabled():
+        await slot.acquire()
+        return Permit(host, None, 0, slot.release)
+    policy = policy_for(host)
+    max_wait = current_app.config.get('OUTBOUND_MAX_WAIT', 2.0)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_wait
+    try:
+        await asyncio.wait_for(slot.acquire(), max_wait)
+    except asyncio.TimeoutError:
+        raise reject(host, 'busy', max_wait)
+    try:
+        while True:
+            status, wait, failures = await asyncio.to_thread(reserve, host, policy)
+            if status == 'granted':
+                _count('granted')
+                return Permit(host, policy, failures, slot.release)
+            if status == 'open':
+                raise reject(host, 'circuit_open', wait)
+            if loop.time() + wait > deadline:
+                raise reject(host, 'rate_limited', wait)
+            _count('waited')
+            await asyncio.sleep(wait)
+    except BaseException:
+        slot.release()
+        raise
+
+async def release_async(permit, error=None, retry_after=None):
+    """release() numa thread; o semáforo do host é liberado no próprio event loop."""
+    release_slot, permit.release_slot = permit.release_slot, None
+    try:
+        if permit.policy is not None and (error is not None or permit.failures):
+            await asyncio.to_thread(release, permit, error, retry_after)
+    finally:
+        release_slot()
+
+def release(permit, error=None, retry_after=None):
+    """
+    Registra o resultado da requisição: `error` (ex: 'timeout', 'status 503') conta como falha
+    do host; sucesso depois de falhas fecha o circuito. Hosts saudáveis não geram escrita.
+    """
+    if permit is None:
+        return
+    try:
+        if permit.policy is None:
+            pass # Agendador desligado: só a vaga do host
+        elif error is not None:
+            _count('failures')
+            get_store().record(permit.host, time.time(), permit.policy, error, retry_after)
+        elif permit.failures:
+            _count('recoveries')
+            get_store().record(permit.host, time.time(), permit.policy)
+            current_app.logger.info(f"Outbound requests to '{permit.host}' succeeded again; circuit closed.")
+    except SQLAlchemyError as e:
+        _count('store_errors')
+        current_app.logger.warning(f"Could not record outbound result for '{permit.host}': {e}")
+    finally:
+        if permit.release_slot is not None:
+            permit.release_slot()
+
+def failure_for_status(status_code, headers=None):
+    """Motivo de falha do host para a resposta (429/5xx) e o Retry-After em segundos, ou (None, None)."""
+    if status_code is None or not (status_code == 429 or status_code >= 500):
+        return None, None
+    retry_after = (headers or {}).get('Retry-After', '')
+    return f"status {status_code}", float(retry_after) if retry_after.isdigit() else None
+
+# --- Diagnóstico ---
+
+def _state(row, now, threshold):
+    if row['opened_until'] is not None and row['opened_until'] > now:
+        return 'open'
+    if row['failures'] >= threshold:
+        return 'half_open' # A próxima requisição é o teste
+    return 'closed'
+
+def get_host_states():
+    """Estado de cada host conhecido: breaker, falhas seguidas e tokens disponíveis agora."""
+    now = time.time()
+    hosts = []
+    for row in get_store().states():
+        policy = policy_for(row['host'])
+        hosts.append({
+            'host': row['host'],
+            'state': _state(row, now, policy['threshold']),
+            'failures': row['failures'],
+            'open_for_seconds': round(row['opened_until'] - now, 1) if row['opened_until'] and row['opened_until'] > now else 0,
+            'tokens': round(min(policy['burst'], row['tokens'] + (now - row['refilled_at']) * policy['rate']), 2),
+            'rate_per_second': policy['rate'],
+            'last_error': row['last_error'],
+        })
+    return hosts
+
+def get_outbound_stats():
+    """Contadores do processo e estado dos hosts (compartilhado, com OUTBOUND_STATE_STORE=db)."""
+    with _stats_lock:
+        stats = dict(_stats)
+    try:
+        hosts = get_host_states()
+    except SQLAlchemyError as e:
+        current_app.logger.warning(f"Could not read outbound host states: {e}")
+        hosts = None
+    return {
+        'enabled': scheduler_enabled(),
+        'store': current_app.config.get('OUTBOUND_STATE_STORE', 'db'),
+        'counters': stats,
+        'hosts': hosts,
+    }
+
+# --- Comandos CLI (flask outbound ...) ---
+
+outbound_cli = AppGroup('outbound', help='Agendador de requisições externas por host.')
+
+@outbound_cli.command('status')
+def status_command():
+    """Mostra o circuit breaker e os tokens de cada host."""
+    for host in get_host_states():
+        click.echo(f"{host['host']:<40} {host['state']:<10} failures={host['failures']} "
+                   f"tokens={host['tokens']} open_for={host['open_for_seconds']}s last_error={host['last_error']}")
+
+@outbound_cli.command('reset')
+@click.argument('host', required=False)
+def reset_command(host):
+    """Fecha o circuito e recompõe os tokens de um host (ou de todos)."""
+    get_store().reset(host)
+    click.echo(f"Reset outbound state for {host or 'all hosts'}.")
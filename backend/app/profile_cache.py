@@ -0,0 +1,214 @@
+# backend/app/profile_cache.py
+import time
+from collections import OrderedDict
+from threading import Lock
+from flask import current_app, has_app_context
+from prometheus_client import Counter, Gauge
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from werkzeug.http import unquote_etag
+from app import db
+from app.models import FanProfile
+
+# Cache read-through de GET /profile/<cpf> em dois níveis:
+# 1. LRU em memória (por processo), com TTL curto (PROFILE_CACHE_TTL)
+# 2. Redis opcional (PROFILE_CACHE_REDIS_URL), compartilhado entre workers
+# Guarda o JSON já serializado e o ETag (versão do perfil). As entradas são invalidadas
+# após o commit de qualquer escrita no perfil: escritas pelo ORM são detectadas no flush,
+# e os upserts em SQL direto (app/profiles.py, app/bulk.py) chamam mark_profiles_changed.
+# Sem Redis, outro worker pode servir a versão anterior por até PROFILE_CACHE_TTL segundos.
+
+_REDIS_PREFIX = 'kyf:profile:'
+
+_memory = OrderedDict()
+_memory_lock = Lock()
+# Incrementado a cada invalidação: uma leitura do banco que cruzou uma invalidação não é guardada
+_generation = 0
+
+_stats = {'memory_hits': 0, 'redis_hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0, 'not_modified': 0, 'redis_errors': 0}
+_stats_lock = Lock()
+
+_redis = None
+_redis_url = None
+_redis_lock = Lock()
+
+class CachedProfile:
+    """JSON serializado do perfil e seu ETag (entre aspas, como vai no header)."""
+
+    __slots__ = ('body', 'etag')
+
+    def __init__(self, body, etag):
+        self.body = body
+        self.etag = etag
+
+    def matches(self, if_none_match):
+        """True se o ETag está no If-None-Match da requisição (comparação fraca, RFC 9110)."""
+        return if_none_match.contains_weak(unquote_etag(self.etag)[0])
+
+cache_events = Counter('kyf_profile_cache_events', 'Eventos do cache de leitura de perfis.', ('event',))
+cache_hit_ratio = Gauge('kyf_profile_cache_hit_ratio', 'Fração das leituras de perfil atendidas pelo cache (memória ou Redis).', multiprocess_mode='liveall')
+
+def _hit_ratio(stats):
+    lookups = stats['memory_hits'] + stats['redis_hits'] + stats['misses']
+    return round((stats['memory_hits'] + stats['redis_hits']) / lookups, 4) if lookups else None
+
+def _count(stat, amount=1):
+    with _stats_lock:
+        _stats[stat] += amount
+        ratio = _hit_ratio(_stats)
+    cache_events.labels(event=stat).inc(amount)
+    if ratio is not None:
+        cache_hit_ratio.set(ratio)
+
+def count_not_modified():
+    _count('not_modified')
+
+def get_profile_cache_stats():
+    """Contadores de hit/miss/invalidação (por processo) e tamanho atual do LRU."""
+    with _stats_lock:
+        stats = dict(_stats)
+    with _memory_lock:
+        stats['memory_entries'] = len(_memory)
+    stats['redis_enabled'] = bool(current_app.config.get('PROFILE_CACHE_REDIS_URL'))
+    stats['hit_ratio'] = _hit_ratio(stats)
+    return stats
+
+def clear_profile_cache():
+    """Esvazia o nível em memória (o Redis expira sozinho)."""
+    with _memory_lock:
+        _memory.clear()
+
+def _get_redis():
+    """Cliente Redis (redis-py é opcional). Retorna None se o nível não estiver configurado."""
+    global _redis, _redis_url
+    url = current_app.config.get('PROFILE_CACHE_REDIS_URL')
+    if not url:
+        return None
+    if _redis is None or _redis_url != url:
+        with _redis_lock:
+            if _redis is None or _redis_url != url:
+                try:
+                    import redis
+                except ImportError:
+                    raise RuntimeError("PROFILE_CACHE_REDIS_URL requer o pacote 'redis' (pip install redis).")
+                # Timeouts curtos: o Redis fora do ar não pode atrasar a leitura do banco
+                _redis = redis.Redis.from_url(url, socket_timeout=0.25, socket_connect_timeout=0.25)
+                _redis_url = url
+    return _redis
+
+def _redis_call(operation, *args, **kwargs):
+    client = _get_redis()
+    if client is None:
+        return None
+    try:
+        return getattr(client, operation)(*args, **kwargs)
+    except Exception as e:
+        _count('redis_errors')
+        current_app.logger.warning(f"Profile cache Redis {operation} failed: {e}")
+        return None
+
+def _memory_get(cpf):
+    with _memory_lock:
+        entry = _memory.get(cpf)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del _memory[cpf]
+            return None
+        _memory.move_to_end(cpf)
+        return entry[0]
+
+def _memory_put(cpf, cached, generation):
+    ttl = current_app.config.get('PROFILE_CACHE_TTL', 5)
+    max_entries = current_app.config.get('PROFILE_CACHE_MAX_ENTRIES', 4096)
+    with _memory_lock:
+        if generation != _generation:
+            return # Houve invalidação durante a leitura: o valor pode estar desatualizado
+        _memory[cpf] = (cached, time.monotonic() + ttl)
+        _memory.move_to_end(cpf)
+        while len(_memory) > max_entries:
+            _memory.popitem(last=False)
+
+def serialize_profile(profile):
+    from app.profiles import profile_etag
+    return CachedProfile(current_app.json.dumps(profile.to_dict()), profile_etag(profile))
+
+def get_profile(cpf):
+    """
+    Perfil serializado pelo CPF (CachedProfile) ou None se não existir.
+    Procura no LRU, depois no Redis e por fim no banco, preenchendo os níveis acima.
+    """
+    if not current_app.config.get('PROFILE_CACHE_ENABLED', True):
+        profile = FanProfile.query.filter_by(cpf=cpf).first()
+        return serialize_profile(profile) if profile else None
+
+    cached = _memory_get(cpf)
+    if cached is not None:
+        _count('memory_hits')
+        return cached
+
+    generation = _generation
+    raw = _redis_call('get', _REDIS_PREFIX + cpf)
+    if raw is not None:
+        etag, _, body = raw.decode('utf-8').partition('\n')
+        cached = CachedProfile(body, etag)
+        _count('redis_hits')
+        _memory_put(cpf, cached, generation)
+        return cached
+
+    _count('misses')
+    profile = FanProfile.query.filter_by(cpf=cpf).first()
+    if profile is None:
+        return None # Ausência não é guardada: o perfil pode ser criado a qualquer momento
+    cached = serialize_profile(profile)
+    if generation == _generation:
+        _redis_call('set', _REDIS_PREFIX + cpf, f"{cached.etag}\n{cached.body}",
+                    ex=current_app.config.get('PROFILE_CACHE_REDIS_TTL', 300))
+    _memory_put(cpf, cached, generation)
+    _count('stores')
+    return cached
+
+def invalidate_profiles(cpfs):
+    """Remove os perfis dos dois níveis. Chamado após o commit (ver _after_commit)."""
+    global _generation
+    cpfs = [cpf for cpf in set(cpfs) if cpf]
+    if not cpfs:
+        return
+    with _memory_lock:
+        _generation += 1
+        for cpf in cpfs:
+            _memory.pop(cpf, None)
+    _count('invalidations', len(cpfs))
+    if has_app_context() and current_app.config.get('PROFILE_CACHE_REDIS_URL'):
+        _redis_call('delete', *[_REDIS_PREFIX + cpf for cpf in cpfs])
+
+def mark_profiles_changed(cpfs, session=None):
+    """Agenda a invalidação dos perfis para o commit da transação atual (escritas em SQL direto)."""
+    session = session if session is not None else db.session()
+    session.info.setdefault('kyf_changed_profiles', set()).update(cpfs)
+
+# --- Invalidação pelo ciclo de vida da sessão ---
+
+def _after_flush(session, flush_context):
+    changed = [obj.cpf for obj in (*session.new, *session.dirty, *session.deleted) if isinstance(obj, FanProfile)]
+    if changed:
+        mark_profiles_changed(changed, session)
+
+def _after_commit(session):
+    cpfs = session.info.pop('kyf_changed_profiles', None)
+    if cpfs:
+        invalidate_profiles(cpfs)
+
+def _after_rollback(session):
+    session.info.pop('kyf_changed_profiles', None)
+
+_events_registered = False
+
+def init_profile_cache():
+    """Registra os eventos de sessão que invalidam o cache (uma vez por processo)."""
+    global _events_registered
+    if not _events_registered:
+        event.listen(Session, 'after_flush', _after_flush)
+        event.listen(Session, 'after_commit', _after_commit)
+        event.listen(Session, 'after_rollback', _after_rollback)
+        _events_registered = True
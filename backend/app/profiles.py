@@ -0,0 +1,142 @@
+# backend/app/profiles.py
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.orm.exc import StaleDataError
+from app import db
+from app.models import FanProfile
+from app.utils import canonical_cpf, cpf_lookup_keys, dialect_insert
+from app.tags import TAG_FIELDS, replace_profile_tags
+from app.profile_cache import mark_profiles_changed
+
+# Upsert do perfil básico (POST /profile) num único INSERT ... ON CONFLICT (cpf)
+# DO UPDATE ... RETURNING, com controle de concorrência otimista pela coluna version.
+
+# Campos editáveis pelo POST /profile (links e documento têm rotas próprias)
+PROFILE_FIELDS = (
+    'full_name', 'address', 'interests', 'activities_last_year',
+    'events_last_year', 'purchases_last_year',
+)
+
+def resolve_cpf(value):
+    """
+    CPF com que o perfil é gravado e consultado: a forma canônica se os dígitos verificadores
+    conferirem; senão, o de um perfil já existente gravado assim (cadastro anterior à validação),
+    que continua atualizável. None se for inválido e não houver perfil.
+    """
+    canonical = canonical_cpf(value)
+    if canonical is not None:
+        return canonical
+    keys = cpf_lookup_keys(value)
+    if not keys:
+        return None
+    return db.session.scalar(db.select(FanProfile.cpf).where(FanProfile.cpf.in_(keys)).limit(1))
+
+class VersionConflict(Exception):
+    """A versão informada em If-Match não é a atual (`profile`, para o cliente refazer) ou o perfil não existe."""
+
+    def __init__(self, profile=None):
+        super().__init__("Profile version mismatch")
+        self.profile = profile
+
+def save_profile_changes(profile, apply):
+    """
+    Aplica `apply(profile)` e faz o commit, retornando o resultado de apply. As escritas pelo
+    ORM conferem a versão do perfil (version_id_col): se outra requisição gravou o perfil no
+    meio, desfaz, relê o perfil e aplica de novo (sem If-Match, a última escrita vence, como
+    no upsert). Após PROFILE_WRITE_ATTEMPTS tentativas, repassa o StaleDataError.
+    """
+    attempts = max(current_app.config.get('PROFILE_WRITE_ATTEMPTS', 3), 1)
+    for attempt in range(attempts):
+        try:
+            result = apply(profile)
+            db.session.commit()
+            return result
+        except StaleDataError:
+            db.session.rollback()
+            if attempt == attempts - 1:
+                raise
+            current_app.logger.info(f"Profile {profile.id} changed concurrently; retrying write ({attempt + 1}/{attempts}).")
+            db.session.refresh(profile)
+
+def profile_etag(profile):
+    """ETag forte do perfil: muda a cada escrita (coluna version)."""
+    return f'"{profile.id}-{profile.version}"'
+
+def parse_if_match(header):
+    """
+    Converte o header If-Match em versões esperadas: None sem header, '*' para "qualquer
+    versão existente" ou a lista de (id, versão) das ETags fortes. Levanta ValueError se
+    nenhuma ETag do header tiver o formato das nossas ("<id>-<versão>").
+    """
+    if header is None:
+        return None
+    header = header.strip()
+    if header == '*':
+        return '*'
+    versions, recognized = [], False
+    for tag in header.split(','):
+        tag = tag.strip()
+        weak = tag.startswith('W/')
+        tag_id, _, version = tag.removeprefix('W/').strip('"').partition('-')
+        if tag_id.isdigit() and version.isdigit():
+            recognized = True
+            if not weak: # If-Match exige comparação forte: ETag fraca nunca confere
+                versions.append((int(tag_id), int(version)))
+    if not recognized:
+        raise ValueError("If-Match inválido.")
+    return versions
+
+def _changed(table, values, source):
+    """Condição "algum campo presente muda": evita reescrever a linha sem necessidade."""
+    changed = [table.c[field].is_distinct_from(source[field]) for field in values]
+    return db.or_(*changed) if changed else db.false()
+
+def upsert_profile(cpf, data, if_match=None):
+    """
+    Cria ou atualiza o perfil pelo CPF num único comando. Só os campos presentes em
+    `data` são gravados, e a linha só é reescrita se algum deles mudar de fato.
+    `if_match`: lista de (id, versão) aceitas (ver parse_if_match), '*' (o perfil precisa existir) ou None.
+    Retorna (perfil, status) com status 'created', 'updated' ou 'unchanged'.
+    Levanta VersionConflict se a versão não bater. O commit fica com o chamador.
+    """
+    values = {field: data[field] for field in PROFILE_FIELDS if field in data}
+    now = datetime.utcnow()
+    table = FanProfile.__table__
+
+    if if_match is None:
+        # INSERT ... ON CONFLICT (cpf) DO UPDATE ... RETURNING: sem corrida entre SELECT e INSERT
+        stmt = dialect_insert(FanProfile).values(
+            cpf=cpf, **values, version=1, document_validated=False, esports_links_validated=False,
+            created_at=now, updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.cpf],
+            set_={**{field: stmt.excluded[field] for field in values}, 'version': table.c.version + 1, 'updated_at': now},
+            where=_changed(table, values, stmt.excluded),
+        )
+    else:
+        # If-Match só faz sentido para um perfil existente: UPDATE condicional à versão
+        conditions = [table.c.cpf == cpf, _changed(table, values, {field: db.literal(value, table.c[field].type) for field, value in values.items()})]
+        if if_match != '*':
+            conditions.append(db.or_(db.false(), *(db.and_(table.c.id == tag_id, table.c.version == version) for tag_id, version in if_match)))
+        stmt = (
+            db.update(FanProfile)
+            .where(*conditions)
+            .values(**values, version=table.c.version + 1, updated_at=now)
+        )
+    stmt = stmt.returning(FanProfile)
+
+    profile = db.session.scalars(stmt, execution_options={'populate_existing': True}).first()
+    if profile is None:
+        # Nenhuma linha escrita: nada mudou, versão diferente ou (com If-Match) perfil inexistente
+        current = db.session.scalars(db.select(FanProfile).where(FanProfile.cpf == cpf)).first()
+        if current is None or (if_match not in (None, '*') and (current.id, current.version) not in if_match):
+            raise VersionConflict(current)
+        return current, 'unchanged'
+
+    created = profile.version == 1
+    mark_profiles_changed([cpf]) # Invalida o cache de leitura após o commit
+    if created or any(field in values for field in TAG_FIELDS):
+        replace_profile_tags([profile]) # Tags normalizadas para as consultas de segmento
+        db.session.expire(profile, ['tags'])
+    return profile, 'created' if created else 'updated'
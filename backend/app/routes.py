@@ -1,14 +1,38 @@
 # backend/app/routes.py
 import os
-import json
-from flask import Blueprint, request, jsonify, current_app
-from werkzeug.utils import secure_filename
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context, send_file
+from sqlalchemy.orm.exc import StaleDataError
 from app import db
-from app.models import FanProfile
-from app.services import validate_document_with_ai, validate_esports_link_relevance, allowed_file
+from app.models import FanProfile, ValidationJob
+from app.services import allowed_file
+from app.jobs import enqueue_job, dispatch_job, get_queue_depth, JOB_DOCUMENT_VALIDATION, JOB_ESPORTS_LINK_VALIDATION
+from app.link_cache import get_cache_stats
+from app.bulk import import_profiles, export_profiles, iter_ndjson_rows, iter_csv_rows
+from app.utils import encode_cursor, decode_cursor, parse_bool, parse_datetime
+from app.tags import parse_tag_terms, count_segment
+from app.storage import get_storage
+from app.document_validator import get_validation_stats
+from app.documents import DERIVATIVES, DocumentPreprocessingError, preprocess_document
+from app.profiles import upsert_profile, parse_if_match, profile_etag, resolve_cpf, save_profile_changes, VersionConflict
+from app.scoring import SEGMENT_NAMES, top_scores
+from app.tags import TAG_KINDS
+from app import analytics
+from app.serialization import PROFILE_FIELDS, profile_load_options, profile_values
+from app import dedup, outbound, profile_cache
 
 bp = Blueprint('main', __name__)
 
+@bp.url_value_preprocessor
+def _canonicalize_cpf(endpoint, values):
+    # /profile/<cpf>/...: aceita o CPF com ou sem pontuação (gravado na forma canônica,
+    # ou como ficou num cadastro anterior à validação dos dígitos verificadores)
+    if values and values.get('cpf'):
+        values['cpf'] = resolve_cpf(values['cpf']) or values['cpf']
+
+def _concurrent_write_response():
+    # save_profile_changes esgotou as tentativas: o perfil mudou a cada releitura
+    return jsonify({"error": "O perfil foi alterado por outra requisição. Tente novamente."}), 409
+
 @bp.route('/profile', methods=['POST'])
 def create_or_update_profile():
     """ Cria ou atualiza o perfil básico do fã """
@@ -19,46 +43,45 @@ def create_or_update_profile():
     cpf = data.get('cpf')
     if not cpf:
          return jsonify({"error": "CPF é obrigatório."}), 400
+    # Forma canônica com dígitos verificadores: "12345678909" e "123.456.789-09" são o mesmo perfil.
+    # CPF inválido só é aceito se já houver um perfil gravado com ele (cadastro antigo)
+    cpf = resolve_cpf(cpf)
+    if cpf is None:
+        return jsonify({"error": "CPF inválido."}), 400
 
-    # Tenta encontrar um perfil existente pelo CPF
-    profile = FanProfile.query.filter_by(cpf=cpf).first()
-
-    if profile:
-        # Atualiza perfil existente
-        profile.full_name = data.get('full_name', profile.full_name)
-        profile.address = data.get('address', profile.address)
-        profile.interests = data.get('interests', profile.interests)
-        profile.activities_last_year = data.get('activities_last_year', profile.activities_last_year)
-        profile.events_last_year = data.get('events_last_year', profile.events_last_year)
-        profile.purchases_last_year = data.get('purchases_last_year', profile.purchases_last_year)
-        # Links são atualizados em rotas separadas
-        message = "Perfil atualizado com sucesso."
-    else:
-        # Cria novo perfil
-        profile = FanProfile(
-            cpf=cpf,
-            full_name=data.get('full_name'),
-            address=data.get('address'),
-            interests=data.get('interests'),
-            activities_last_year=data.get('activities_last_year'),
-            events_last_year=data.get('events_last_year'),
-            purchases_last_year=data.get('purchases_last_year'),
-            # Inicializa outros campos se necessário
-        )
-        db.session.add(profile)
-        message = "Perfil criado com sucesso."
-
+    # If-Match: só grava se o perfil ainda estiver na versão lida pelo cliente (ETag)
+    try:
+        if_match = parse_if_match(request.headers.get('If-Match'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     try:
+        profile, status = upsert_profile(cpf, data, if_match=if_match)
         db.session.commit()
-        return jsonify({"message": message, "profile": profile.to_dict()}), 201 if not profile else 200
+    except VersionConflict as e:
+        db.session.rollback()
+        response = jsonify({"error": "O perfil foi alterado por outra requisição. Recarregue e tente novamente.",
+                            "profile": e.profile.to_dict() if e.profile else None})
+        if e.profile:
+            response.headers['ETag'] = profile_etag(e.profile)
+        return response, 412
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Erro ao salvar perfil: {e}")
         return jsonify({"error": "Erro interno ao salvar perfil."}), 500
 
+    messages = {
+        'created': "Perfil criado com sucesso.",
+        'updated': "Perfil atualizado com sucesso.",
+        'unchanged': "Perfil sem alterações.",
+    }
+    response = jsonify({"message": messages[status], "profile": profile.to_dict()})
+    response.headers['ETag'] = profile_etag(profile)
+    return response, 201 if status == 'created' else 200
+
 @bp.route('/profile/<cpf>/upload_document', methods=['POST'])
 def upload_document(cpf):
     """ Faz upload do documento para um perfil específico e tenta validar com AI """
+    # O perfil é conferido antes de request.files: o parse do multipart já grava no storage
     profile = FanProfile.query.filter_by(cpf=cpf).first()
     if not profile:
         return jsonify({"error": "Perfil não encontrado."}), 404
@@ -71,26 +94,48 @@ def upload_document(cpf):
         return jsonify({"error": "Nome de arquivo vazio."}), 400
 
     if file and allowed_file(file.filename):
-        filename = secure_filename(f"{profile.cpf}_{file.filename}") # Nome seguro e único
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        try:
-            file.save(file_path)
-            profile.document_path = file_path # Salva o caminho no DB
+        # O conteúdo já foi gravado no storage durante o parse (app/storage.py);
+        # aqui só se confirma a chave endereçada pelo SHA-256
+        extension = file.filename.rsplit('.', 1)[1].lower()
+
+        def save_document(profile):
+            profile.document_path = document_key # Salva a chave do storage no DB
+            profile.document_sha256 = file.stream.sha256
+            profile.document_validated = False # Pendente até o job de validação terminar
+            dedup.index_document_sha256(profile) # Mesmo arquivo em outros perfis (o dHash sai no job)
 
-            # --- Chamada ao Placeholder de Validação AI ---
-            is_valid = validate_document_with_ai(file_path)
-            profile.document_validated = is_valid
-            # -------------------------------------------
+            # --- Validação AI em background (ver app/jobs.py) ---
+            job, created = enqueue_job(
+                JOB_DOCUMENT_VALIDATION, profile, {'document_key': document_key},
+                idempotency_key=request.headers.get('Idempotency-Key'),
+            )
+            if not created:
+                # Reenvio com a mesma Idempotency-Key: mantém o estado do job original
+                db.session.rollback()
+            return job, created
 
-            db.session.commit()
-            status = "Documento enviado e validado (placeholder)." if is_valid else "Documento enviado, falha na validação (placeholder)."
-            return jsonify({"message": status, "file_path": file_path, "validated": is_valid}), 200
+        try:
+            document_key = file.stream.finalize(extension)
+            job, created = save_profile_changes(profile, save_document)
+            if not created:
+                return jsonify({"message": "Requisição já recebida.", "job": job.to_dict()}), 202
+            dispatch_job(job)
+            return jsonify({
+                "message": "Documento enviado, validação em andamento.",
+                "file_path": document_key,
+                "document_key": document_key,
+                "sha256": file.stream.sha256,
+                "size": file.stream.size,
+                "deduplicated": file.stream.deduplicated,
+                "validated": profile.document_validated,
+                "job": job.to_dict(),
+            }), 202
+        except StaleDataError:
+            return _concurrent_write_response()
         except Exception as e:
             db.session.rollback()
             current_app.logger.error(f"Erro ao salvar ou validar documento: {e}")
-            # Tenta remover o arquivo se a transação falhar
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            # O arquivo não é removido: endereçado por conteúdo, pode pertencer a outro perfil
             return jsonify({"error": "Erro interno ao processar o arquivo."}), 500
     else:
         return jsonify({"error": "Tipo de arquivo não permitido."}), 400
@@ -106,16 +151,19 @@ def link_social_media(cpf):
     if not data or not isinstance(data, dict):
         return jsonify({"error": "Dados inválidos. Envie um JSON com os links."}), 400
 
-    # Assume que 'data' é um dicionário {"twitter": "url", "instagram": "url", ...}
-    # Converte para string JSON para armazenar no campo Text (simplificado)
-    profile.social_media_links = json.dumps(data)
-
     # Aqui seria o local para iniciar fluxos OAuth ou scraping (complexo e não recomendado sem cuidado)
     current_app.logger.info(f"PLACEHOLDER: Links sociais {data} recebidos para {cpf}. Nenhuma validação externa feita.")
 
+    def save_links(profile):
+        # Assume que 'data' é um dicionário {"twitter": "url", "instagram": "url", ...}
+        profile.social_media_links = data # Coluna JSON nativa
+        dedup.index_profile_links(profile, 'social') # Mesmas URLs em outros perfis
+
     try:
-        db.session.commit()
+        save_profile_changes(profile, save_links)
         return jsonify({"message": "Links de redes sociais atualizados.", "profile": profile.to_dict()}), 200
+    except StaleDataError:
+        return _concurrent_write_response()
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Erro ao salvar links sociais: {e}")
@@ -132,27 +180,34 @@ def link_esports_profiles(cpf):
     if not data or not isinstance(data, dict):
          return jsonify({"error": "Dados inválidos. Envie um JSON com os links."}), 400
 
-    profile.esports_profile_links = json.dumps(data) # Salva links como JSON string
+    def save_links(profile):
+        profile.esports_profile_links = data # Coluna JSON nativa
+        profile.esports_link_validations = None # Resultado por link é gravado pelo job
+        profile.esports_links_validated = False # Pendente até o job de validação terminar
+        dedup.index_profile_links(profile, 'esports') # Mesmas URLs em outros perfis
 
-    # --- Chamada ao Placeholder de Validação AI para cada link ---
-    all_links_valid = True
-    validation_results = {}
-    for platform, url in data.items():
-        is_relevant = validate_esports_link_relevance(url)
-        validation_results[platform] = is_relevant
-        if not is_relevant:
-            all_links_valid = False
-    profile.esports_links_validated = all_links_valid
-    # ----------------------------------------------------------
+        # --- Validação dos links em background (ver app/jobs.py) ---
+        job, created = enqueue_job(
+            JOB_ESPORTS_LINK_VALIDATION, profile, {'links': data},
+            idempotency_key=request.headers.get('Idempotency-Key'),
+        )
+        if not created:
+            # Reenvio com a mesma Idempotency-Key: mantém o estado do job original
+            db.session.rollback()
+        return job, created
 
     try:
-        db.session.commit()
-        status = "Links eSports atualizados e validados (placeholder)." if all_links_valid else "Links eSports atualizados, alguns não validados (placeholder)."
+        job, created = save_profile_changes(profile, save_links)
+        if not created:
+            return jsonify({"message": "Requisição já recebida.", "job": job.to_dict()}), 202
+        dispatch_job(job)
         return jsonify({
-            "message": status,
-            "validation_results": validation_results,
+            "message": "Links eSports atualizados, validação em andamento.",
+            "job": job.to_dict(),
             "profile": profile.to_dict()
-        }), 200
+        }), 202
+    except StaleDataError:
+        return _concurrent_write_response()
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Erro ao salvar links eSports: {e}")
@@ -161,7 +216,258 @@ def link_esports_profiles(cpf):
 # Rota para obter um perfil (opcional, útil para verificar/depurar)
 @bp.route('/profile/<cpf>', methods=['GET'])
 def get_profile(cpf):
+    # Lido do cache (app/profile_cache.py); If-None-Match com o ETag atual responde 304 sem corpo
+    cached = profile_cache.get_profile(cpf)
+    if cached is None:
+        return jsonify({"error": "Perfil não encontrado."}), 404
+    if cached.matches(request.if_none_match):
+        profile_cache.count_not_modified()
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(cached.body, status=200, mimetype=current_app.json.mimetype)
+    response.headers['ETag'] = cached.etag
+    response.headers['Cache-Control'] = 'no-cache' # Sempre revalidar (barato: 304)
+    return response
+
+@bp.route('/profile/<cpf>/document/<variant>', methods=['GET'])
+def get_document_preview(cpf, variant):
+    """ Serve um derivado do documento ('thumbnail' ou 'normalized'), gerando-o se ainda não existir """
+    if variant not in DERIVATIVES:
+        return jsonify({"error": f"Variante inválida. Use: {', '.join(DERIVATIVES)}."}), 400
     profile = FanProfile.query.filter_by(cpf=cpf).first()
     if not profile:
         return jsonify({"error": "Perfil não encontrado."}), 404
-    return jsonify(profile.to_dict()), 200
\ No newline at end of file
+    if not profile.document_path:
+        return jsonify({"error": "Perfil sem documento."}), 404
+    try:
+        key = preprocess_document(profile.document_path)[variant]
+    except DocumentPreprocessingError:
+        return jsonify({"error": "Não foi possível gerar a pré-visualização do documento."}), 422
+    # Chaves são endereçadas por conteúdo: o derivado de uma chave nunca muda
+    return send_file(get_storage().open(key), mimetype=DERIVATIVES[variant][1],
+                     etag=os.path.basename(key), max_age=86400)
+
+# Possíveis cadastros da mesma pessoa: pares registrados na escrita e por `flask dedup sweep` (app/dedup.py)
+@bp.route('/profile/<cpf>/duplicates', methods=['GET'])
+def get_profile_duplicates(cpf):
+    profile_id = db.session.scalar(db.select(FanProfile.id).where(FanProfile.cpf == cpf))
+    if profile_id is None:
+        return jsonify({"error": "Perfil não encontrado."}), 404
+    return jsonify({"profile_id": profile_id, "cpf": cpf, "items": dedup.profile_duplicates(profile_id)}), 200
+
+# Filtros aceitos por GET /profiles: parâmetro -> (coluna, conversor, operador)
+_PROFILE_LIST_FILTERS = {
+    'document_validated': ('document_validated', parse_bool, 'eq'),
+    'esports_links_validated': ('esports_links_validated', parse_bool, 'eq'),
+    'created_after': ('created_at', parse_datetime, 'ge'),
+    'created_before': ('created_at', parse_datetime, 'lt'),
+    'updated_after': ('updated_at', parse_datetime, 'ge'),
+    'updated_before': ('updated_at', parse_datetime, 'lt'),
+}
+
+def _validated_link_condition(platform):
+    """Perfis cujo link da plataforma foi validado como relevante (consulta feita no banco)."""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Containment (@>) usa o índice GIN jsonb_path_ops
+        return FanProfile.esports_link_validations.contains({platform: {'relevant': True}})
+    # SQLite: JSON_EXTRACT (JSON1)
+    return FanProfile.esports_link_validations[(platform, 'relevant')].as_boolean() == True
+
+# Listagem paginada por cursor (keyset em created_at, id), com filtros e seleção de campos
+@bp.route('/profiles', methods=['GET'])
+def list_profiles():
+    """ Lista perfis em páginas estáveis: ?limit=&cursor=&fields=&<filtros> """
+    try:
+        limit = int(request.args.get('limit', current_app.config.get('PROFILE_LIST_DEFAULT_LIMIT', 50)))
+    except ValueError:
+        return jsonify({"error": "Parâmetro 'limit' inválido."}), 400
+    limit = max(1, min(limit, current_app.config.get('PROFILE_LIST_MAX_LIMIT', 500)))
+
+    fields = None
+    if request.args.get('fields'):
+        fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+        unknown = set(fields) - set(PROFILE_FIELDS)
+        if unknown:
+            return jsonify({"error": f"Campos desconhecidos: {', '.join(sorted(unknown))}."}), 400
+
+    # Só as colunas pedidas (mais as do cursor) são lidas do banco
+    query = db.select(FanProfile).options(*profile_load_options(fields))
+    try:
+        for param, (column_name, convert, operator) in _PROFILE_LIST_FILTERS.items():
+            if param not in request.args:
+                continue
+            column = FanProfile.__table__.c[column_name]
+            value = convert(request.args[param])
+            if operator == 'eq':
+                query = query.where(column == value)
+            elif operator == 'ge':
+                query = query.where(column >= value)
+            else:
+                query = query.where(column < value)
+
+        if request.args.get('validated_link'):
+            query = query.where(_validated_link_condition(request.args['validated_link']))
+
+        if request.args.get('cursor'):
+            cursor_created_at, cursor_id = decode_cursor(request.args['cursor'], types=(str, int))
+            query = query.where(
+                db.tuple_(FanProfile.created_at, FanProfile.id) > (parse_datetime(cursor_created_at), int(cursor_id))
+            )
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Parâmetro inválido: {e}"}), 400
+
+    # Busca uma linha a mais para saber se existe próxima página
+    query = query.order_by(FanProfile.created_at, FanProfile.id).limit(limit + 1)
+    profiles = db.session.scalars(query).all()
+    has_more = len(profiles) > limit
+    profiles = profiles[:limit]
+
+    items = [profile_values(profile, fields) for profile in profiles]
+    next_cursor = encode_cursor(profiles[-1].created_at, profiles[-1].id) if has_more else None
+    return jsonify({"items": items, "next_cursor": next_cursor, "limit": limit}), 200
+
+# Ranking de engajamento pré-calculado por `flask scores refresh` (app/scoring.py)
+@bp.route('/profiles/top', methods=['GET'])
+def top_profiles():
+    """ Perfis com maior score de engajamento: ?limit=&segment=&cursor= """
+    try:
+        limit = int(request.args.get('limit', current_app.config.get('PROFILE_LIST_DEFAULT_LIMIT', 50)))
+    except ValueError:
+        return jsonify({"error": "Parâmetro 'limit' inválido."}), 400
+    limit = max(1, min(limit, current_app.config.get('PROFILE_LIST_MAX_LIMIT', 500)))
+
+    segment = request.args.get('segment')
+    if segment and segment not in SEGMENT_NAMES:
+        return jsonify({"error": f"Segmento inválido. Use: {', '.join(SEGMENT_NAMES)}."}), 400
+
+    cursor = None
+    if request.args.get('cursor'):
+        try:
+            cursor_score, cursor_id = decode_cursor(request.args['cursor'], types=((int, float), int))
+            cursor = (float(cursor_score), int(cursor_id))
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": f"Parâmetro inválido: {e}"}), 400
+
+    rows, has_more = top_scores(limit, segment=segment, cursor=cursor)
+    items = [{**score.to_dict(), 'cpf': cpf, 'full_name': full_name} for score, cpf, full_name in rows]
+    next_cursor = encode_cursor(rows[-1][0].score, rows[-1][0].profile_id) if has_more else None
+    return jsonify({"items": items, "next_cursor": next_cursor, "limit": limit}), 200
+
+# Importação em massa (NDJSON ou CSV), lida em streaming e gravada em lotes
+@bp.route('/profiles/bulk', methods=['POST'])
+def bulk_import_profiles():
+    """ Cria ou atualiza perfis em massa a partir de NDJSON (padrão) ou CSV """
+    fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({"error": "Formato inválido. Use 'ndjson' ou 'csv'."}), 400
+
+    try:
+        # Limite próprio para importações (o MAX_CONTENT_LENGTH global é pensado para uploads)
+        request.max_content_length = current_app.config.get('BULK_IMPORT_MAX_BYTES')
+    except AttributeError:
+        pass # Flask < 3.1 não permite limite por requisição
+
+    rows = iter_csv_rows(request.stream) if fmt == 'csv' else iter_ndjson_rows(request.stream)
+    summary = import_profiles(rows)
+    current_app.logger.info(f"Bulk import finished: {summary['upserted']} upserted, {summary['failed']} failed.")
+    return jsonify(summary), 200
+
+# Exportação de todos os perfis em streaming (NDJSON, array JSON ou CSV)
+@bp.route('/profiles/export', methods=['GET'])
+def bulk_export_profiles():
+    fmt = request.args.get('format', 'ndjson')
+    mimetypes = {'ndjson': 'application/x-ndjson', 'json': 'application/json', 'csv': 'text/csv'}
+    if fmt not in mimetypes:
+        return jsonify({"error": "Formato inválido. Use 'ndjson', 'json' ou 'csv'."}), 400
+    mimetype = mimetypes[fmt]
+    return Response(
+        stream_with_context(export_profiles(fmt)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=profiles.{fmt}'},
+    )
+
+# Contagem de segmento por tags normalizadas: ?all=interest:csgo,event:major&any=purchase:camisa
+@bp.route('/segments/count', methods=['GET'])
+def segment_count():
+    try:
+        all_terms = parse_tag_terms(request.args.get('all'))
+        any_terms = parse_tag_terms(request.args.get('any'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    count = count_segment(all_terms, any_terms)
+    return jsonify({
+        "count": count,
+        "all": [f"{kind}:{name}" for kind, name in all_terms],
+        "any": [f"{kind}:{name}" for kind, name in any_terms],
+    }), 200
+
+# Dashboards: leem só os rollups diários mantidos por `flask analytics compact` (app/analytics.py)
+def _analytics_days(default):
+    """Parâmetro 'days' (1 a ANALYTICS_MAX_DAYS). Levanta ValueError se inválido."""
+    value = request.args.get('days')
+    if value is None:
+        return default
+    days = int(value)
+    if not 1 <= days <= current_app.config.get('ANALYTICS_MAX_DAYS', 366):
+        raise ValueError(f"'days' deve estar entre 1 e {current_app.config.get('ANALYTICS_MAX_DAYS', 366)}.")
+    return days
+
+@bp.route('/analytics/signups', methods=['GET'])
+def analytics_signups():
+    """ Cadastros por dia: ?days=30 """
+    try:
+        days = _analytics_days(30)
+    except ValueError as e:
+        return jsonify({"error": f"Parâmetro inválido: {e}"}), 400
+    series = analytics.signups_per_day(days)
+    return jsonify({
+        "days": series,
+        "total": sum(item['signups'] for item in series),
+        "compacted_at": analytics.last_compacted_at(),
+    }), 200
+
+@bp.route('/analytics/validation', methods=['GET'])
+def analytics_validation():
+    """ Parcela de documentos e links eSports validados: ?days= (padrão: todos os perfis) """
+    try:
+        days = _analytics_days(None)
+    except ValueError as e:
+        return jsonify({"error": f"Parâmetro inválido: {e}"}), 400
+    return jsonify({**analytics.validation_summary(days), "days": days, "compacted_at": analytics.last_compacted_at()}), 200
+
+@bp.route('/analytics/tags', methods=['GET'])
+def analytics_tags():
+    """ Tags mais frequentes entre os cadastros recentes: ?kind=interest&days=7&limit=10 """
+    kind = request.args.get('kind', 'interest')
+    if kind not in TAG_KINDS:
+        return jsonify({"error": f"Tipo inválido. Use: {', '.join(TAG_KINDS)}."}), 400
+    try:
+        days = _analytics_days(7)
+        limit = max(1, min(int(request.args.get('limit', 10)), 100))
+    except ValueError as e:
+        return jsonify({"error": f"Parâmetro inválido: {e}"}), 400
+    return jsonify({
+        "kind": kind,
+        "days": days,
+        "items": analytics.top_tags(kind, days, limit),
+        "compacted_at": analytics.last_compacted_at(),
+    }), 200
+
+# Rota para acompanhar um job de validação (retornado com 202 pelas rotas de upload/links)
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = db.session.get(ValidationJob, job_id)
+    if not job:
+        return jsonify({"error": "Job não encontrado."}), 404
+    return jsonify(job.to_dict()), 200
+
+# Rota de diagnóstico (contadores internos por processo)
+@bp.route('/diagnostics', methods=['GET'])
+def diagnostics():
+    return jsonify({
+        "link_cache": get_cache_stats(),
+        "profile_cache": profile_cache.get_profile_cache_stats(),
+        "outbound": outbound.get_outbound_stats(),
+        "job_queue_depth": get_queue_depth(),
+        "document_validation": get_validation_stats(),
+    }), 200
@@ -0,0 +1,237 @@
+# backend/app/scoring.py
+import time
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import func
+from app import db
+from app.models import FanProfile, FanScore, Tag, fan_profile_tag
+from app.tags import TAG_FIELDS
+from app.utils import dialect_insert
+
+# Score de engajamento dos fãs, calculado em lotes vetorizados (NumPy) e gravado em fan_score.
+# `flask scores refresh` recalcula só os perfis cujo updated_at mudou desde o último cálculo;
+# GET /profiles/top lê o ranking direto do índice de fan_score, sem calcular nada na requisição.
+# ATENÇÃO: mudanças nos pesos (SCORING_WEIGHTS) só afetam os scores já gravados após
+# `flask scores refresh --full`.
+# NumPy é importado só no recálculo: GET /profiles/top e o boot dos workers não o carregam.
+
+# Feature (coluna de fan_score) -> (peso padrão, teto da contagem)
+FEATURES = {
+    'interest_count': (1.0, 10),
+    'activity_count': (1.5, 10),
+    'event_count': (2.5, 10),
+    'purchase_count': (3.0, 10),
+    'esports_link_count': (1.0, 5),
+    'validated_link_count': (2.5, 5),
+    'social_link_count': (0.5, 5),
+    'document_validated': (2.0, 1),
+}
+FEATURE_NAMES = tuple(FEATURES)
+_FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+_CAPS = tuple(float(cap) for _, cap in FEATURES.values())
+
+# Tipo da tag (app/tags.py) -> feature com a contagem
+_TAG_FEATURES = {kind: f'{kind}_count' for kind in TAG_FIELDS.values()}
+
+# Segmentos por faixa de score (limite inferior, em ordem crescente)
+SEGMENTS = (('dormant', 0.0), ('casual', 10.0), ('engaged', 35.0), ('hardcore', 60.0))
+SEGMENT_NAMES = tuple(name for name, _ in SEGMENTS)
+_SEGMENT_BINS = tuple(threshold for _, threshold in SEGMENTS[1:])
+
+def _parse_weights(value):
+    """Converte "event_count=3,purchase_count=4" em {feature: peso}; entradas inválidas são ignoradas."""
+    weights = {}
+    for part in (value or '').split(','):
+        name, sep, weight = part.strip().partition('=')
+        if not sep:
+            continue
+        try:
+            weight = float(weight)
+        except ValueError:
+            weight = -1
+        if name.strip() not in FEATURES or weight < 0:
+            current_app.logger.warning(f"Ignoring invalid SCORING_WEIGHTS entry '{part.strip()}'.")
+            continue
+        weights[name.strip()] = weight
+    return weights
+
+def scoring_weights():
+    """Vetor de pesos na ordem de FEATURE_NAMES (padrões de FEATURES sobrescritos por SCORING_WEIGHTS)."""
+    import numpy as np
+    weights = {name: weight for name, (weight, _) in FEATURES.items()}
+    weights.update(_parse_weights(current_app.config.get('SCORING_WEIGHTS', '')))
+    return np.array([weights[name] for name in FEATURE_NAMES], dtype=np.float64)
+
+def compute_scores(features, weights):
+    """
+    Scores 0-100 de uma matriz (perfis x FEATURE_NAMES): soma ponderada de log1p das contagens
+    (limitadas ao teto de cada feature), normalizada pelo máximo possível. Retorna (scores, segmentos).
+    """
+    import numpy as np
+    saturated = np.log1p(np.minimum(features, _CAPS))
+    maximum = float(np.log1p(_CAPS) @ weights) or 1.0
+    scores = np.round(100.0 * (saturated @ weights) / maximum, 2)
+    segments = np.asarray(SEGMENT_NAMES)[np.digitize(scores, _SEGMENT_BINS)]
+    return scores, segments
+
+def _count_entries(values, predicate=None):
+    # Colunas JSON com dicts {plataforma: ...}; qualquer outro valor conta como vazio
+    if not isinstance(values, dict):
+        return 0
+    if predicate is None:
+        return len(values)
+    return sum(1 for value in values.values() if predicate(value))
+
+def _is_relevant(validation):
+    return isinstance(validation, dict) and bool(validation.get('relevant'))
+
+def profile_features(rows):
+    """Matriz de features (len(rows) x FEATURE_NAMES) de um lote de perfis ordenado por id."""
+    import numpy as np
+    ids = np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows))
+    features = np.zeros((len(rows), len(FEATURE_NAMES)))
+    # Tags por tipo numa única consulta agrupada (chave primária (profile_id, tag_id) da associação)
+    counts = db.session.execute(
+        db.select(fan_profile_tag.c.profile_id, Tag.kind, func.count())
+        .join(Tag, Tag.id == fan_profile_tag.c.tag_id)
+        .where(fan_profile_tag.c.profile_id.in_(ids.tolist()))
+        .group_by(fan_profile_tag.c.profile_id, Tag.kind)
+    ).all()
+    if counts:
+        profile_ids, kinds, values = zip(*counts)
+        columns = [_FEATURE_INDEX[_TAG_FEATURES[kind]] for kind in kinds]
+        features[np.searchsorted(ids, profile_ids), columns] = values
+    # Links e documento (colunas JSON lidas por linha)
+    features[:, _FEATURE_INDEX['esports_link_count']] = [_count_entries(row.esports_profile_links) for row in rows]
+    features[:, _FEATURE_INDEX['validated_link_count']] = [
+        _count_entries(row.esports_link_validations, _is_relevant) for row in rows
+    ]
+    features[:, _FEATURE_INDEX['social_link_count']] = [_count_entries(row.social_media_links) for row in rows]
+    features[:, _FEATURE_INDEX['document_validated']] = [bool(row.document_validated) for row in rows]
+    return features
+
+def _store_scores(rows, features, scores, segments):
+    table = FanScore.__table__
+    now = datetime.utcnow()
+    feature_values = features.astype('int64').tolist()
+    records = [
+        {
+            'profile_id': row.id,
+            'score': score,
+            'segment': segment,
+            **dict(zip(FEATURE_NAMES, values)),
+            'profile_updated_at': row.updated_at,
+            'computed_at': now,
+        }
+        for row, score, segment, values in zip(rows, scores.tolist(), segments.tolist(), feature_values)
+    ]
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.profile_id],
+        set_={column: stmt.excluded[column] for column in records[0] if column != 'profile_id'},
+    )
+    db.session.execute(stmt, records)
+
+def _refresh_since():
+    """
+    Início da janela do recálculo incremental: maior updated_at já calculado, menos uma folga
+    (SCORING_WATERMARK_SLACK) para escritas confirmadas depois de outras mais novas. None = todos.
+    """
+    latest = db.session.scalar(db.select(func.max(FanScore.profile_updated_at)))
+    if latest is None:
+        return None
+    return latest - timedelta(seconds=current_app.config.get('SCORING_WATERMARK_SLACK', 300))
+
+def _pending_query(full, since):
+    query = (
+        db.select(FanProfile.id, FanProfile.updated_at, FanProfile.document_validated,
+                  FanProfile.esports_profile_links, FanProfile.esports_link_validations, FanProfile.social_media_links)
+        .outerjoin(FanScore, FanScore.profile_id == FanProfile.id)
+    )
+    if full:
+        return query
+    # Com score calculado sobre outra versão do perfil (só os alterados desde o último cálculo)
+    changed = FanScore.profile_updated_at != FanProfile.updated_at
+    if since is not None:
+        changed = db.and_(changed, FanProfile.updated_at >= since)
+    # Perfis ainda sem score nunca ficam de fora pela janela: os lotes andam por id, não por
+    # updated_at, e um recálculo interrompido pode ter gravado perfis mais novos que eles
+    return query.where(db.or_(FanScore.profile_id.is_(None), changed))
+
+def refresh_scores(full=False, batch_size=None, echo=None):
+    """
+    Recalcula os scores em lotes por faixa de id, com commit por lote. Sem full, só os perfis
+    alterados desde o último cálculo. Retorna {'scored', 'batches', 'seconds'}.
+    """
+    batch_size = batch_size or current_app.config.get('SCORING_BATCH_SIZE', 2000)
+    weights = scoring_weights()
+    query = _pending_query(full, None if full else _refresh_since())
+    started = time.perf_counter()
+    last_id = 0
+    scored = batches = 0
+    while True:
+        rows = db.session.execute(
+            query.where(FanProfile.id > last_id).order_by(FanProfile.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        features = profile_features(rows)
+        scores, segments = compute_scores(features, weights)
+        _store_scores(rows, features, scores, segments)
+        db.session.commit()
+        last_id = rows[-1].id
+        scored += len(rows)
+        batches += 1
+        if echo:
+            echo(f"Scored {scored} profiles (last id {last_id}).")
+    seconds = time.perf_counter() - started
+    current_app.logger.info(f"Score refresh finished: {scored} profile(s) in {batches} batch(es), {seconds:.2f}s.")
+    return {'scored': scored, 'batches': batches, 'seconds': round(seconds, 3)}
+
+def top_scores(limit, segment=None, cursor=None):
+    """
+    Página do ranking (score e profile_id decrescentes) lida do índice de fan_score.
+    `cursor` é o (score, profile_id) da última linha da página anterior.
+    Retorna (lista de (FanScore, cpf, full_name), has_more).
+    """
+    query = db.select(FanScore, FanProfile.cpf, FanProfile.full_name).join(FanProfile, FanProfile.id == FanScore.profile_id)
+    if segment:
+        query = query.where(FanScore.segment == segment)
+    if cursor:
+        query = query.where(db.tuple_(FanScore.score, FanScore.profile_id) < tuple(cursor))
+    # Busca uma linha a mais para saber se existe próxima página
+    rows = db.session.execute(
+        query.order_by(FanScore.score.desc(), FanScore.profile_id.desc()).limit(limit + 1)
+    ).all()
+    return rows[:limit], len(rows) > limit
+
+# --- Comandos CLI (flask scores ...) ---
+
+scores_cli = AppGroup('scores', help='Score de engajamento dos fãs.')
+
+@scores_cli.command('refresh')
+@click.option('--full', is_flag=True, help='Recalcula todos os perfis (ex: após mudar SCORING_WEIGHTS).')
+@click.option('--batch-size', type=int, default=None, help='Perfis por lote.')
+@click.option('--every', type=float, default=None, help='Repete o recálculo incremental a cada N segundos.')
+def refresh_command(full, batch_size, every):
+    """Recalcula os scores dos perfis alterados desde o último cálculo."""
+    while True:
+        summary = refresh_scores(full=full, batch_size=batch_size, echo=click.echo)
+        click.echo(f"Scored {summary['scored']} profile(s) in {summary['seconds']:.2f}s.")
+        if every is None:
+            break
+        full = False
+        time.sleep(every)
+
+@scores_cli.command('status')
+def status_command():
+    """Mostra os perfis por segmento e quantos aguardam recálculo."""
+    rows = db.session.execute(
+        db.select(FanScore.segment, func.count(), func.max(FanScore.computed_at)).group_by(FanScore.segment)
+    ).all()
+    for segment, count, computed_at in sorted(rows, key=lambda row: SEGMENT_NAMES.index(row[0])):
+        click.echo(f"{segment:<10} {count:>8}  last computed {computed_at.isoformat()}Z")
+    pending = db.session.scalar(db.select(func.count()).select_from(_pending_query(False, None).subquery()))
+    click.echo(f"pending    {pending:>8}")
@@ -0,0 +1,140 @@
+# backend/app/serialization.py
+from datetime import date, datetime
+from functools import lru_cache
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import load_only
+from app import db
+from app.models import FanProfile
+
+try:
+    import orjson
+except ImportError: # Dependência opcional: sem ela, json da biblioteca padrão
+    orjson = None
+
+# Serialização das respostas JSON:
+# - FastJSONProvider: provider do Flask com orjson (bytes direto, sem dict intermediário de strings);
+#   datetimes ingênuos (UTC) saem como ISO 8601 com 'Z', o mesmo formato de FanProfile.to_dict.
+# - Perfis por lista de campos: load_only no ORM (ou só as colunas no Core) e dicts só com os
+#   campos pedidos, sem isoformat() em Python.
+# - stream_json_array: arrays grandes enviados em pedaços, sem montar a resposta inteira na memória.
+
+PROFILE_FIELDS = tuple(FanProfile.__table__.columns.keys())
+# Sempre carregados na listagem: o cursor da próxima página usa (created_at, id)
+_CURSOR_FIELDS = ('id', 'created_at')
+_STREAM_CHUNK_BYTES = 64 * 1024
+
+def _default(value):
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.isoformat() + 'Z' # Datas do banco são UTC ingênuo
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Provider JSON com orjson (quando instalado e JSON_ORJSON_ENABLED); chaves na ordem de inserção."""
+
+    default = staticmethod(_default)
+    ensure_ascii = False
+    sort_keys = False
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.use_orjson = orjson is not None and app.config.get('JSON_ORJSON_ENABLED', True)
+
+    def _orjson_options(self, indent=False):
+        options = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        return options | orjson.OPT_INDENT_2 if indent else options
+
+    def dumps_bytes(self, obj, indent=False):
+        """JSON em UTF-8 (bytes); com orjson não passa por str."""
+        if self.use_orjson:
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+            except TypeError:
+                pass # Tipos que o orjson não aceita (ex: inteiros > 64 bits): biblioteca padrão
+        dump_args = {'indent': 2} if indent else {'separators': (',', ':')}
+        return super().dumps(obj, **dump_args).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs:
+            return self.dumps_bytes(obj).decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.use_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b'\n', mimetype=self.mimetype)
+
+def bytes_encoder():
+    """Função obj -> bytes UTF-8 do provider da aplicação (obtida uma vez por resposta em streaming)."""
+    provider = current_app.json
+    if isinstance(provider, FastJSONProvider):
+        return provider.dumps_bytes
+    return lambda obj: provider.dumps(obj).encode('utf-8')
+
+# --- Perfis ---
+
+@lru_cache(maxsize=256)
+def _load_only_option(fields):
+    names = dict.fromkeys((*_CURSOR_FIELDS, *fields)) # Sem repetir, na ordem
+    return load_only(*(getattr(FanProfile, name) for name in names))
+
+def profile_load_options(fields=None):
+    """Opção load_only com os campos pedidos (e os do cursor); None = todas as colunas."""
+    if not fields:
+        return []
+    # Montar a opção custa mais que ler uma linha: reaproveitada por combinação de campos
+    return [_load_only_option(tuple(fields))]
+
+def profile_values(profile, fields=None):
+    """Dict só com os campos pedidos (valores crus: datetimes ficam para o provider)."""
+    return {name: getattr(profile, name) for name in fields or PROFILE_FIELDS}
+
+def iter_profile_rows(fields=None, batch_size=1000):
+    """
+    Todos os perfis (ordem de id) como dicts com os campos pedidos, lidos só das colunas
+    necessárias e sem objetos do ORM. Usa yield_per (cursor do lado do servidor no PostgreSQL).
+    """
+    table = FanProfile.__table__
+    columns = [table.c[name] for name in fields or PROFILE_FIELDS]
+    query = db.select(*columns).order_by(table.c.id).execution_options(yield_per=batch_size)
+    for row in db.session.execute(query).mappings():
+        yield dict(row)
+
+def stream_json_array(items, prefix=b'[', suffix=b']'):
+    """
+    Gera um array JSON em pedaços de ~64KB: `prefix`, os itens separados por vírgula e `suffix`.
+    prefix/suffix permitem envolver o array (ex: b'{"items":[' e b']}').
+    """
+    encode = bytes_encoder()
+    buffer = bytearray(prefix)
+    first = True
+    for item in items:
+        if not first:
+            buffer += b','
+        buffer += encode(item)
+        first = False
+        if len(buffer) >= _STREAM_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += suffix
+    yield bytes(buffer)
+
+def iter_ndjson(items):
+    """Mesmo que stream_json_array, mas um objeto JSON por linha (NDJSON)."""
+    encode = bytes_encoder()
+    buffer = bytearray()
+    for item in items:
+        buffer += encode(item)
+        buffer += b'\n'
+        if len(buffer) >= _STREAM_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
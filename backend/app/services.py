@@ -1,19 +1,31 @@
 # backend/app/services.py (ATUALIZADO para analisar Title/Meta Tags)
+import contextvars
 import os
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Lock
 from flask import current_app
-import re
+from app.http_client import get_http_session, get_http_timeout
+from app.html_head import extract_head_metadata
+from app.keywords import get_url_matcher, get_content_matcher, get_min_content_keywords
+from app import link_cache, outbound
+from app.document_validator import validate_documents
+from app.metrics import OutboundCall
 
-# --- FUNÇÃO 1: PLACEHOLDER PARA VALIDAÇÃO DE DOCUMENTO COM IA ---
-def validate_document_with_ai(file_path):
+# Pool compartilhado pelo processo para validar links em paralelo.
+# Criado sob demanda para respeitar ESPORTS_VALIDATION_MAX_WORKERS da config.
+_link_validation_executor = None
+_link_validation_executor_lock = Lock()
+
+# --- FUNÇÃO 1: VALIDAÇÃO DE DOCUMENTO (OCR LOCAL, VER app/document_validator.py) ---
+def validate_document_with_ai(file_path, expected_cpf=None):
     """
-    Placeholder para validação de documento usando AI.
-    Retorna True para simular sucesso no desafio.
+    Valida um documento com o validador configurado (DOCUMENT_VALIDATOR).
+    Recebe a imagem normalizada do documento (ver app/documents.py) e o CPF do perfil.
+    A fila de jobs valida em lotes via validate_documents; esta função é para um documento avulso.
     """
-    current_app.logger.info(f"AI PLACEHOLDER: Attempting document validation for {file_path}")
-    return True
+    current_app.logger.info(f"Attempting document validation for {file_path}")
+    return validate_documents([{'image_path': file_path, 'expected_cpf': expected_cpf}])[0]['valid']
 
 # --- FUNÇÃO 2: PARA VALIDAR LINKS DE ESPORTS (MODIFICADA) ---
 def validate_esports_link_relevance(profile_url):
@@ -23,9 +35,59 @@ def validate_esports_link_relevance(profile_url):
     2. Se URL OK, tenta fazer scraping e analisa APENAS <title> e <meta name="description"> por keywords.
     Retorna True se o conteúdo (title/meta) for relevante, False caso contrário.
     """
+    try:
+        return check_esports_link(profile_url)['relevant']
+    except outbound.HostUnavailable:
+        return False # Host indisponível: não validado (e fora do cache)
+
+def check_esports_link(profile_url):
+    """
+    Mesma validação de validate_esports_link_relevance, mas retorna o veredito completo:
+    {'relevant': bool, 'matched_keywords': [...], 'checked_at': 'ISO8601Z'}.
+    Vereditos de conteúdo passam pelo cache (memória + banco) de link_cache,
+    com revalidação por ETag/Last-Modified quando a entrada expira.
+    Levanta outbound.HostUnavailable se o agendador não liberar a requisição ao host.
+    """
     current_app.logger.info(f"Attempting relevance validation for URL: {profile_url}")
 
-    # --- Etapa 1: Checagem da URL (sem mudanças) ---
+    if not url_passes_keyword_check(profile_url):
+        return link_cache.make_verdict(False)
+
+    cached = link_cache.lookup(profile_url)
+    if cached and cached['fresh']:
+        current_app.logger.info(f"Link '{profile_url}' verdict served from cache ({cached['relevant']}).")
+        return link_cache.make_verdict(cached['relevant'], cached['matched_keywords'], cached['checked_at'])
+
+    result = _fetch_and_score_link_content(profile_url, conditional_headers_for(cached))
+    return verdict_from_fetch(profile_url, cached, result)
+
+def conditional_headers_for(cached):
+    """Headers de requisição condicional (ETag/Last-Modified) a partir de uma entrada expirada do cache."""
+    conditional_headers = {}
+    if cached:
+        if cached.get('etag'):
+            conditional_headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            conditional_headers['If-Modified-Since'] = cached['last_modified']
+    return conditional_headers
+
+def verdict_from_fetch(profile_url, cached, result):
+    """Converte o resultado do scraping em veredito, revalidando ou gravando no cache."""
+    if result['not_modified'] and cached:
+        current_app.logger.info(f"Link '{profile_url}' not modified since last check; reusing cached verdict.")
+        entry = link_cache.revalidate(profile_url, cached)
+        return link_cache.make_verdict(entry['relevant'], entry['matched_keywords'], entry['checked_at'])
+
+    if result['cacheable']:
+        entry = link_cache.store(
+            profile_url, result['relevant'], result['matched_keywords'],
+            etag=result['etag'], last_modified=result['last_modified'],
+        )
+        return link_cache.make_verdict(entry['relevant'], entry['matched_keywords'], entry['checked_at'])
+    return link_cache.make_verdict(result['relevant'], result['matched_keywords'])
+
+def url_passes_keyword_check(profile_url):
+    """Etapa 1: checagem barata de formato e keywords na própria URL (sem requisição)."""
     try:
         if not profile_url or not isinstance(profile_url, str) or not profile_url.startswith(('http://', 'https://')):
             current_app.logger.warning(f"Invalid or missing scheme in URL: {profile_url}")
@@ -35,108 +97,217 @@ def validate_esports_link_relevance(profile_url):
              current_app.logger.warning(f"Invalid URL format (missing domain/netloc): {profile_url}")
              return False
         url_string_to_check = (parsed_url.netloc + parsed_url.path).lower()
-        URL_KEYWORDS = [
-            "hltv", "faceit", "steamcommunity", "challengermode", "op.gg",
-            "twitch.tv", "gamersclub", "liquipedia", "furia", "player",
-            "team", "profile", "stats", "user", "pro", "esports", "u", "id"
-        ]
-        url_seems_relevant = any(keyword in url_string_to_check for keyword in URL_KEYWORDS)
+        url_seems_relevant = get_url_matcher().search(url_string_to_check)
         if not url_seems_relevant:
             current_app.logger.info(f"URL '{profile_url}' deemed NOT relevant based on URL keywords.")
             return False
         current_app.logger.info(f"URL '{profile_url}' PASSED preliminary URL keyword check.")
+        return True
     except Exception as url_e:
         current_app.logger.error(f"Error parsing URL '{profile_url}': {url_e}")
         return False
 
-    # --- Etapa 2: Checagem do Conteúdo (Scraping - Focado em Title/Meta) ---
+def _fetch_and_score_link_content(profile_url, conditional_headers=None):
+    """
+    Etapa 2: scraping focado em <title>/<meta name="description"> e contagem de keywords.
+    Retorna um dict com 'relevant', 'matched_keywords', 'etag', 'last_modified',
+    'not_modified' (resposta 304) e 'cacheable' (False para falhas transitórias).
+    """
+    import requests # Carregado na primeira validação, não no boot dos workers
+    result = new_fetch_result()
+    permit = outbound.acquire(profile_url) # Token, vaga e breaker do host (levanta HostUnavailable)
+    failure, retry_after = None, None # Falha do host, registrada no breaker ao final
+    call = OutboundCall(profile_url) # Latência por host em /metrics
     try:
-        headers = { # Headers para simular navegador
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9,pt-BR;q=0.8,pt;q=0.7',
-        }
-        timeout_seconds = 10
-        response = requests.get(profile_url, headers=headers, timeout=timeout_seconds, allow_redirects=True)
-        response.raise_for_status()
-
-        content_type = response.headers.get('content-type', '').lower()
-        if 'html' not in content_type:
-             current_app.logger.warning(f"Content type for '{profile_url}' is not HTML ({content_type}).")
-             return False
+        # Sessão compartilhada (keep-alive, limite de conexões por host e retry em 429/5xx)
+        session = get_http_session()
+        response = session.get(
+            profile_url, headers=conditional_headers or None,
+            timeout=get_http_timeout(), allow_redirects=True, stream=True,
+        )
+        call.status = response.status_code
+        # stream=True: só o <head> é baixado; o restante do corpo é descartado ao fechar
+        with response:
+            if response.status_code == 304:
+                result['not_modified'] = True
+                return result
+            response.raise_for_status()
+            result['etag'] = response.headers.get('ETag')
+            result['last_modified'] = response.headers.get('Last-Modified')
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # --- MODIFICAÇÃO PRINCIPAL: Extrair texto APENAS do Title e Meta Description ---
-        page_text_to_analyze = "" # Inicializa string vazia
-
-        # Extrai texto do <title>
-        title_tag = soup.find('title')
-        if title_tag:
-            title_text = title_tag.get_text(separator=' ', strip=True).lower()
-            page_text_to_analyze += title_text + " " # Adiciona à string de análise
-            current_app.logger.debug(f"Extracted title text: '{title_text}'")
-
-        # Extrai texto do <meta name="description">
-        meta_desc_tag = soup.find('meta', attrs={'name': 'description'})
-        # Verifica se a tag existe e tem o atributo 'content'
-        if meta_desc_tag and meta_desc_tag.get('content'):
-            meta_text = meta_desc_tag.get('content').lower()
-            page_text_to_analyze += meta_text # Adiciona à string de análise
-            current_app.logger.debug(f"Extracted meta description text: '{meta_text}'")
-        # --- FIM DA MODIFICAÇÃO PRINCIPAL ---
-
-        # Verifica se conseguimos extrair algum texto relevante
-        if not page_text_to_analyze.strip():
-             current_app.logger.warning(f"No text extracted from title/meta tags for '{profile_url}'.")
-             return False
+            content_type = response.headers.get('content-type', '').lower()
+            if 'html' not in content_type:
+                 current_app.logger.warning(f"Content type for '{profile_url}' is not HTML ({content_type}).")
+                 result['cacheable'] = True
+                 return result
 
-        # Lista de Keywords para procurar no conteúdo (title + meta)
-        # Pode ser a mesma lista de antes, ou talvez um pouco mais focada
-        CONTENT_KEYWORDS = [
-            "furia", "esports", "e-sports", "csgo", "cs:go", "counter-strike",
-            "valorant", "league of legends", "lol", "player", "jogador", "team",
-            "time", "stats", "statistics", "estatisticas", "ranking", "match",
-            "partida", "hltv", "faceit", "gamers club", "challengermode",
-            "steam", "twitch", "streamer", "pro player", "professional player",
-            "game", "jogo", "art", "fallen", "kscerato", "yuurih", "guerri", "gaules"
-        ]
-        # Talvez reduzir o threshold, já que estamos analisando menos texto?
-        # Ou manter 2 para garantir mais relevância. Vamos manter 2 por enquanto.
-        MIN_CONTENT_KEYWORD_THRESHOLD = 2
-        found_keywords_count = 0
-        found_list = []
-
-        # Conta as keywords encontradas no texto combinado de title e meta
-        for keyword in CONTENT_KEYWORDS:
-            # Usando regex para palavras inteiras (mais preciso)
-            if re.search(r'\b' + re.escape(keyword) + r'\b', page_text_to_analyze, re.IGNORECASE):
-                 found_keywords_count += 1
-                 found_list.append(keyword)
-
-        current_app.logger.info(f"Title/Meta keyword check for '{profile_url}': Found {found_keywords_count} keywords - {found_list}")
-
-        # Retorna True/False baseado na contagem
-        if found_keywords_count >= MIN_CONTENT_KEYWORD_THRESHOLD:
-            current_app.logger.info(f"Link '{profile_url}' CONFIRMED RELEVANT based on title/meta keywords.")
-            return True
-        else:
-            current_app.logger.info(f"Link '{profile_url}' NOT confirmed relevant via title/meta (keyword count < {MIN_CONTENT_KEYWORD_THRESHOLD}).")
-            return False
+            # --- Extrai texto APENAS do Title e Meta Description, lendo a resposta em chunks ---
+            # Sem charset no Content-Type, requests assume ISO-8859-1; para HTML, UTF-8 é o padrão real
+            encoding = response.encoding if 'charset' in content_type else 'utf-8'
+            title_text, meta_text, bytes_read = extract_head_metadata(
+                response.iter_content(chunk_size=current_app.config.get('HTML_HEAD_CHUNK_SIZE', 8192)),
+                encoding=encoding or 'utf-8',
+                max_bytes=current_app.config.get('HTML_HEAD_MAX_BYTES', 256 * 1024),
+            )
+            # A conexão só volta ao pool (keep-alive) se o corpo for lido até o fim;
+            # páginas pequenas são drenadas, páginas grandes têm a conexão descartada
+            content_length = response.headers.get('Content-Length')
+            if content_length and content_length.isdigit() and int(content_length) <= current_app.config.get('HTML_HEAD_DRAIN_MAX_BYTES', 64 * 1024):
+                for _ in response.iter_content(chunk_size=8192):
+                    pass
+        current_app.logger.debug(f"Read {bytes_read} bytes of '{profile_url}' to extract title/meta.")
+
+        return score_head_text(profile_url, title_text, meta_text, result)
 
-    # Tratamento de Erros do Scraping (sem mudanças)
+    # Tratamento de Erros do Scraping (falhas transitórias não vão para o cache)
     except requests.exceptions.Timeout:
         current_app.logger.warning(f"Timeout occurred while fetching content for '{profile_url}'")
-        return False
+        failure = 'timeout'
+        return result
+    except requests.exceptions.RetryError as e:
+        current_app.logger.warning(f"Retries exhausted while fetching content for '{profile_url}': {e}")
+        failure = 'retries exhausted'
+        return result
     except requests.exceptions.TooManyRedirects:
          current_app.logger.warning(f"Too many redirects for '{profile_url}'")
-         return False
+         return result
+    except requests.exceptions.HTTPError as e:
+        status_code = e.response.status_code if e.response is not None else None
+        current_app.logger.error(f"Failed to fetch/process content for '{profile_url}': {e}")
+        # 4xx (ex: 403 anti-scraping, 404) é resposta definitiva do site; 429 e 5xx não
+        result['cacheable'] = status_code is not None and 400 <= status_code < 500 and status_code != 429
+        failure, retry_after = outbound.failure_for_status(status_code, e.response.headers if e.response is not None else None)
+        return result
+    except requests.exceptions.ConnectionError as e:
+        current_app.logger.error(f"Failed to fetch/process content for '{profile_url}': {e}")
+        failure = 'connection error'
+        return result
     except requests.exceptions.RequestException as e:
         current_app.logger.error(f"Failed to fetch/process content for '{profile_url}': {e}")
-        return False
+        return result
     except Exception as e:
         current_app.logger.error(f"Unexpected error during content validation of '{profile_url}': {e}")
-        return False
+        return result
+    finally:
+        call.finish()
+        outbound.release(permit, failure, retry_after)
+
+def new_fetch_result():
+    """Resultado vazio do scraping (falha transitória, fora do cache) preenchido pelas etapas seguintes."""
+    return {
+        'relevant': False, 'matched_keywords': [], 'etag': None, 'last_modified': None,
+        'not_modified': False, 'cacheable': False,
+    }
+
+def score_head_text(profile_url, title_text, meta_text, result):
+    """Conta as keywords de conteúdo no <title>/<meta description> lidos e preenche o resultado."""
+    page_text_to_analyze = "" # Inicializa string vazia
+    if title_text:
+        title_text = title_text.lower()
+        page_text_to_analyze += title_text + " " # Adiciona à string de análise
+        current_app.logger.debug(f"Extracted title text: '{title_text}'")
+    if meta_text:
+        meta_text = meta_text.lower()
+        page_text_to_analyze += meta_text # Adiciona à string de análise
+        current_app.logger.debug(f"Extracted meta description text: '{meta_text}'")
+    # --- FIM DA EXTRAÇÃO ---
+
+    # A partir daqui o veredito depende só do conteúdo, então pode ir para o cache
+    result['cacheable'] = True
+
+    # Verifica se conseguimos extrair algum texto relevante
+    if not page_text_to_analyze.strip():
+         current_app.logger.warning(f"No text extracted from title/meta tags for '{profile_url}'.")
+         return result
+
+    # Keywords (title + meta) casadas em uma única passada; listas e mínimo vêm da config
+    MIN_CONTENT_KEYWORD_THRESHOLD = get_min_content_keywords()
+    found_list = get_content_matcher().find_all(page_text_to_analyze)
+    found_keywords_count = len(found_list)
+
+    current_app.logger.info(f"Title/Meta keyword check for '{profile_url}': Found {found_keywords_count} keywords - {found_list}")
+    result['matched_keywords'] = found_list
+
+    # Retorna True/False baseado na contagem
+    if found_keywords_count >= MIN_CONTENT_KEYWORD_THRESHOLD:
+        current_app.logger.info(f"Link '{profile_url}' CONFIRMED RELEVANT based on title/meta keywords.")
+        result['relevant'] = True
+    else:
+        current_app.logger.info(f"Link '{profile_url}' NOT confirmed relevant via title/meta (keyword count < {MIN_CONTENT_KEYWORD_THRESHOLD}).")
+    return result
+
+# --- FUNÇÃO 2.1: VALIDAÇÃO CONCORRENTE DE VÁRIOS LINKS ---
+def _get_link_validation_executor():
+    """Retorna o pool de threads usado na validação de links, criando-o se necessário."""
+    global _link_validation_executor
+    if _link_validation_executor is None:
+        with _link_validation_executor_lock:
+            if _link_validation_executor is None:
+                max_workers = current_app.config.get('ESPORTS_VALIDATION_MAX_WORKERS', 8)
+                _link_validation_executor = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix='esports-link'
+                )
+    return _link_validation_executor
+
+def reset_link_validation_executor():
+    """Descarta o pool (ex: após fork com --preload, as threads do processo pai não existem no filho)."""
+    global _link_validation_executor
+    with _link_validation_executor_lock:
+        _link_validation_executor = None
+
+def _check_link_in_app_context(app, profile_url):
+    """Executa check_esports_link dentro do contexto da app (threads não herdam o contexto)."""
+    with app.app_context():
+        return check_esports_link(profile_url)
+
+def check_esports_links(links, defer_unavailable=False):
+    """
+    Valida vários links eSports em paralelo.
+    Recebe um dict {plataforma: url} e retorna {plataforma: veredito} (ver check_esports_link).
+    Todo o lote respeita um prazo total (ESPORTS_VALIDATION_DEADLINE); links que não
+    terminarem dentro do prazo são reportados como não validados.
+    Links cujo host o agendador não liberou (app/outbound.py) também; com defer_unavailable=True
+    (jobs) o lote levanta HostUnavailable para ser repetido depois (os demais já ficam no cache).
+    """
+    if not links:
+        return {}
+
+    app = current_app._get_current_object()
+    deadline = current_app.config.get('ESPORTS_VALIDATION_DEADLINE', 15)
+    executor = _get_link_validation_executor()
+
+    futures = {
+        # copy_context: spans/métricas da requisição seguem para as threads do pool
+        platform: executor.submit(contextvars.copy_context().run, _check_link_in_app_context, app, url)
+        for platform, url in links.items()
+    }
+    done, not_done = wait(futures.values(), timeout=deadline)
+
+    results = {}
+    unavailable = []
+    for platform, future in futures.items():
+        if future in not_done:
+            # Não bloqueia a requisição; a thread termina sozinha e o resultado é descartado
+            future.cancel()
+            current_app.logger.warning(f"Validation of '{platform}' link exceeded the {deadline}s deadline.")
+            results[platform] = link_cache.make_verdict(False)
+            continue
+        try:
+            results[platform] = future.result()
+        except outbound.HostUnavailable as e:
+            current_app.logger.warning(f"Validation of '{platform}' link not attempted: {e}")
+            unavailable.append(e)
+            results[platform] = link_cache.make_verdict(False)
+        except Exception as e:
+            current_app.logger.error(f"Unexpected error validating '{platform}' link: {e}")
+            results[platform] = link_cache.make_verdict(False)
+    if defer_unavailable and unavailable:
+        raise max(unavailable, key=lambda e: e.retry_after)
+    return results
+
+def validate_esports_links(links):
+    """Versão resumida de check_esports_links: retorna {plataforma: bool}."""
+    return {platform: verdict['relevant'] for platform, verdict in check_esports_links(links).items()}
 
 # --- FUNÇÃO 3: PARA VERIFICAR EXTENSÃO DE ARQUIVO PERMITIDA ---
 def allowed_file(filename):
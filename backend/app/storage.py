@@ -0,0 +1,353 @@
+# backend/app/storage.py
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from flask import Request, current_app
+
+# Armazenamento dos documentos enviados, endereçado por conteúdo (SHA-256).
+# O corpo do upload é gravado direto no destino, em chunks, enquanto o hash é
+# calculado; arquivos iguais viram a mesma chave (deduplicação).
+# Backends: 'local' (UPLOAD_FOLDER) e 's3' (S3 ou compatível: MinIO, moto).
+
+DOCUMENTS_PREFIX = 'documents'
+
+def content_key(sha256, extension=None):
+    """Chave do documento a partir do hash: documents/ab/abcdef....pdf"""
+    extension = (extension or '').lower().lstrip('.')
+    name = f"{sha256}.{extension}" if extension else sha256
+    return f"{DOCUMENTS_PREFIX}/{sha256[:2]}/{name}"
+
+class UploadWriter:
+    """
+    Destino de escrita de um arquivo em upload (usado como stream pelo parser
+    multipart do Werkzeug). Calcula SHA-256 e tamanho conforme os chunks chegam.
+    Só vira um documento após finalize(); close() sem finalize descarta o conteúdo.
+    """
+
+    def __init__(self, filename=None, content_type=None):
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        self.sha256 = None
+        self.key = None
+        self.deduplicated = False
+        self._hasher = hashlib.sha256()
+        self._closed = False
+
+    def write(self, data):
+        self._hasher.update(data)
+        self.size += len(data)
+        self._write(data)
+        return len(data)
+
+    def seek(self, offset, whence=0):
+        # O parser volta ao início ao terminar a parte; o conteúdo já está no destino
+        return 0
+
+    def tell(self):
+        return self.size
+
+    def read(self, size=-1):
+        raise OSError("Upload já foi gravado no storage; leia pela chave do documento.")
+
+    def finalize(self, extension=None):
+        """Conclui o upload e retorna a chave do documento (documents/<sha>.<ext>)."""
+        if self.key is None:
+            self.sha256 = self._hasher.hexdigest()
+            self.key = content_key(self.sha256, extension)
+            self.deduplicated = not self._commit(self.key)
+        return self.key
+
+    def abort(self):
+        """Descarta o que foi gravado (upload rejeitado ou com erro)."""
+        if self.key is None and not self._closed:
+            self._closed = True
+            self._abort()
+
+    def close(self):
+        if self.key is None:
+            self.abort()
+
+    @property
+    def closed(self):
+        return self._closed or self.key is not None
+
+    # Implementados pelos backends
+    def _write(self, data):
+        raise NotImplementedError
+
+    def _commit(self, key):
+        """Move o conteúdo para `key`. Retorna False se a chave já existia (deduplicado)."""
+        raise NotImplementedError
+
+    def _abort(self):
+        raise NotImplementedError
+
+class StorageBackend:
+    """Interface dos backends de armazenamento de documentos."""
+
+    name = None
+
+    def open_upload(self, filename=None, content_type=None):
+        """Retorna um UploadWriter para gravar um upload em streaming."""
+        raise NotImplementedError
+
+    def put(self, key, data, content_type=None):
+        """Grava `data` (bytes) numa chave fixa, ex: derivados de um documento."""
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def open(self, key):
+        """Abre o documento para leitura (objeto com read())."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    @contextmanager
+    def local_path(self, key):
+        """Caminho local do documento durante o bloco (backends remotos baixam para um arquivo temporário)."""
+        suffix = os.path.splitext(key)[1]
+        with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+            with self.open(key) as source:
+                shutil.copyfileobj(source, tmp)
+            tmp.flush()
+            yield tmp.name
+
+# --- Backend local ---
+
+class _LocalUploadWriter(UploadWriter):
+    def __init__(self, storage, filename=None, content_type=None):
+        super().__init__(filename, content_type)
+        self._storage = storage
+        # Temporário dentro do próprio root: o rename final é atômico (mesmo filesystem)
+        self._file = tempfile.NamedTemporaryFile(dir=storage.tmp_dir, prefix='upload-', delete=False)
+
+    def _write(self, data):
+        self._file.write(data)
+
+    def _commit(self, key):
+        self._file.close()
+        path = self._storage.path_for(key)
+        if os.path.exists(path):
+            os.remove(self._file.name)
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self._file.name, path)
+        return True
+
+    def _abort(self):
+        self._file.close()
+        try:
+            os.remove(self._file.name)
+        except FileNotFoundError:
+            pass
+
+class LocalStorage(StorageBackend):
+    """Documentos em disco, sob `root` (UPLOAD_FOLDER)."""
+
+    name = 'local'
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.tmp_dir = os.path.join(self.root, '.tmp')
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def path_for(self, key):
+        # Perfis antigos guardavam o caminho absoluto do arquivo em document_path
+        if os.path.isabs(key):
+            return key
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def open_upload(self, filename=None, content_type=None):
+        return _LocalUploadWriter(self, filename, content_type)
+
+    def put(self, key, data, content_type=None):
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.tmp_dir, prefix='put-', delete=False) as tmp:
+            tmp.write(data)
+        os.replace(tmp.name, path)
+
+    def exists(self, key):
+        return os.path.exists(self.path_for(key))
+
+    def open(self, key):
+        return open(self.path_for(key), 'rb')
+
+    def delete(self, key):
+        try:
+            os.remove(self.path_for(key))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def local_path(self, key):
+        yield self.path_for(key)
+
+# --- Backend S3 (boto3 é opcional: só necessário com STORAGE_BACKEND=s3) ---
+
+_S3_MIN_PART_SIZE = 5 * 1024 * 1024 # Mínimo do S3 para partes de multipart (exceto a última)
+
+class _S3UploadWriter(UploadWriter):
+    """
+    Acumula até `part_size` bytes em memória. Arquivos menores viram um único
+    put_object na chave final; maiores usam multipart upload numa chave temporária,
+    copiada para a chave do conteúdo no final (o hash só é conhecido no fim).
+    """
+
+    def __init__(self, storage, filename=None, content_type=None):
+        super().__init__(filename, content_type)
+        self._storage = storage
+        self._buffer = bytearray()
+        self._tmp_key = None
+        self._upload_id = None
+        self._parts = []
+
+    def _write(self, data):
+        self._buffer.extend(data)
+        if len(self._buffer) >= self._storage.part_size:
+            self._upload_part()
+
+    def _upload_part(self):
+        s3 = self._storage.client
+        if self._upload_id is None:
+            self._tmp_key = self._storage.object_key(f".tmp/{uuid.uuid4().hex}")
+            extra = {'ContentType': self.content_type} if self.content_type else {}
+            self._upload_id = s3.create_multipart_upload(Bucket=self._storage.bucket, Key=self._tmp_key, **extra)['UploadId']
+        part_number = len(self._parts) + 1
+        response = s3.upload_part(
+            Bucket=self._storage.bucket, Key=self._tmp_key, UploadId=self._upload_id,
+            PartNumber=part_number, Body=bytes(self._buffer),
+        )
+        self._parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+        self._buffer.clear()
+
+    def _commit(self, key):
+        s3 = self._storage.client
+        bucket = self._storage.bucket
+        object_key = self._storage.object_key(key)
+        exists = self._storage.exists(key)
+        if self._upload_id is None:
+            if not exists:
+                extra = {'ContentType': self.content_type} if self.content_type else {}
+                s3.put_object(Bucket=bucket, Key=object_key, Body=bytes(self._buffer), **extra)
+            self._buffer.clear()
+            return not exists
+
+        if exists:
+            s3.abort_multipart_upload(Bucket=bucket, Key=self._tmp_key, UploadId=self._upload_id)
+            return False
+        if self._buffer:
+            self._upload_part()
+        s3.complete_multipart_upload(
+            Bucket=bucket, Key=self._tmp_key, UploadId=self._upload_id,
+            MultipartUpload={'Parts': self._parts},
+        )
+        s3.copy({'Bucket': bucket, 'Key': self._tmp_key}, bucket, object_key)
+        s3.delete_object(Bucket=bucket, Key=self._tmp_key)
+        return True
+
+    def _abort(self):
+        self._buffer.clear()
+        if self._upload_id is not None:
+            try:
+                self._storage.client.abort_multipart_upload(
+                    Bucket=self._storage.bucket, Key=self._tmp_key, UploadId=self._upload_id)
+            except Exception as e:
+                current_app.logger.warning(f"Could not abort multipart upload {self._upload_id}: {e}")
+
+class S3Storage(StorageBackend):
+    """Documentos num bucket S3 (ou compatível, via endpoint_url)."""
+
+    name = 's3'
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, region_name=None, part_size=8 * 1024 * 1024):
+        try:
+            import boto3
+            from botocore.exceptions import ClientError
+        except ImportError as e:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3).") from e
+        if not bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires S3_BUCKET.")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.part_size = max(part_size, _S3_MIN_PART_SIZE)
+        self.client = boto3.client('s3', endpoint_url=endpoint_url or None, region_name=region_name or None)
+        self._client_error = ClientError
+
+    def object_key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def open_upload(self, filename=None, content_type=None):
+        return _S3UploadWriter(self, filename, content_type)
+
+    def put(self, key, data, content_type=None):
+        extra = {'ContentType': content_type} if content_type else {}
+        self.client.put_object(Bucket=self.bucket, Key=self.object_key(key), Body=data, **extra)
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+            return True
+        except self._client_error as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self.object_key(key))['Body']
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+
+# --- Acesso ao backend configurado ---
+
+def _build_storage(config):
+    backend = (config.get('STORAGE_BACKEND') or 'local').lower()
+    if backend == 'local':
+        return LocalStorage(config['UPLOAD_FOLDER'])
+    if backend == 's3':
+        return S3Storage(
+            bucket=config.get('S3_BUCKET'),
+            prefix=config.get('S3_PREFIX', ''),
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region_name=config.get('S3_REGION'),
+            part_size=config.get('S3_MULTIPART_PART_SIZE', 8 * 1024 * 1024),
+        )
+    raise RuntimeError(f"Unknown STORAGE_BACKEND '{backend}' (use 'local' or 's3').")
+
+def get_storage(app=None):
+    """Backend de armazenamento da aplicação (criado na primeira chamada)."""
+    app = app or current_app._get_current_object()
+    storage = app.extensions.get('document_storage')
+    if storage is None:
+        storage = app.extensions['document_storage'] = _build_storage(app.config)
+    return storage
+
+# Rotas cujos arquivos vão direto para o storage; nas demais o Werkzeug usa o arquivo temporário padrão
+STREAMING_UPLOAD_ENDPOINTS = {'main.upload_document'}
+
+class StreamingUploadRequest(Request):
+    """
+    Request que grava os arquivos de formulários multipart direto no storage,
+    em vez do arquivo temporário (SpooledTemporaryFile) padrão do Werkzeug.
+    Só vale para as rotas de STREAMING_UPLOAD_ENDPOINTS e para arquivos com
+    extensão permitida; a rota confere o perfil antes de ler request.files.
+    `request.files[...].stream` é um UploadWriter; a rota chama finalize() para
+    obter a chave. Uploads não finalizados são descartados quando a requisição fecha.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        from app.services import allowed_file
+        if self.endpoint in STREAMING_UPLOAD_ENDPOINTS and allowed_file(filename):
+            return get_storage().open_upload(filename=filename, content_type=content_type)
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
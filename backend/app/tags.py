@@ -0,0 +1,226 @@
+# backend/app/tags.py
+import re
+import unicodedata
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func
+from app import db
+from app.models import FanProfile, Tag, fan_profile_tag
+from app.utils import dialect_insert
+
+# Normalização dos campos de texto livre do perfil (interests, events_last_year, ...)
+# em tags canônicas, para consultas de segmento por joins indexados em vez de LIKE.
+# ATENÇÃO: a migração de backfill (f5b12b7cde70) tem uma cópia própria desta normalização;
+# mudanças nos aliases só afetam perfis existentes após `flask tags rebuild`.
+
+# Campo do perfil -> tipo da tag
+TAG_FIELDS = {
+    'interests': 'interest',
+    'activities_last_year': 'activity',
+    'events_last_year': 'event',
+    'purchases_last_year': 'purchase',
+}
+TAG_KINDS = tuple(TAG_FIELDS.values())
+
+# Grafias alternativas (comparadas sem acentos, espaços e pontuação) -> nome canônico
+_ALIASES = {
+    'counter-strike': ('csgo', 'cs', 'cs2', 'counterstrike', 'counterstrike2', 'counterstrikego',
+                       'counterstrikeglobaloffensive', 'globaloffensive'),
+    'league of legends': ('lol', 'leagueoflegends', 'league'),
+    'valorant': ('valorant', 'valo', 'vava'),
+    'rainbow six siege': ('r6', 'r6s', 'rainbowsix', 'rainbowsixsiege', 'rainbow6'),
+    'dota 2': ('dota', 'dota2'),
+    'free fire': ('freefire', 'ff'),
+    'fortnite': ('fortnite',),
+    'rocket league': ('rocketleague', 'rl'),
+    'apex legends': ('apex', 'apexlegends'),
+    'pubg': ('pubg', 'pubgmobile', 'playerunknownsbattlegrounds'),
+    'kings league': ('kingsleague', 'kingsleaguebrazil'),
+    'iem cologne': ('iemcologne', 'iemcolonia', 'intelextrememasterscologne'),
+    'iem rio': ('iemrio', 'iemriomajor'),
+    'cs major': ('major', 'csmajor', 'csgomajor', 'cs2major'),
+    'cblol': ('cblol', 'campeonatobrasileirodelol', 'campeonatobrasileirodeleagueoflegends'),
+    'brasil game show': ('bgs', 'brasilgameshow', 'brazilgameshow'),
+    'gamers club': ('gc', 'gamersclub'),
+    'faceit': ('faceit',),
+    'furia': ('furia', 'furiaesports', 'furiagg'),
+}
+_ALIAS_LOOKUP = {alias: canonical for canonical, aliases in _ALIASES.items() for alias in aliases}
+
+_SPLIT_RE = re.compile(r'[,;\n]+')
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+def split_tags(text):
+    """Divide um campo de texto livre ("CS:GO, LoL; Valorant") em termos."""
+    if not text:
+        return []
+    return [part.strip() for part in _SPLIT_RE.split(text) if part.strip()]
+
+def _strip_accents(value):
+    return ''.join(c for c in unicodedata.normalize('NFKD', value) if not unicodedata.combining(c))
+
+def canonicalize_tag(term):
+    """
+    Nome canônico de um termo: aplica os aliases conhecidos ("CS:GO", "csgo",
+    "Counter-Strike" -> "counter-strike"); senão, minúsculas sem acentos e com
+    espaços normalizados. Retorna None para termos vazios.
+    """
+    base = _strip_accents(term).lower()
+    compact = _NON_WORD_RE.sub('', base)
+    if not compact:
+        return None
+    if compact in _ALIAS_LOOKUP:
+        return _ALIAS_LOOKUP[compact]
+    return ' '.join(_NON_WORD_RE.sub(' ', base).split())[:100]
+
+def profile_tag_keys(values):
+    """Conjunto de (tipo, nome canônico) a partir de um dict/objeto com os campos de texto do perfil."""
+    keys = set()
+    for field, kind in TAG_FIELDS.items():
+        text = values.get(field) if isinstance(values, dict) else getattr(values, field)
+        for term in split_tags(text):
+            name = canonicalize_tag(term)
+            if name:
+                keys.add((kind, name))
+    return keys
+
+def _chunks(items, size=500):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def ensure_tags(keys, conn=None):
+    """Garante que as tags (tipo, nome) existam e retorna {(tipo, nome): id}."""
+    conn = conn if conn is not None else db.session
+    bind = conn if hasattr(conn, 'dialect') else None
+    table = Tag.__table__
+    keys = set(keys)
+    ids = {}
+    for chunk in _chunks(keys):
+        conn.execute(
+            dialect_insert(table, bind=bind).on_conflict_do_nothing(index_elements=[table.c.kind, table.c.name]),
+            [{'kind': kind, 'name': name} for kind, name in chunk],
+        )
+        rows = conn.execute(
+            db.select(table.c.id, table.c.kind, table.c.name)
+            .where(db.tuple_(table.c.kind, table.c.name).in_(chunk))
+        )
+        ids.update({(row.kind, row.name): row.id for row in rows})
+    return ids
+
+def replace_profile_tags(profile_rows, conn=None):
+    """
+    Substitui as tags dos perfis informados. `profile_rows` são dicts/objetos com 'id'
+    e os campos de texto. Executa na transação atual (o commit fica com o chamador).
+    """
+    conn = conn if conn is not None else db.session
+    desired = {}
+    for row in profile_rows:
+        profile_id = row['id'] if isinstance(row, dict) else row.id
+        desired[profile_id] = profile_tag_keys(row)
+    if not desired:
+        return
+    tag_ids = ensure_tags(set().union(*desired.values()), conn=conn)
+    for chunk in _chunks(desired.keys()):
+        conn.execute(fan_profile_tag.delete().where(fan_profile_tag.c.profile_id.in_(chunk)))
+    pairs = [{'profile_id': profile_id, 'tag_id': tag_ids[key]} for profile_id, keys in desired.items() for key in keys]
+    for chunk in _chunks(pairs, 1000):
+        conn.execute(fan_profile_tag.insert(), chunk)
+
+def sync_profile_tags(profile):
+    """Atualiza as tags de um perfil do ORM (faz flush para garantir o id)."""
+    if profile.id is None:
+        db.session.flush()
+    replace_profile_tags([profile])
+    # A relação 'tags' carregada ficaria desatualizada após o SQL direto
+    db.session.expire(profile, ['tags'])
+
+def backfill_profile_tags(conn, batch_size=1000, echo=None, commit=False):
+    """
+    Recalcula as tags de todos os perfis em lotes por faixa de id. Retorna o total processado.
+    Com commit=True, cada lote é confirmado separadamente (transações curtas).
+    """
+    table = FanProfile.__table__
+    columns = [table.c.id] + [table.c[field] for field in TAG_FIELDS]
+    last_id = 0
+    total = 0
+    while True:
+        rows = conn.execute(
+            db.select(*columns).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+        ).mappings().all()
+        if not rows:
+            break
+        replace_profile_tags([dict(row) for row in rows], conn=conn)
+        if commit:
+            conn.commit()
+        last_id = rows[-1]['id']
+        total += len(rows)
+        if echo:
+            echo(f"Tagged {total} profiles (last id {last_id}).")
+    return total
+
+def parse_tag_terms(value):
+    """Converte "interest:csgo,event:Major" em [('interest', 'counter-strike'), ('event', 'cs major')]."""
+    terms = []
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        kind, sep, term = part.partition(':')
+        kind = kind.strip().lower()
+        if not sep or kind not in TAG_KINDS:
+            raise ValueError(f"Termo inválido '{part}'. Use <tipo>:<nome>, com tipo em {', '.join(TAG_KINDS)}.")
+        name = canonicalize_tag(term)
+        if not name:
+            raise ValueError(f"Termo inválido '{part}'.")
+        terms.append((kind, name))
+    return terms
+
+def count_segment(all_terms=(), any_terms=()):
+    """
+    Conta perfis que têm TODAS as tags de `all_terms` e, se informado, PELO MENOS UMA de `any_terms`.
+    Usa o índice (tag_id, profile_id) da associação; nenhum texto é varrido.
+    """
+    table = Tag.__table__
+    def resolve(terms):
+        if not terms:
+            return {}
+        rows = db.session.execute(
+            db.select(table.c.id, table.c.kind, table.c.name).where(db.tuple_(table.c.kind, table.c.name).in_(list(terms)))
+        )
+        return {(row.kind, row.name): row.id for row in rows}
+
+    all_ids = resolve(set(all_terms))
+    any_ids = resolve(set(any_terms))
+    if len(all_ids) < len(set(all_terms)) or (any_terms and not any_ids):
+        return 0 # Alguma tag obrigatória não existe em nenhum perfil
+
+    association = fan_profile_tag.c
+    if all_ids:
+        matching = (
+            db.select(association.profile_id)
+            .where(association.tag_id.in_(list(all_ids.values())))
+            .group_by(association.profile_id)
+            .having(func.count() == len(all_ids))
+        )
+        if any_ids:
+            matching = matching.where(association.profile_id.in_(
+                db.select(association.profile_id).where(association.tag_id.in_(list(any_ids.values())))
+            ))
+    elif any_ids:
+        matching = db.select(association.profile_id).where(association.tag_id.in_(list(any_ids.values()))).distinct()
+    else:
+        return db.session.scalar(db.select(func.count()).select_from(FanProfile))
+    return db.session.scalar(db.select(func.count()).select_from(matching.subquery()))
+
+# --- Comandos CLI (flask tags ...) ---
+
+tags_cli = AppGroup('tags', help='Tags normalizadas dos perfis.')
+
+@tags_cli.command('rebuild')
+@click.option('--batch-size', type=int, default=1000, help='Perfis por lote.')
+def rebuild_command(batch_size):
+    """Recalcula as tags de todos os perfis (ex: após mudar os aliases)."""
+    with db.engine.connect() as conn:
+        total = backfill_profile_tags(conn, batch_size=batch_size, echo=click.echo, commit=True)
+    click.echo(f"Rebuilt tags for {total} profile(s).")
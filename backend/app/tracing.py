@@ -0,0 +1,197 @@
+# backend/app/tracing.py
+import os
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+# Spans no formato do OpenTelemetry (OTLP/HTTP JSON), enviados em lote por uma
+# thread em background para um coletor local (ex: otel-collector em :4318).
+# Desligado por padrão: só é ativado com TRACING_OTLP_ENDPOINT (ver init_tracing).
+# Sem SDK: só o necessário para requisições, queries e chamadas externas.
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+_current_span = ContextVar('kyf_current_span', default=None)
+
+_exporter = None
+
+class Span:
+    __slots__ = ('trace_id', 'span_id', 'parent_span_id', 'name', 'kind', 'start_ns', 'end_ns', 'attributes', 'error', '_token')
+
+    def __init__(self, name, kind, trace_id, parent_span_id=None, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_otlp(self):
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_otlp_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            'status': {'code': 2, 'message': self.error} if self.error else {'code': 1},
+        }
+        if self.parent_span_id:
+            span['parentSpanId'] = self.parent_span_id
+        return span
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+def _parse_traceparent(header):
+    """Lê o header W3C traceparent ('00-<trace>-<span>-<flags>'). Retorna (trace_id, span_id) ou None."""
+    parts = (header or '').strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1], parts[2]
+
+class _OtlpExporter:
+    """Fila limitada + thread que envia lotes de spans; spans são descartados se a fila encher."""
+
+    def __init__(self, endpoint, service_name, sample_ratio=1.0, batch_size=256, flush_interval=2.0, max_queue=10000):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.service_name = service_name
+        self.sample_ratio = sample_ratio
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.dropped = 0
+        self.exported = 0
+        self._pid = None
+        self._queue = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        # Após fork (gunicorn) a thread do processo pai não existe no filho
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._queue = queue.Queue(maxsize=self.max_queue)
+                    threading.Thread(target=self._run, name='otlp-exporter', daemon=True).start()
+                    self._pid = pid
+
+    def submit(self, span):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        import requests # Só com o exportador ativo (TRACING_OTLP_ENDPOINT)
+        session = requests.Session()
+        spans_queue = self._queue
+        while True:
+            batch = [spans_queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(spans_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._export(session, batch)
+
+    def _export(self, session, spans):
+        body = {'resourceSpans': [{
+            'resource': {'attributes': [
+                _otlp_attribute('service.name', self.service_name),
+                _otlp_attribute('process.pid', os.getpid()),
+            ]},
+            'scopeSpans': [{'scope': {'name': 'know-your-fan'}, 'spans': [span.to_otlp() for span in spans]}],
+        }]}
+        import requests
+        try:
+            session.post(self.url, json=body, timeout=5).raise_for_status()
+            self.exported += len(spans)
+        except requests.exceptions.RequestException:
+            # Coletor fora do ar não pode afetar as requisições: os spans do lote são perdidos
+            self.dropped += len(spans)
+
+def init_tracing(config):
+    """Ativa o envio de spans se TRACING_OTLP_ENDPOINT estiver configurado."""
+    global _exporter
+    endpoint = config.get('TRACING_OTLP_ENDPOINT')
+    if endpoint and _exporter is None:
+        _exporter = _OtlpExporter(
+            endpoint,
+            service_name=config.get('TRACING_SERVICE_NAME', 'know-your-fan-api'),
+            sample_ratio=config.get('TRACING_SAMPLE_RATIO', 1.0),
+        )
+    return _exporter is not None
+
+def tracing_enabled():
+    return _exporter is not None
+
+def get_tracing_stats():
+    if _exporter is None:
+        return {'enabled': False}
+    return {'enabled': True, 'exported': _exporter.exported, 'dropped': _exporter.dropped}
+
+def start_span(name, kind=SPAN_KIND_INTERNAL, attributes=None, root=False, traceparent=None):
+    """
+    Abre um span filho do span atual. Com root=True (requisição, job) abre um trace novo,
+    amostrado por TRACING_SAMPLE_RATIO, ou continua o traceparent recebido.
+    Retorna None se o tracing estiver desligado ou não houver trace amostrado em andamento.
+    """
+    if _exporter is None:
+        return None
+    parent = _current_span.get()
+    if parent is not None:
+        span = Span(name, kind, parent.trace_id, parent.span_id, attributes)
+    elif root:
+        remote = _parse_traceparent(traceparent)
+        if remote is None and random.random() >= _exporter.sample_ratio:
+            return None
+        trace_id, parent_id = remote if remote else (os.urandom(16).hex(), None)
+        span = Span(name, kind, trace_id, parent_id, attributes)
+    else:
+        return None
+    span._token = _current_span.set(span)
+    return span
+
+def end_span(span, error=None):
+    """Fecha o span, restaura o span pai como atual e o coloca na fila de envio."""
+    if span is None or span.end_ns is not None:
+        return
+    span.end_ns = time.time_ns()
+    if error:
+        span.error = str(error)
+    try:
+        _current_span.reset(span._token)
+    except ValueError:
+        # Fechado em outro contexto (ex: teardown): só limpa o span atual
+        _current_span.set(None)
+    _exporter.submit(span)
@@ -0,0 +1,104 @@
+# backend/app/utils.py
+import base64
+import json
+from datetime import datetime
+from app import db
+
+def dialect_insert(table, bind=None):
+    """
+    Retorna o INSERT específico do dialeto em uso (PostgreSQL ou SQLite), que
+    oferece on_conflict_do_update/on_conflict_do_nothing para upserts em um único comando.
+    `bind` permite informar outra conexão/engine (ex: dentro de uma migração).
+    Outros dialetos são recusados já no create_app (app/database.py, SUPPORTED_DIALECTS).
+    """
+    dialect = (bind if bind is not None else db.session.get_bind()).dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upsert não suportado para o dialeto '{dialect}'.")
+    return insert(table)
+
+def encode_cursor(*values):
+    """Codifica os valores da última linha de uma página em um cursor opaco (base64 de JSON)."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, types=None):
+    """
+    Decodifica um cursor de encode_cursor. `types`: tipos esperados de cada valor, na ordem
+    (ex: (str, int)). Levanta ValueError se for inválido.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {e}")
+    if not isinstance(values, list):
+        raise ValueError("Cursor inválido.")
+    if types is not None:
+        # bool é subclasse de int no Python, mas nunca é um valor válido de cursor
+        if len(values) != len(types) or any(
+            isinstance(value, bool) or not isinstance(value, expected) for value, expected in zip(values, types)
+        ):
+            raise ValueError("Cursor inválido.")
+    return values
+
+def parse_bool(value):
+    """Converte 'true'/'false' (e variações) de query string. Levanta ValueError se inválido."""
+    normalized = str(value).strip().lower()
+    if normalized in ('true', '1', 'yes', 'sim'):
+        return True
+    if normalized in ('false', '0', 'no', 'nao', 'não'):
+        return False
+    raise ValueError(f"Valor booleano inválido: '{value}'")
+
+def parse_datetime(value):
+    """Converte data/hora ISO 8601 (com ou sem 'Z') para datetime UTC ingênuo, como gravado no banco."""
+    parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
+
+def normalize_cpf(value):
+    """Só os dígitos do CPF ("123.456.789-09" -> "12345678909")."""
+    return ''.join(c for c in str(value or '') if c.isdigit())
+
+def is_valid_cpf(value):
+    """Valida os dois dígitos verificadores do CPF (rejeita sequências repetidas como 111.111.111-11)."""
+    digits = normalize_cpf(value)
+    if len(digits) != 11 or digits == digits[0] * 11:
+        return False
+    for position in (9, 10):
+        total = sum(int(digits[i]) * (position + 1 - i) for i in range(position))
+        check = (total * 10) % 11 % 10
+        if check != int(digits[position]):
+            return False
+    return True
+
+def format_cpf(value):
+    """Formata 11 dígitos como XXX.XXX.XXX-XX, sem conferir os dígitos verificadores (None se não forem 11)."""
+    digits = normalize_cpf(value)
+    if len(digits) != 11:
+        return None
+    return f"{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}"
+
+def canonical_cpf(value):
+    """
+    Forma canônica do CPF gravada no banco ("12345678909" ou "123.456.789-09" -> "123.456.789-09").
+    Retorna None se os dígitos verificadores não conferirem.
+    """
+    if not is_valid_cpf(value):
+        return None
+    return format_cpf(value)
+
+def cpf_lookup_keys(value):
+    """
+    Valores de FanProfile.cpf a procurar para um CPF informado: a forma canônica se for válido;
+    senão, a formatada e a recebida, para achar cadastros antigos gravados antes da validação.
+    """
+    canonical = canonical_cpf(value)
+    if canonical is not None:
+        return [canonical]
+    return list(dict.fromkeys(key for key in (format_cpf(value), str(value or '').strip()) if key))
@@ -0,0 +1,5 @@
+# backend/asgi.py
+from app.asgi import create_asgi_app
+
+# Modo ASGI: uvicorn asgi:app (ou SERVER_MODE=asgi gunicorn -c gunicorn.conf.py)
+app = create_asgi_app()
@@ -0,0 +1,185 @@
+# backend/benchmarks/bench_asgi.py
+"""
+Servidor síncrono (gunicorn gthread, run:app) x modo ASGI (gunicorn + uvicorn, asgi:app).
+
+Sobe cada modo com gunicorn.conf.py num único processo, contra um SQLite novo, e mede:
+- links: C clientes enviam POST /link_esports com links únicos (sem cache) para um
+  servidor local lento que faz o papel de hltv/faceit; mede validações/s até o último
+  job terminar (no modo síncrono a validação roda na requisição, com JOBS_EAGER=true;
+  no ASGI, no event loop do processo, sem segurar a requisição).
+- uploads: C clientes enviam documentos de --upload-kb KB; mede req/s e latências
+  (JOBS_EAGER=false nos dois modos: só o recebimento do arquivo entra na conta).
+
+Uso (na pasta backend):
+    python -m benchmarks.bench_asgi [--concurrency 64] [--links 300] [--latency-ms 300] [--uploads 400]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.loadtest import make_cpf, start_mock_server
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINKS_PER_REQUEST = 3
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def _free_port():
+    import socket
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_server(mode, workdir, port, args, jobs_eager):
+    """Sobe o gunicorn no modo pedido e espera a aplicação responder."""
+    db_path = os.path.join(workdir, f'{mode}.db')
+    env = dict(
+        os.environ,
+        SERVER_MODE=mode,
+        PORT=str(port),
+        WEB_CONCURRENCY='1',
+        GUNICORN_THREADS=str(args.threads),
+        DATABASE_URL='sqlite:///' + db_path,
+        JOBS_EAGER='true' if jobs_eager else 'false',
+        PROFILE_CACHE_ENABLED='false',
+        # Todos os links vão para o mesmo host local: libera o limite por host nos dois modos
+        HTTP_POOL_MAXSIZE=str(args.concurrency * LINKS_PER_REQUEST),
+        OUTBOUND_SCHEDULER_ENABLED='false',
+        ESPORTS_VALIDATION_MAX_WORKERS=str(LINKS_PER_REQUEST * args.threads),
+    )
+    if not os.path.exists(db_path):
+        subprocess.run(
+            [sys.executable, '-c', 'from app import create_app, db\napp = create_app()\nwith app.app_context(): db.create_all()'],
+            cwd=BACKEND_DIR, env=env, check=True, capture_output=True,
+        )
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--log-level', 'warning', '--access-logfile', '/dev/null',
+         '--graceful-timeout', '5', '--error-logfile', os.path.join(workdir, f'{mode}.log')],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            requests.get(f"{base_url}/api/diagnostics", timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Servidor {mode} não respondeu.")
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+def _job_status(session, base_url, job_id):
+    response = session.get(f"{base_url}/api/jobs/{job_id}", timeout=30)
+    response.raise_for_status()
+    return response.json()['status']
+
+def run_links(base_url, mock_url, args, rng):
+    session = requests.Session()
+    body = '\n'.join(f'{{"cpf": "{make_cpf(n)}", "full_name": "Fã {n}"}}' for n in range(args.links))
+    session.post(f"{base_url}/api/profiles/bulk", data=body.encode('utf-8'),
+                 headers={'Content-Type': 'application/x-ndjson'}, timeout=300).raise_for_status()
+    run_id = rng.randrange(10 ** 9)
+
+    def post(n):
+        links = {f"site{i}": f"{mock_url}/hltv/player/{run_id}-{n}-{i}" for i in range(LINKS_PER_REQUEST)}
+        started = time.perf_counter()
+        response = requests.post(f"{base_url}/api/profile/{make_cpf(n)}/link_esports", json=links, timeout=120)
+        response.raise_for_status()
+        return time.perf_counter() - started, response.json()['job']['id']
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(post, range(args.links)))
+    # Espera todos os jobs terminarem (no modo síncrono já terminaram junto com a resposta)
+    pending = {job_id for _, job_id in results}
+    while pending:
+        pending = {job_id for job_id in pending if _job_status(session, base_url, job_id) in ('queued', 'running')}
+        if pending:
+            time.sleep(0.05)
+    wall = time.perf_counter() - started
+    latencies = [latency for latency, _ in results]
+    return {
+        'rate': args.links * LINKS_PER_REQUEST / wall,
+        'p50_ms': _percentile(latencies, 0.50) * 1000,
+        'p95_ms': _percentile(latencies, 0.95) * 1000,
+    }
+
+def run_uploads(base_url, args, rng):
+    profiles = 50
+    body = '\n'.join(f'{{"cpf": "{make_cpf(n)}", "full_name": "Fã {n}"}}' for n in range(profiles))
+    requests.post(f"{base_url}/api/profiles/bulk", data=body.encode('utf-8'),
+                  headers={'Content-Type': 'application/x-ndjson'}, timeout=300).raise_for_status()
+    documents = [rng.randbytes(args.upload_kb * 1024) for _ in range(16)]
+
+    def post(n):
+        started = time.perf_counter()
+        response = requests.post(f"{base_url}/api/profile/{make_cpf(n % profiles)}/upload_document",
+                                 files={'document': (f"doc{n}.pdf", documents[n % len(documents)])}, timeout=120)
+        return time.perf_counter() - started, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        results = list(pool.map(post, range(args.uploads)))
+    wall = time.perf_counter() - started
+    latencies = [latency for latency, _ in results]
+    return {
+        'rate': args.uploads / wall,
+        'p50_ms': _percentile(latencies, 0.50) * 1000,
+        'p95_ms': _percentile(latencies, 0.95) * 1000,
+        'errors': sum(1 for _, status in results if status != 202),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=64, help='Clientes em paralelo')
+    parser.add_argument('--threads', type=int, default=4, help='Threads do worker gthread (modo síncrono)')
+    parser.add_argument('--links', type=int, default=300, help=f'Requisições de link_esports ({LINKS_PER_REQUEST} links cada)')
+    parser.add_argument('--latency-ms', type=int, default=300, help='Latência do servidor de links simulado')
+    parser.add_argument('--uploads', type=int, default=400, help='Uploads de documento')
+    parser.add_argument('--upload-kb', type=int, default=512, help='Tamanho de cada documento')
+    parser.add_argument('--modes', default='wsgi,asgi', help='Modos comparados')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.WARNING)
+    mock_url = start_mock_server(args.latency_ms, 2048)
+    workdir = tempfile.mkdtemp(prefix='kyf-bench-asgi-')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+
+    print(f"{args.concurrency} clientes, links com {args.latency_ms}ms de latência, uploads de {args.upload_kb} KB")
+    print(f"{'modo':<6}{'validações/s':>14}{'p50 ms':>10}{'p95 ms':>10}{'uploads/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'erros':>8}")
+    for mode in args.modes.split(','):
+        mode = mode.strip()
+        rng = random.Random(args.seed)
+        process, base_url = start_server(mode, workdir, _free_port(), args, jobs_eager=(mode == 'wsgi'))
+        try:
+            links = run_links(base_url, mock_url, args, rng)
+        finally:
+            stop_server(process)
+        process, base_url = start_server(mode, workdir, _free_port(), args, jobs_eager=False)
+        try:
+            uploads = run_uploads(base_url, args, rng)
+        finally:
+            stop_server(process)
+        print(f"{mode:<6}{links['rate']:>14.1f}{links['p50_ms']:>10.1f}{links['p95_ms']:>10.1f}"
+              f"{uploads['rate']:>12.1f}{uploads['p50_ms']:>10.1f}{uploads['p95_ms']:>10.1f}{uploads['errors']:>8}")
+
+if __name__ == '__main__':
+    main()
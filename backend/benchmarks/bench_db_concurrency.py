@@ -0,0 +1,198 @@
+# backend/benchmarks/bench_db_concurrency.py
+"""
+Escritas concorrentes no SQLite com e sem o perfil de engine 'tuned' (app/database.py).
+
+Sobe N processos (como workers do gunicorn), cada um com T threads, que fazem upserts
+de perfil (POST /api/profile) misturados com leituras (GET /api/profile/<cpf>, com o
+cache de perfis desligado) sobre o mesmo arquivo SQLite. Cada perfil de engine usa um
+banco novo, porque o modo WAL fica gravado no arquivo. Relata req/s, latências e erros
+(respostas 5xx, ex: "database is locked").
+
+Com --exporters, outro processo baixa GET /api/profiles/export devagar (--export-pause entre
+pedaços), como um cliente lento: o cursor aberto segura o lock de leitura do arquivo. No modo
+journal padrão ('default') os commits esperam esse lock e falham com "database is locked"
+depois de 5s; no WAL ('tuned') leituras não bloqueiam escritas. --check sai com código 1 se
+'default' não tiver erros ou se algum outro perfil tiver.
+
+Uso (na pasta backend):
+    python -m benchmarks.bench_db_concurrency [--workers 4] [--threads 4] [--requests 300] [--write-ratio 0.5]
+    python -m benchmarks.bench_db_concurrency --workers 2 --threads 2 --requests 150 --profiles 5000 --exporters 1 --check
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def _make_cpf(n):
+    digits = [int(c) for c in f"{n % (10 ** 9 - 1) + 1:09d}"] # Sem 000.000.000-00 (CPF inválido)
+    for position in (9, 10):
+        digits.append(sum(d * (position + 1 - i) for i, d in enumerate(digits)) * 10 % 11 % 10)
+    return ''.join(map(str, digits))
+
+def _build_app():
+    sys.path.insert(0, BACKEND_DIR)
+    from config import Config
+    from app import create_app
+
+    class BenchConfig(Config):
+        # Lidos a cada chamada: o processo principal roda um perfil de engine depois do outro
+        SQLALCHEMY_DATABASE_URI = os.environ['DATABASE_URL']
+        DB_ENGINE_PROFILE = os.environ['DB_ENGINE_PROFILE']
+        PROFILE_CACHE_ENABLED = False # Leituras vão ao banco
+        METRICS_ENABLED = False
+        UPLOAD_FOLDER = os.path.join(tempfile.gettempdir(), 'kyf-bench-uploads')
+
+    return create_app(BenchConfig)
+
+def _worker(worker_id, args, start_event, results):
+    import logging
+    import threading
+    logging.disable(logging.ERROR) # Erros de banco viram 500 e são contados abaixo
+    app = _build_app()
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def run(thread_id):
+        rng = random.Random(worker_id * 1000 + thread_id)
+        client = app.test_client()
+        for i in range(args.requests):
+            cpf = _make_cpf(rng.randrange(args.profiles))
+            started = time.perf_counter()
+            if rng.random() < args.write_ratio:
+                response = client.post('/api/profile', json={'cpf': cpf, 'full_name': f"Fã {worker_id}-{thread_id}-{i}"})
+            else:
+                response = client.get(f'/api/profile/{cpf}')
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 500:
+                    errors.append(response.status_code)
+
+    threads = [threading.Thread(target=run, args=(t,)) for t in range(args.threads)]
+    start_event.wait()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((latencies, len(errors)))
+
+def _exporter(args, start_event, stop_event, results):
+    import logging
+    logging.disable(logging.ERROR)
+    app = _build_app()
+    client = app.test_client()
+    exports = errors = 0
+    start_event.wait()
+    while not stop_event.is_set():
+        response = client.get('/api/profiles/export', buffered=False)
+        try:
+            for _ in response.iter_encoded():
+                time.sleep(args.export_pause) # Cliente lento: o cursor do export fica aberto
+        except Exception:
+            errors += 1
+        finally:
+            response.close()
+        exports += 1
+    results.put(('export', exports, errors))
+
+def run_profile(engine_profile, args):
+    db_path = os.path.join(tempfile.mkdtemp(prefix='kyf-bench-db-'), 'bench.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+    os.environ['DB_ENGINE_PROFILE'] = engine_profile
+
+    # Esquema e perfis iniciais criados antes de subir os workers
+    app = _build_app()
+    from app import db
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    rows = '\n'.join(f'{{"cpf": "{_make_cpf(n)}", "full_name": "Fã {n}"}}' for n in range(args.profiles))
+    client.post('/api/profiles/bulk', data=rows, content_type='application/x-ndjson')
+    with app.app_context():
+        db.engine.dispose()
+
+    # spawn: cada worker importa a aplicação com as variáveis de ambiente acima
+    context = multiprocessing.get_context('spawn')
+    start_event = context.Event()
+    results = context.Queue()
+    stop_event = context.Event()
+    processes = [context.Process(target=_worker, args=(w, args, start_event, results)) for w in range(args.workers)]
+    exporters = [context.Process(target=_exporter, args=(args, start_event, stop_event, results)) for _ in range(args.exporters)]
+    for process in processes + exporters:
+        process.start()
+    time.sleep(2) # Tempo para os workers importarem a aplicação
+    started = time.perf_counter()
+    start_event.set()
+    latencies, errors, exports = [], 0, 0
+    finished = 0
+    while finished < len(processes):
+        result = results.get()
+        if result[0] == 'export':
+            exports += result[1]
+            errors += result[2]
+            continue
+        latencies.extend(result[0])
+        errors += result[1]
+        finished += 1
+    wall = time.perf_counter() - started
+    stop_event.set()
+    for _ in exporters:
+        _, exporter_exports, exporter_errors = results.get()
+        exports += exporter_exports
+        errors += exporter_errors
+    for process in processes + exporters:
+        process.join()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'exports': exports,
+        'rps': len(latencies) / wall,
+        'p50_ms': _percentile(latencies, 0.50) * 1000,
+        'p95_ms': _percentile(latencies, 0.95) * 1000,
+        'p99_ms': _percentile(latencies, 0.99) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4, help='Processos (workers)')
+    parser.add_argument('--threads', type=int, default=4, help='Threads por processo')
+    parser.add_argument('--requests', type=int, default=300, help='Requisições por thread')
+    parser.add_argument('--profiles', type=int, default=500, help='Perfis no banco')
+    parser.add_argument('--write-ratio', type=float, default=0.5, help='Fração de upserts no mix')
+    parser.add_argument('--engine-profiles', default='default,tuned', help='Perfis de engine comparados')
+    parser.add_argument('--exporters', type=int, default=0, help='Processos baixando o export devagar durante o teste')
+    parser.add_argument('--export-pause', type=float, default=0.5, help='Segundos entre pedaços lidos do export')
+    parser.add_argument('--check', action='store_true', help="Falha se 'default' não tiver erros ou se outro perfil tiver")
+    args = parser.parse_args()
+
+    print(f"{args.workers} processos x {args.threads} threads x {args.requests} requisições, {args.write_ratio:.0%} escritas"
+          + (f", {args.exporters} export(s) lento(s)" if args.exporters else ''))
+    print(f"{'perfil':<10}{'req':>8}{'erros':>8}{'exports':>9}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    errors = {}
+    for engine_profile in args.engine_profiles.split(','):
+        engine_profile = engine_profile.strip()
+        result = run_profile(engine_profile, args)
+        errors[engine_profile] = result['errors']
+        print(f"{engine_profile:<10}{result['requests']:>8}{result['errors']:>8}{result['exports']:>9}{result['rps']:>10.1f}"
+              f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}")
+
+    if args.check:
+        failures = [f"'{name}' com {count} erro(s)" for name, count in errors.items() if name != 'default' and count]
+        if not errors.get('default'):
+            failures.append("'default' sem erros (o cenário não reproduziu o lock)")
+        if failures:
+            print("FALHOU: " + '; '.join(failures))
+            sys.exit(1)
+        print("OK: 'database is locked' só no perfil 'default'.")
+
+if __name__ == '__main__':
+    main()
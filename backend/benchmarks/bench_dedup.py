@@ -0,0 +1,111 @@
+# backend/benchmarks/bench_dedup.py
+"""
+Buscas de duplicados (app/dedup.py) com os índices x varredura da tabela, para N perfis.
+
+Caminhos comparados (uma busca por perfil consultado):
+- dHash (bandas): igualdade nas 4 bandas indexadas + distância só nos candidatos
+- dHash (varredura): todos os hashes lidos do banco e comparados em Python
+- URL (índice): igualdade em profile_link.url_hash
+- URL (varredura): links JSON de todos os perfis lidos e normalizados
+
+Os hashes são aleatórios, com uma fração de cópias levemente alteradas (até 3 bits), e confere que os
+dois caminhos do dHash encontram os mesmos perfis. Usa um SQLite temporário.
+
+Uso (na pasta backend):
+    python -m benchmarks.bench_dedup [--profiles 100000] [--lookups 500]
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+def _populate(count, rng):
+    from app import db, dedup
+    from app.models import DocumentFingerprint, FanProfile, ProfileLink
+    from benchmarks.loadtest import make_cpf
+    hashes = []
+    for n in range(count):
+        if hashes and rng.random() < 0.05:
+            value = rng.choice(hashes)
+            for bit in rng.sample(range(64), rng.randint(0, 3)): # Mesmo documento, outra foto/compressão
+                value ^= 1 << bit
+        else:
+            value = rng.getrandbits(64)
+        hashes.append(value)
+    batch = 5000
+    for start in range(0, count, batch):
+        ids = range(start + 1, min(start + batch, count) + 1)
+        links = {i: {'faceit': f"https://www.faceit.com/en/players/p{rng.randrange(count)}"} for i in ids}
+        db.session.execute(FanProfile.__table__.insert(), [
+            {'id': i, 'cpf': make_cpf(i), 'esports_profile_links': links[i], 'version': 1} for i in ids
+        ])
+        db.session.execute(DocumentFingerprint.__table__.insert(), [
+            {'profile_id': i, 'dhash': dedup._signed(hashes[i - 1]),
+             **{f'band{b}': band for b, band in enumerate(dedup._bands(hashes[i - 1]))}} for i in ids
+        ])
+        db.session.execute(ProfileLink.__table__.insert(), [
+            row for i in ids for row in dedup._link_rows(i, 'esports', links[i])
+        ])
+        db.session.commit()
+    return hashes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', type=int, default=100000, help='Perfis com documento e link')
+    parser.add_argument('--lookups', type=int, default=500, help='Buscas por caminho indexado (as varreduras fazem 5)')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='kyf-bench-dedup-'), 'bench.db')
+    os.environ.setdefault('OUTBOUND_SCHEDULER_ENABLED', 'false')
+    from app import create_app, db, dedup
+    from app.link_cache import normalize_url
+    from app.models import DocumentFingerprint, FanProfile, ProfileLink
+
+    app = create_app()
+    rng = random.Random(42)
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        hashes = _populate(args.profiles, rng)
+        print(f"{args.profiles} perfis gravados em {time.perf_counter() - started:.1f}s\n")
+        targets = [rng.randrange(args.profiles) + 1 for _ in range(args.lookups)]
+        mask = (1 << 64) - 1
+
+        def bands(profile_id):
+            return dedup.similar_documents(hashes[profile_id - 1], exclude_profile_id=profile_id, max_distance=3)
+
+        def scan(profile_id):
+            value = hashes[profile_id - 1]
+            rows = db.session.execute(db.select(DocumentFingerprint.profile_id, DocumentFingerprint.dhash)).all()
+            return sorted(((other, ((value ^ dhash) & mask).bit_count()) for other, dhash in rows
+                           if other != profile_id and ((value ^ dhash) & mask).bit_count() <= 3), key=lambda m: m[1])
+
+        def url_index(profile_id):
+            url_hash = db.session.scalar(db.select(ProfileLink.url_hash).where(ProfileLink.profile_id == profile_id))
+            return db.session.scalars(db.select(ProfileLink.profile_id).where(ProfileLink.url_hash == url_hash)).all()
+
+        def url_scan(profile_id):
+            links = db.session.execute(db.select(FanProfile.id, FanProfile.esports_profile_links)).all()
+            url = normalize_url(dict(links)[profile_id]['faceit'])
+            return [other for other, value in links if value and normalize_url(value['faceit']) == url]
+
+        for target in targets[:5]:
+            assert {m[0] for m in bands(target)} == {m[0] for m in scan(target)}, "Bandas e varredura divergem"
+            assert sorted(url_index(target)) == sorted(url_scan(target)), "Índice de URLs e varredura divergem"
+
+        print(f"{'caminho':<20}{'ms/busca':>12}{'buscas/s':>12}")
+        for name, func, count in (('dHash (bandas)', bands, args.lookups), ('dHash (varredura)', scan, 5),
+                                  ('URL (índice)', url_index, args.lookups), ('URL (varredura)', url_scan, 5)):
+            started = time.perf_counter()
+            for target in targets[:count]:
+                func(target)
+            seconds = (time.perf_counter() - started) / count
+            print(f"{name:<20}{seconds * 1000:>12.3f}{1 / seconds:>12,.0f}")
+        found = sum(1 for target in targets if bands(target))
+        print(f"\n{found}/{len(targets)} perfis consultados têm documento parecido com o de outro perfil.")
+
+if __name__ == '__main__':
+    main()
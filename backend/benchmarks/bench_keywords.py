@@ -0,0 +1,59 @@
+# backend/benchmarks/bench_keywords.py
+"""
+Micro-benchmark do casamento de keywords no title/meta dos links eSports.
+
+Compara o loop antigo (um re.search por keyword) com o KeywordMatcher de
+app/keywords.py (uma passada só) e confere que os dois encontram as mesmas keywords.
+
+Uso (na pasta backend):
+    python -m benchmarks.bench_keywords [--iterations 20000]
+"""
+import argparse
+import re
+import timeit
+
+from app.keywords import CONTENT_KEYWORDS, KeywordMatcher
+
+# Amostras no formato title + " " + meta description, como montado em services.py
+SAMPLES = [
+    "yuurih - counter-strike player profile | hltv.org yuurih is a brazilian counter-strike player currently playing for furia. check out his stats, teams and matches.",
+    "kscerato's profile - faceit faceit profile of kscerato. level 10 cs:go player. view match history, elo and statistics.",
+    "furia esports - site oficial a furia é uma organização brasileira de e-sports com times de cs2, valorant, league of legends e rainbow six.",
+    "gaules - twitch gaules streamer brasileiro de counter-strike. assista às partidas ao vivo do maior canal de cs do brasil.",
+    "página não encontrada a página que você procura não existe ou foi removida.",
+    "steam community :: fallen steam community profile of fallen, professional player and coach.",
+    "loja oficial - camisas e acessórios compre produtos oficiais da sua organização favorita com frete grátis para todo o brasil.",
+    "op.gg - league of legends stats lol ranking, summoner stats, match history and pro player builds.",
+]
+
+def legacy_find_all(text):
+    """Implementação anterior: compila e executa uma regex por keyword."""
+    found = []
+    for keyword in CONTENT_KEYWORDS:
+        if re.search(r'\b' + re.escape(keyword) + r'\b', text, re.IGNORECASE):
+            found.append(keyword)
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20000, help='Passadas sobre o conjunto de amostras')
+    args = parser.parse_args()
+
+    matcher = KeywordMatcher(CONTENT_KEYWORDS, whole_words=True)
+    for sample in SAMPLES:
+        expected, actual = legacy_find_all(sample), matcher.find_all(sample)
+        assert expected == actual, f"Divergência em {sample!r}: {expected} != {actual}"
+
+    total_bytes = sum(len(s.encode('utf-8')) for s in SAMPLES)
+    results = {}
+    for name, func in (('legacy (re.search por keyword)', legacy_find_all), ('KeywordMatcher (uma passada)', matcher.find_all)):
+        seconds = min(timeit.repeat(lambda: [func(s) for s in SAMPLES], number=args.iterations, repeat=3))
+        texts = args.iterations * len(SAMPLES)
+        results[name] = seconds
+        print(f"{name:34s} {texts / seconds:>12,.0f} textos/s  {total_bytes * args.iterations / seconds / 1e6:>8.2f} MB/s")
+
+    legacy, engine = results.values()
+    print(f"Speedup: {legacy / engine:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# backend/benchmarks/bench_serialization.py
+"""
+Serialização de perfis: caminho antigo (ORM completo + to_dict + json da biblioteca padrão,
+como o jsonify anterior) x app/serialization.py, para 1, 100 e 10 mil linhas.
+
+Caminhos comparados (consulta ao banco + serialização, sessão limpa a cada execução):
+- to_dict: select(FanProfile) + to_dict() + DefaultJSONProvider (sort_keys, ensure_ascii)
+- orjson: select(FanProfile) + profile_values + FastJSONProvider
+- to_dict (campos): como GET /profiles?fields= antes: to_dict() completo e depois o filtro
+- load_only (campos): load_only com os campos pedidos + FastJSONProvider
+- stream (Core): colunas sem objetos do ORM + stream_json_array (export ?format=json)
+
+Confere que todos geram o mesmo JSON (após decodificar). Usa um SQLite temporário.
+
+Uso (na pasta backend):
+    python -m benchmarks.bench_serialization [--rows 1,100,10000] [--fields cpf,full_name,updated_at]
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import timeit
+
+def _populate(count):
+    from app.bulk import import_profiles
+    from benchmarks.loadtest import make_cpf
+    rows = (
+        (n, {
+            'cpf': make_cpf(n), 'full_name': f"Fã {n}", 'address': f"Rua {n}, São Paulo",
+            'interests': 'CS:GO, Valorant', 'events_last_year': 'IEM Rio, BGS', 'purchases_last_year': 'Camisa Furia',
+        }, None)
+        for n in range(count)
+    )
+    import_profiles(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default='1,100,10000', help='Quantidades de linhas serializadas')
+    parser.add_argument('--fields', default='cpf,full_name,updated_at', help='Campos pedidos nos caminhos com seleção')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.rows.split(',')]
+    fields = [field.strip() for field in args.fields.split(',')]
+
+    logging.disable(logging.WARNING)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='kyf-bench-json-'), 'bench.db')
+    os.environ.setdefault('OUTBOUND_SCHEDULER_ENABLED', 'false')
+    from flask.json.provider import DefaultJSONProvider
+    from app import create_app, db
+    from app.models import FanProfile
+    from app.serialization import FastJSONProvider, profile_load_options, profile_values, stream_json_array
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        _populate(max(sizes))
+        legacy = DefaultJSONProvider(app)
+        fast = app.json
+        if not isinstance(fast, FastJSONProvider) or not fast.use_orjson:
+            print("AVISO: orjson indisponível; o caminho rápido usa a biblioteca padrão.")
+        table = FanProfile.__table__
+
+        def orm(limit, options=()):
+            db.session.expunge_all() # Sem identity map reaproveitado entre execuções
+            return db.session.scalars(db.select(FanProfile).options(*options).order_by(FanProfile.id).limit(limit)).all()
+
+        paths = {
+            'to_dict': lambda n: legacy.dumps([p.to_dict() for p in orm(n)]).encode('utf-8'),
+            'orjson': lambda n: fast.dumps_bytes([profile_values(p) for p in orm(n)]),
+            'to_dict (campos)': lambda n: legacy.dumps(
+                [{key: item[key] for key in fields} for item in (p.to_dict() for p in orm(n))]).encode('utf-8'),
+            'load_only (campos)': lambda n: fast.dumps_bytes(
+                [profile_values(p, fields) for p in orm(n, profile_load_options(fields))]),
+            'stream (Core)': lambda n: b''.join(stream_json_array(
+                dict(row) for row in db.session.execute(db.select(table).order_by(table.c.id).limit(n)).mappings())),
+        }
+
+        print(f"{'linhas':>7}  {'caminho':<20}{'ms/op':>10}{'linhas/s':>14}{'x to_dict':>11}")
+        for size in sizes:
+            outputs = {name: json.loads(func(size)) for name, func in paths.items()}
+            assert outputs['to_dict'] == outputs['orjson'] == outputs['stream (Core)'], "Saídas divergentes"
+            assert outputs['to_dict (campos)'] == outputs['load_only (campos)'], "Saídas divergentes (campos)"
+            number = max(1, 2000 // size)
+            baseline = {}
+            for name, func in paths.items():
+                seconds = min(timeit.repeat(lambda: func(size), number=number, repeat=args.repeat)) / number
+                reference = baseline.setdefault('campos' in name, seconds) # to_dict de cada grupo
+                print(f"{size:>7}  {name:<20}{seconds * 1000:>10.3f}{size / seconds:>14,.0f}{reference / seconds:>10.1f}x")
+            print()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,363 @@
+# backend/benchmarks/loadtest.py
+"""
+Teste de carga reproduzível dos endpoints /api.
+
+Popula o banco com N perfis sintéticos (via POST /api/profiles/bulk) e dispara um
+mix de tráfego (upsert de perfil, GET de perfil, upload de documento e links eSports)
+com C clientes em paralelo. Os links apontam para um servidor HTTP local que faz o
+papel de hltv/faceit, com latência configurável. Relata p50/p95/p99 e req/s por
+operação e grava/compara baselines em JSON para detectar regressões entre commits.
+
+Por padrão a aplicação roda neste mesmo processo (servidor threaded do Werkzeug,
+SQLite temporário, JOBS_EAGER=true para a validação entrar na latência). Com --url,
+o teste vai contra um servidor já rodando (ex: gunicorn).
+
+Uso (na pasta backend):
+    python -m benchmarks.loadtest --profiles 2000 --requests 3000 --concurrency 8 --save
+    python -m benchmarks.loadtest --requests 3000 --compare <nome-ou-arquivo> [--threshold 10]
+    python -m benchmarks.loadtest --mix get=80,upsert=20 --url http://localhost:8000
+"""
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+DEFAULT_MIX = 'upsert=25,get=55,upload=10,links=10'
+OPERATIONS = ('upsert', 'get', 'upload', 'links')
+
+# --- Dados sintéticos ---
+
+def make_cpf(n):
+    """CPF válido e determinístico a partir de um número (dígitos verificadores calculados)."""
+    # Base de 1 a 999999999: 000.000.000-00 é rejeitado pela validação do CPF
+    digits = [int(c) for c in f"{n % (10 ** 9 - 1) + 1:09d}"]
+    for position in (9, 10):
+        total = sum(d * (position + 1 - i) for i, d in enumerate(digits))
+        digits.append(total * 10 % 11 % 10)
+    return ''.join(map(str, digits))
+
+_INTERESTS = ['CS:GO', 'Valorant', 'LoL', 'R6', 'Free Fire', 'Dota 2', 'Fortnite', 'Kings League']
+_EVENTS = ['IEM Rio', 'Major', 'CBLOL', 'BGS', 'IEM Cologne']
+_PURCHASES = ['Camisa', 'Moletom', 'Boné', 'Ingresso', 'Mousepad']
+
+def make_profile(n, rng):
+    return {
+        'cpf': make_cpf(n),
+        'full_name': f"Fã Sintético {n}",
+        'address': f"Rua {rng.randint(1, 999)}, São Paulo - SP",
+        'interests': ', '.join(rng.sample(_INTERESTS, rng.randint(1, 4))),
+        'activities_last_year': 'Assistiu partidas, jogou ranked',
+        'events_last_year': ', '.join(rng.sample(_EVENTS, rng.randint(0, 2))),
+        'purchases_last_year': ', '.join(rng.sample(_PURCHASES, rng.randint(0, 3))),
+    }
+
+def make_documents(count, rng):
+    """Imagens JPEG pequenas e distintas (sem Pillow, bytes aleatórios com extensão .png)."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return [(f"doc{i}.png", bytes(rng.getrandbits(8) for _ in range(2048))) for i in range(count)]
+    documents = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1024, 768), (rng.randrange(256), rng.randrange(256), rng.randrange(256))).save(buffer, 'JPEG')
+        documents.append((f"doc{i}.jpg", buffer.getvalue()))
+    return documents
+
+# --- Servidor que simula hltv/faceit ---
+
+_MOCK_PAGE = (
+    "<html><head><title>{name} - Counter-Strike player profile | HLTV.org</title>"
+    "<meta name='description' content='{name} is a brazilian cs2 player for FURIA esports. Stats, teams and matches.'>"
+    "</head><body>{padding}</body></html>"
+)
+
+def start_mock_server(latency_ms, page_bytes):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            name = self.path.rstrip('/').rsplit('/', 1)[-1]
+            body = _MOCK_PAGE.format(name=name, padding='x' * page_bytes).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+
+        def handle_error(self, request, client_address):
+            pass # Clientes que fecham a conexão no meio do corpo (leitura só do <head>)
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+# --- Aplicação no próprio processo ---
+
+def start_local_app(workdir):
+    """Sobe o app Flask num servidor threaded local, com SQLite e uploads em `workdir`."""
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'loadtest.db')
+    os.environ.setdefault('JOBS_EAGER', 'true')
+    # O servidor simulado é um único host: sem o limite de taxa por host de app/outbound.py
+    os.environ.setdefault('OUTBOUND_SCHEDULER_ENABLED', 'false')
+    from werkzeug.serving import make_server
+    from config import Config
+    from app import create_app, db
+
+    class LoadTestConfig(Config):
+        UPLOAD_FOLDER = os.path.join(workdir, 'uploads')
+
+    import logging
+    logging.getLogger().setLevel(logging.WARNING) # Logs INFO por requisição distorcem a medição
+
+    app = create_app(LoadTestConfig)
+    app.logger.setLevel(logging.WARNING)
+    with app.app_context():
+        db.create_all()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+# --- Execução ---
+
+def parse_mix(value):
+    weights = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Operação desconhecida '{name}' (use {', '.join(OPERATIONS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+def seed_profiles(base_url, count, rng, batch_size=1000):
+    started = time.perf_counter()
+    session = requests.Session()
+    for start in range(0, count, batch_size):
+        body = '\n'.join(json.dumps(make_profile(n, rng)) for n in range(start, min(start + batch_size, count)))
+        response = session.post(f"{base_url}/api/profiles/bulk", data=body.encode('utf-8'),
+                                headers={'Content-Type': 'application/x-ndjson'}, timeout=300)
+        response.raise_for_status()
+    return time.perf_counter() - started
+
+class Runner:
+    def __init__(self, base_url, mock_url, profiles, mix, seed, documents):
+        self.base_url = base_url
+        self.mock_url = mock_url
+        self.profiles = profiles
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.seed = seed
+        self.documents = documents
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def run_one(self, index):
+        # RNG por requisição: a sequência de operações não depende do agendamento das threads
+        rng = random.Random(self.seed * 1_000_003 + index)
+        operation = rng.choices(self.operations, weights=self.weights)[0]
+        number = rng.randrange(self.profiles)
+        cpf = make_cpf(number)
+        session = self._session()
+        url = f"{self.base_url}/api"
+        started = time.perf_counter()
+        try:
+            if operation == 'upsert':
+                # 30% criam perfis novos, o resto atualiza perfis existentes
+                if rng.random() < 0.3:
+                    number = self.profiles + abs(index)
+                response = session.post(f"{url}/profile", json=make_profile(number, rng), timeout=60)
+            elif operation == 'get':
+                response = session.get(f"{url}/profile/{cpf}", timeout=60)
+            elif operation == 'upload':
+                name, data = rng.choice(self.documents)
+                response = session.post(f"{url}/profile/{cpf}/upload_document", files={'document': (name, data)}, timeout=60)
+            else:
+                # Parte dos links se repete entre requisições (exercita o cache de vereditos)
+                player = rng.randrange(self.profiles // 4 + 1) if rng.random() < 0.5 else f"{index}-{rng.randrange(10 ** 6)}"
+                response = session.post(f"{url}/profile/{cpf}/link_esports", json={
+                    'hltv': f"{self.mock_url}/hltv/player/{player}",
+                    'faceit': f"{self.mock_url}/faceit/players/{player}",
+                }, timeout=60)
+            ok = response.status_code < 500
+            status = response.status_code
+        except requests.exceptions.RequestException as e:
+            ok, status = False, type(e).__name__
+        return operation, time.perf_counter() - started, ok, status
+
+def percentile(sorted_values, fraction):
+    """Percentil por posição mais próxima (nearest-rank)."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def summarize(samples, elapsed):
+    groups = {'all': samples}
+    for operation in OPERATIONS:
+        subset = [s for s in samples if s[0] == operation]
+        if subset:
+            groups[operation] = subset
+    summary = {}
+    for name, group in groups.items():
+        latencies = sorted(s[1] for s in group)
+        errors = sum(1 for s in group if not s[2])
+        summary[name] = {
+            'requests': len(group),
+            'errors': errors,
+            'rps': round(len(group) / elapsed, 2),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        }
+    return summary
+
+def print_summary(summary):
+    print(f"{'operação':10s} {'reqs':>7s} {'erros':>6s} {'req/s':>9s} {'média':>9s} {'p50':>9s} {'p95':>9s} {'p99':>9s}  (ms)")
+    for name, stats in summary.items():
+        print(f"{name:10s} {stats['requests']:>7d} {stats['errors']:>6d} {stats['rps']:>9.1f} "
+              f"{stats['mean_ms']:>9.1f} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+
+def git_revision():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip()
+        return revision + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def resolve_baseline(name_or_path):
+    if os.path.exists(name_or_path):
+        return name_or_path
+    return os.path.join(BASELINES_DIR, f"{name_or_path}.json")
+
+def compare(current, baseline, threshold):
+    """Compara p95 e req/s por operação. Retorna a lista de regressões acima de `threshold` %."""
+    regressions = []
+    print(f"\nComparação com a baseline {baseline['name']} ({baseline['revision']}, {baseline['created_at']}):")
+    print(f"{'operação':10s} {'p95 antes':>10s} {'p95 agora':>10s} {'Δp95':>8s} {'req/s antes':>12s} {'req/s agora':>12s} {'Δreq/s':>8s}")
+    for name, stats in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        p95_change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+        rps_change = (stats['rps'] - before['rps']) / before['rps'] * 100 if before['rps'] else 0.0
+        flag = ''
+        if p95_change > threshold or rps_change < -threshold:
+            regressions.append(name)
+            flag = '  <-- regressão'
+        print(f"{name:10s} {before['p95_ms']:>10.1f} {stats['p95_ms']:>10.1f} {p95_change:>+7.1f}% "
+              f"{before['rps']:>12.1f} {stats['rps']:>12.1f} {rps_change:>+7.1f}%{flag}")
+    for key in ('requests', 'concurrency', 'mix', 'profiles'):
+        if current['params'].get(key) != baseline['params'].get(key):
+            print(f"Aviso: parâmetro '{key}' difere da baseline ({baseline['params'].get(key)} -> {current['params'].get(key)}).")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', type=int, default=2000, help='Perfis sintéticos criados antes do teste')
+    parser.add_argument('--requests', type=int, default=2000, help='Total de requisições do teste')
+    parser.add_argument('--concurrency', type=int, default=8, help='Clientes simultâneos')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f'Pesos das operações (padrão: {DEFAULT_MIX})')
+    parser.add_argument('--warmup', type=int, default=100, help='Requisições descartadas antes da medição')
+    parser.add_argument('--seed', type=int, default=42, help='Semente dos dados e da sequência de operações')
+    parser.add_argument('--mock-latency', type=float, default=20, help='Latência (ms) do servidor que simula hltv/faceit')
+    parser.add_argument('--mock-page-bytes', type=int, default=50_000, help='Tamanho do corpo das páginas simuladas')
+    parser.add_argument('--url', help='Testa um servidor já rodando em vez do app local (ex: http://localhost:8000)')
+    parser.add_argument('--no-seed', action='store_true', help='Não popula o banco (perfis já criados com --url)')
+    parser.add_argument('--save', nargs='?', const='', metavar='NOME', help='Grava o resultado em benchmarks/baselines/<NOME>.json (padrão: revisão git)')
+    parser.add_argument('--compare', metavar='NOME_OU_ARQUIVO', help='Compara com uma baseline gravada')
+    parser.add_argument('--threshold', type=float, default=10, help='Variação percentual de p95/req/s considerada regressão')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mock_url = start_mock_server(args.mock_latency, args.mock_page_bytes)
+    workdir = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        workdir = tempfile.mkdtemp(prefix='kyf-loadtest-')
+        base_url, _ = start_local_app(workdir)
+    print(f"Alvo: {base_url} | simulador hltv/faceit: {mock_url} (latência {args.mock_latency:.0f}ms)")
+
+    if not args.no_seed:
+        seconds = seed_profiles(base_url, args.profiles, rng)
+        print(f"{args.profiles} perfis criados em {seconds:.1f}s")
+
+    runner = Runner(base_url, mock_url, args.profiles, args.mix, args.seed, make_documents(8, rng))
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(runner.run_one, range(-args.warmup, 0)))
+        started = time.perf_counter()
+        samples = list(executor.map(runner.run_one, range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    summary = summarize(samples, elapsed)
+    print(f"\n{args.requests} requisições em {elapsed:.1f}s com {args.concurrency} clientes\n")
+    print_summary(summary)
+    failures = {}
+    for operation, _, ok, status in samples:
+        if not ok:
+            failures[f"{operation}:{status}"] = failures.get(f"{operation}:{status}", 0) + 1
+    if failures:
+        print(f"Falhas: {failures}")
+
+    result = {
+        'name': None,
+        'revision': git_revision(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'target': 'local' if workdir else base_url,
+        'params': {
+            'profiles': args.profiles, 'requests': args.requests, 'concurrency': args.concurrency,
+            'mix': args.mix, 'warmup': args.warmup, 'seed': args.seed,
+            'mock_latency_ms': args.mock_latency, 'mock_page_bytes': args.mock_page_bytes,
+        },
+        'elapsed_s': round(elapsed, 3),
+        'results': summary,
+    }
+
+    regressions = []
+    if args.compare:
+        with open(resolve_baseline(args.compare)) as f:
+            regressions = compare(result, json.load(f), args.threshold)
+
+    if args.save is not None:
+        result['name'] = args.save or result['revision']
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        path = os.path.join(BASELINES_DIR, f"{result['name']}.json")
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\nBaseline gravada em {path}")
+
+    if regressions:
+        print(f"\nRegressões acima de {args.threshold:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
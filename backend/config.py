@@ -1,9 +1,12 @@
 # backend/config.py
 import os
-from dotenv import load_dotenv
 
 basedir = os.path.abspath(os.path.dirname(__file__))
-load_dotenv(os.path.join(basedir, '.env')) # Carrega variáveis do .env se existir
+# .env só em desenvolvimento: sem o arquivo (produção) ou com LOAD_DOTENV=false, python-dotenv nem é importado
+_dotenv_path = os.path.join(basedir, '.env')
+if os.environ.get('LOAD_DOTENV', 'true').lower() == 'true' and os.path.exists(_dotenv_path):
+    from dotenv import load_dotenv
+    load_dotenv(_dotenv_path) # Carrega variáveis do .env
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'uma-chave-secreta-muito-forte'
@@ -11,10 +14,135 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    UPLOAD_FOLDER = os.path.join(basedir, 'uploads') # Pasta para guardar uploads
+
+    # Perfil da engine (app/database.py): 'tuned' aplica as opções abaixo, 'default' usa os padrões do SQLAlchemy
+    DB_ENGINE_PROFILE = os.environ.get('DB_ENGINE_PROFILE', 'tuned')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5)) # Conexões mantidas por processo (PostgreSQL)
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10)) # Conexões extras em picos (PostgreSQL)
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30)) # Segundos esperando uma conexão livre no pool
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800)) # Segundos até reabrir a conexão (evita conexões derrubadas pelo servidor/proxy)
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true' # Testa a conexão antes de usar
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL') # WAL: leituras não bloqueiam a escrita
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL') # NORMAL é seguro com WAL (fsync só no checkpoint)
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)) # Milissegundos esperando o lock de escrita
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)) # Bytes do arquivo lidos via mmap
+    ASGI_DATABASE_URL = os.environ.get('ASGI_DATABASE_URL') # Banco do modo ASGI (app/asgi.py); vazio = DATABASE_URL com driver assíncrono (aiosqlite/asyncpg)
+    ASGI_WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 8)) # Threads do modo ASGI para as rotas que continuam síncronas (Flask)
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or os.path.join(basedir, 'uploads') # Pasta para guardar uploads
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024 # Limite de 16MB para uploads
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf'} # Extensões permitidas para documentos
 
+    # Armazenamento dos documentos (app/storage.py), endereçado pelo SHA-256 do conteúdo
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local') # 'local' (UPLOAD_FOLDER) ou 's3'
+    S3_BUCKET = os.environ.get('S3_BUCKET') # Bucket dos documentos (STORAGE_BACKEND=s3)
+    S3_PREFIX = os.environ.get('S3_PREFIX', '') # Prefixo das chaves dentro do bucket
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL') # Endpoint S3 compatível (MinIO, moto); vazio = AWS
+    S3_REGION = os.environ.get('S3_REGION') # Região do bucket
+    S3_MULTIPART_PART_SIZE = int(os.environ.get('S3_MULTIPART_PART_SIZE', 8 * 1024 * 1024)) # Bytes por parte (mín. 5MB); arquivos menores vão num único PUT
+
+    # Pré-processamento dos documentos (app/documents.py): derivados para validação e miniaturas
+    DOCUMENT_PREPROCESS_WORKERS = int(os.environ.get('DOCUMENT_PREPROCESS_WORKERS', 0)) # Processos no pool (0 = nº de CPUs)
+    DOCUMENT_PREPROCESS_TIMEOUT = float(os.environ.get('DOCUMENT_PREPROCESS_TIMEOUT', 60)) # Segundos por documento
+    DOCUMENT_NORMALIZED_MAX_SIDE = int(os.environ.get('DOCUMENT_NORMALIZED_MAX_SIDE', 1600)) # Lado máximo (px) da imagem usada na validação
+    DOCUMENT_THUMBNAIL_MAX_SIDE = int(os.environ.get('DOCUMENT_THUMBNAIL_MAX_SIDE', 256)) # Lado máximo (px) da miniatura
+
+    # Validação offline dos documentos (app/document_validator.py)
+    DOCUMENT_VALIDATOR = os.environ.get('DOCUMENT_VALIDATOR', 'auto') # 'ocr_cpf', 'placeholder' ou 'auto' (OCR; placeholder só com DEBUG se não houver tesseract)
+    OCR_LANG = os.environ.get('OCR_LANG', 'por') # Idioma(s) do tesseract, ex: 'por+eng'
+    TESSERACT_CMD = os.environ.get('TESSERACT_CMD') # Caminho do binário, se não estiver no PATH
+    OCR_TESSERACT_CONFIG = os.environ.get('OCR_TESSERACT_CONFIG', '') # Parâmetros extras, ex: '--psm 6'
+
+    # Validação de links eSports (executada em paralelo por requisição)
+    ESPORTS_VALIDATION_MAX_WORKERS = int(os.environ.get('ESPORTS_VALIDATION_MAX_WORKERS', 8)) # Threads por processo
+    ESPORTS_VALIDATION_DEADLINE = float(os.environ.get('ESPORTS_VALIDATION_DEADLINE', 15)) # Prazo total (segundos) por requisição
+    # Listas de keywords separadas por vírgula (vazias = padrões de app/keywords.py)
+    ESPORTS_URL_KEYWORDS = [k.strip() for k in os.environ.get('ESPORTS_URL_KEYWORDS', '').split(',') if k.strip()]
+    ESPORTS_CONTENT_KEYWORDS = [k.strip() for k in os.environ.get('ESPORTS_CONTENT_KEYWORDS', '').split(',') if k.strip()]
+    ESPORTS_MIN_CONTENT_KEYWORDS = int(os.environ.get('ESPORTS_MIN_CONTENT_KEYWORDS', 2)) # Mínimo de keywords no title/meta
+
+    # Cliente HTTP compartilhado para scraping (keep-alive e pool por host)
+    HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05)) # Segundos para abrir conexão
+    HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 10)) # Segundos aguardando resposta
+    HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', 10)) # Hosts distintos mantidos no pool
+    HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 4)) # Conexões simultâneas por host
+    HTTP_MAX_RETRIES = int(os.environ.get('HTTP_MAX_RETRIES', 2)) # Tentativas extras em 5xx e erros de conexão (429 vai para o circuit breaker)
+    HTTP_BACKOFF_FACTOR = float(os.environ.get('HTTP_BACKOFF_FACTOR', 0.5)) # Backoff exponencial entre tentativas
+
+    # Agendador das requisições externas por host (app/outbound.py): token bucket, limite de concorrência e circuit breaker
+    OUTBOUND_SCHEDULER_ENABLED = os.environ.get('OUTBOUND_SCHEDULER_ENABLED', 'true').lower() == 'true'
+    OUTBOUND_STATE_STORE = os.environ.get('OUTBOUND_STATE_STORE', 'db') # 'db' (tabela outbound_host, compartilhada entre workers) ou 'memory' (por processo)
+    OUTBOUND_RATE_PER_SECOND = float(os.environ.get('OUTBOUND_RATE_PER_SECOND', 2)) # Requisições/s por host (todos os workers)
+    OUTBOUND_BURST = float(os.environ.get('OUTBOUND_BURST', 5)) # Rajada máxima por host
+    OUTBOUND_HOST_RATES = os.environ.get('OUTBOUND_HOST_RATES', '') # Por domínio: "hltv.org=0.5:2,faceit.com=3" (taxa[:rajada])
+    OUTBOUND_HOST_CONCURRENCY = int(os.environ.get('OUTBOUND_HOST_CONCURRENCY', HTTP_POOL_MAXSIZE)) # Requisições simultâneas por host em cada processo
+    OUTBOUND_MAX_WAIT = float(os.environ.get('OUTBOUND_MAX_WAIT', 2)) # Segundos esperando vaga/token antes de adiar a requisição
+    OUTBOUND_FAILURE_THRESHOLD = int(os.environ.get('OUTBOUND_FAILURE_THRESHOLD', 5)) # Falhas seguidas (timeout, conexão, 429, 5xx) que abrem o circuito
+    OUTBOUND_OPEN_SECONDS = float(os.environ.get('OUTBOUND_OPEN_SECONDS', 30)) # Segundos com o circuito aberto antes da requisição de teste
+    OUTBOUND_MAX_OPEN_SECONDS = float(os.environ.get('OUTBOUND_MAX_OPEN_SECONDS', 600)) # Limite para o Retry-After recebido
+
+    # Cache de vereditos de links eSports (LRU em memória + tabela link_validation_cache)
+    LINK_CACHE_MAX_ENTRIES = int(os.environ.get('LINK_CACHE_MAX_ENTRIES', 2048)) # Entradas no LRU por processo
+    LINK_CACHE_POSITIVE_TTL = int(os.environ.get('LINK_CACHE_POSITIVE_TTL', 7 * 24 * 3600)) # Segundos para links relevantes
+    LINK_CACHE_NEGATIVE_TTL = int(os.environ.get('LINK_CACHE_NEGATIVE_TTL', 3600)) # Segundos para links não relevantes
+    LINK_CACHE_DB_ENABLED = os.environ.get('LINK_CACHE_DB_ENABLED', 'true').lower() == 'true' # Nível compartilhado no banco
+
+    # Cache de leitura de GET /profile/<cpf> (LRU em memória + Redis opcional, ver app/profile_cache.py)
+    PROFILE_CACHE_ENABLED = os.environ.get('PROFILE_CACHE_ENABLED', 'true').lower() == 'true'
+    PROFILE_CACHE_MAX_ENTRIES = int(os.environ.get('PROFILE_CACHE_MAX_ENTRIES', 4096)) # Perfis no LRU por processo
+    PROFILE_CACHE_TTL = float(os.environ.get('PROFILE_CACHE_TTL', 5)) # Segundos no LRU (limita a defasagem entre workers)
+    PROFILE_CACHE_REDIS_URL = os.environ.get('PROFILE_CACHE_REDIS_URL') # Ex: redis://localhost:6379/0 (vazio = só memória)
+    PROFILE_CACHE_REDIS_TTL = int(os.environ.get('PROFILE_CACHE_REDIS_TTL', 300)) # Segundos no Redis
+
+    # Leitura parcial das páginas na validação (só o <head> é necessário)
+    HTML_HEAD_MAX_BYTES = int(os.environ.get('HTML_HEAD_MAX_BYTES', 256 * 1024)) # Limite de bytes lidos por página
+    HTML_HEAD_CHUNK_SIZE = int(os.environ.get('HTML_HEAD_CHUNK_SIZE', 8192)) # Tamanho de cada chunk lido
+    HTML_HEAD_DRAIN_MAX_BYTES = int(os.environ.get('HTML_HEAD_DRAIN_MAX_BYTES', 64 * 1024)) # Páginas até esse tamanho são lidas até o fim para reaproveitar a conexão
+
+    # Fila de validações em background (app/jobs.py)
+    JOBS_EAGER = os.environ.get('JOBS_EAGER', 'false').lower() == 'true' # Executa o job na própria requisição (dev local sem worker)
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3)) # Tentativas antes de marcar como 'failed'
+    JOB_RETRY_BACKOFF = int(os.environ.get('JOB_RETRY_BACKOFF', 30)) # Segundos antes da 2ª tentativa (dobra a cada falha)
+    JOB_LOCK_TIMEOUT = int(os.environ.get('JOB_LOCK_TIMEOUT', 300)) # Segundos até um job 'running' ser considerado abandonado
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2)) # Segundos entre consultas com a fila vazia
+    JOB_BATCH_SIZE = int(os.environ.get('JOB_BATCH_SIZE', 4)) # Jobs pegos por consulta
+    JOB_MAX_DEFER_SECONDS = int(os.environ.get('JOB_MAX_DEFER_SECONDS', 6 * 3600)) # Até quando adiamentos (host externo indisponível) não contam como tentativa
+
+    # Importação/exportação em massa de perfis
+    BULK_IMPORT_BATCH_SIZE = int(os.environ.get('BULK_IMPORT_BATCH_SIZE', 1000)) # Linhas por transação
+    BULK_IMPORT_MAX_BYTES = int(os.environ.get('BULK_IMPORT_MAX_BYTES', 512 * 1024 * 1024)) # Tamanho máximo do corpo da importação
+    BULK_EXPORT_BATCH_SIZE = int(os.environ.get('BULK_EXPORT_BATCH_SIZE', 1000)) # Linhas lidas por vez do cursor
+
+    # Serialização das respostas (app/serialization.py)
+    JSON_ORJSON_ENABLED = os.environ.get('JSON_ORJSON_ENABLED', 'true').lower() == 'true' # Usa orjson, se instalado
+
+    # Listagem paginada de perfis (GET /profiles)
+    PROFILE_LIST_DEFAULT_LIMIT = int(os.environ.get('PROFILE_LIST_DEFAULT_LIMIT', 50))
+    PROFILE_LIST_MAX_LIMIT = int(os.environ.get('PROFILE_LIST_MAX_LIMIT', 500))
+    PROFILE_WRITE_ATTEMPTS = int(os.environ.get('PROFILE_WRITE_ATTEMPTS', 3)) # Tentativas de gravar links/documento quando outra requisição altera o perfil no meio (409 depois disso)
+
+    # Score de engajamento dos fãs (app/scoring.py, flask scores refresh)
+    SCORING_BATCH_SIZE = int(os.environ.get('SCORING_BATCH_SIZE', 2000)) # Perfis por lote vetorizado (e por transação)
+    SCORING_WATERMARK_SLACK = int(os.environ.get('SCORING_WATERMARK_SLACK', 300)) # Segundos revisitados antes do último updated_at calculado
+    SCORING_WEIGHTS = os.environ.get('SCORING_WEIGHTS', '') # Pesos por feature, ex: "event_count=3,purchase_count=4" (vazio = padrões)
+
+    # Rollups de analytics (app/analytics.py, flask analytics compact)
+    ANALYTICS_MAX_DAYS = int(os.environ.get('ANALYTICS_MAX_DAYS', 366)) # Maior janela aceita pelas rotas /analytics
+    ANALYTICS_WATERMARK_SLACK = int(os.environ.get('ANALYTICS_WATERMARK_SLACK', 300)) # Segundos revisitados antes da última compactação
+
+    # Detecção de cadastros duplicados (app/dedup.py, flask dedup sweep)
+    DEDUP_DHASH_MAX_DISTANCE = int(os.environ.get('DEDUP_DHASH_MAX_DISTANCE', 3)) # Bits diferentes entre dHashes de documentos "iguais" (até 3 é garantido pelo índice de bandas)
+    DEDUP_SWEEP_BATCH_SIZE = int(os.environ.get('DEDUP_SWEEP_BATCH_SIZE', 1000)) # Perfis por lote (e por transação) da varredura
+
+    # Boot dos workers (flask boot report)
+    BOOT_LAZY_MODULES = os.environ.get('BOOT_LAZY_MODULES', 'alembic,numpy,requests,PIL,pypdfium2,pytesseract,redis') # Não podem ser importados no boot
+
+    # Observabilidade (app/metrics.py e app/tracing.py)
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true' # Instrumentação e rota /metrics
+    # Com vários workers, a variável de ambiente PROMETHEUS_MULTIPROC_DIR (lida pelo prometheus_client, gunicorn.conf.py define uma) faz /metrics somar todos
+    TRACING_OTLP_ENDPOINT = os.environ.get('TRACING_OTLP_ENDPOINT') # Coletor OTLP/HTTP (ex: http://localhost:4318); vazio = sem spans
+    TRACING_SERVICE_NAME = os.environ.get('TRACING_SERVICE_NAME', 'know-your-fan-api')
+    TRACING_SAMPLE_RATIO = float(os.environ.get('TRACING_SAMPLE_RATIO', 1.0)) # Fração das requisições rastreadas
+
     # Configurações para APIs de AI (adicione quando necessário)
     # GOOGLE_APPLICATION_CREDENTIALS = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
     # AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID')
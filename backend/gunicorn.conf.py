@@ -0,0 +1,58 @@
+# backend/gunicorn.conf.py
+import multiprocessing
+import os
+import tempfile
+
+# gunicorn -c gunicorn.conf.py (na pasta backend)
+# SERVER_MODE=wsgi (padrão): app Flask (run:app) em workers gthread
+# SERVER_MODE=asgi: app ASGI (asgi:app) em workers uvicorn; upload e validação de links
+#   rodam no event loop, sem ocupar uma thread por requisição (ver app/asgi.py)
+server_mode = os.environ.get('SERVER_MODE', 'wsgi').lower()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 4)))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+accesslog = '-'
+# GUNICORN_PRELOAD=true: o app é carregado uma vez no master e os workers o herdam no fork (copy-on-write).
+# create_app não abre conexões; post_fork descarta engine, sessão HTTP e pools herdados (app.reset_after_fork).
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'false').lower() == 'true'
+
+# Modo multiprocesso do prometheus_client: cada worker grava suas métricas nesta pasta e /metrics
+# soma todas (app/metrics.py). Precisa estar no ambiente antes de o app ser importado.
+if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='kyf-metrics-')
+
+if server_mode == 'asgi':
+    wsgi_app = 'asgi:app'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'run:app'
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+def on_starting(server):
+    # Arquivos de uma execução anterior (pids que não existem mais)
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for entry in os.listdir(directory):
+        if entry.endswith('.db'):
+            os.remove(os.path.join(directory, entry))
+
+def when_ready(server):
+    if preload_app:
+        # Objetos do boot vão para a geração permanente do GC: as coletas nos workers não
+        # tocam neles, e as páginas compartilhadas com o master não são copiadas
+        import gc
+        gc.freeze()
+
+def post_fork(server, worker):
+    if preload_app:
+        from app import reset_after_fork
+        app = server.app.wsgi()
+        reset_after_fork(getattr(app, 'flask_app', app)) # No modo ASGI, o app Flask embutido
+
+def child_exit(server, worker):
+    # Contadores do worker encerrado continuam somados em /metrics; os gauges dele saem
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
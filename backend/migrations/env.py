@@ -94,6 +94,16 @@ def run_migrations_online():
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
 
+    # Índices só do PostgreSQL (ex: GIN com ddl_if em app/models.py) não existem nos
+    # outros bancos: sem este filtro o autogenerate do SQLite os recriaria sempre
+    def include_object(object, name, type_, reflected, compare_to):
+        if type_ == 'index' and not reflected and context.get_context().dialect.name != 'postgresql':
+            return not object.dialect_options['postgresql'].get('using')
+        return True
+
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
+
     connectable = get_engine()
 
     with connectable.connect() as connection:
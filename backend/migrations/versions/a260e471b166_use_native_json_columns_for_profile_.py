@@ -0,0 +1,70 @@
+"""Use native JSON columns for profile links
+
+Revision ID: a260e471b166
+Revises: f5b12b7cde70
+Create Date: 2026-10-18 11:55:03.051454
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'a260e471b166'
+down_revision = 'f5b12b7cde70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        # Texto JSON existente é convertido direto para JSONB
+        for column in ('social_media_links', 'esports_profile_links'):
+            op.alter_column('fan_profile', column,
+                            existing_type=sa.Text(),
+                            type_=postgresql.JSONB(astext_type=sa.Text()),
+                            postgresql_using=f'{column}::jsonb',
+                            existing_nullable=True)
+        op.add_column('fan_profile', sa.Column('esports_link_validations', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+        op.create_index('ix_fan_profile_esports_profile_links_gin', 'fan_profile', ['esports_profile_links'],
+                        unique=False, postgresql_using='gin', postgresql_ops={'esports_profile_links': 'jsonb_path_ops'})
+        op.create_index('ix_fan_profile_esports_link_validations_gin', 'fan_profile', ['esports_link_validations'],
+                        unique=False, postgresql_using='gin', postgresql_ops={'esports_link_validations': 'jsonb_path_ops'})
+    else:
+        # SQLite guarda JSON como texto; o conteúdo atual (json.dumps) já é compatível
+        with op.batch_alter_table('fan_profile', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('esports_link_validations', sa.JSON(), nullable=True))
+            batch_op.alter_column('social_media_links',
+                   existing_type=sa.TEXT(),
+                   type_=sa.JSON(),
+                   existing_nullable=True)
+            batch_op.alter_column('esports_profile_links',
+                   existing_type=sa.TEXT(),
+                   type_=sa.JSON(),
+                   existing_nullable=True)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.drop_index('ix_fan_profile_esports_link_validations_gin', table_name='fan_profile')
+        op.drop_index('ix_fan_profile_esports_profile_links_gin', table_name='fan_profile')
+        op.drop_column('fan_profile', 'esports_link_validations')
+        for column in ('social_media_links', 'esports_profile_links'):
+            op.alter_column('fan_profile', column,
+                            existing_type=postgresql.JSONB(astext_type=sa.Text()),
+                            type_=sa.Text(),
+                            postgresql_using=f'{column}::text',
+                            existing_nullable=True)
+    else:
+        with op.batch_alter_table('fan_profile', schema=None) as batch_op:
+            batch_op.alter_column('esports_profile_links',
+                   existing_type=sa.JSON(),
+                   type_=sa.TEXT(),
+                   existing_nullable=True)
+            batch_op.alter_column('social_media_links',
+                   existing_type=sa.JSON(),
+                   type_=sa.TEXT(),
+                   existing_nullable=True)
+            batch_op.drop_column('esports_link_validations')
@@ -0,0 +1,137 @@
+"""Add normalized tag tables
+
+Revision ID: f5b12b7cde70
+Revises: 7ea84cc46163
+Create Date: 2026-10-18 11:53:58.254551
+
+"""
+import re
+import unicodedata
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5b12b7cde70'
+down_revision = '7ea84cc46163'
+branch_labels = None
+depends_on = None
+
+# Cópia da normalização de app/tags.py nesta revisão: a migração não importa o app, então
+# mudanças posteriores nos aliases não alteram o que ela grava (use `flask tags rebuild`)
+TAG_FIELDS = {
+    'interests': 'interest',
+    'activities_last_year': 'activity',
+    'events_last_year': 'event',
+    'purchases_last_year': 'purchase',
+}
+_ALIASES = {
+    'counter-strike': ('csgo', 'cs', 'cs2', 'counterstrike', 'counterstrike2', 'counterstrikego',
+                       'counterstrikeglobaloffensive', 'globaloffensive'),
+    'league of legends': ('lol', 'leagueoflegends', 'league'),
+    'valorant': ('valorant', 'valo', 'vava'),
+    'rainbow six siege': ('r6', 'r6s', 'rainbowsix', 'rainbowsixsiege', 'rainbow6'),
+    'dota 2': ('dota', 'dota2'),
+    'free fire': ('freefire', 'ff'),
+    'fortnite': ('fortnite',),
+    'rocket league': ('rocketleague', 'rl'),
+    'apex legends': ('apex', 'apexlegends'),
+    'pubg': ('pubg', 'pubgmobile', 'playerunknownsbattlegrounds'),
+    'kings league': ('kingsleague', 'kingsleaguebrazil'),
+    'iem cologne': ('iemcologne', 'iemcolonia', 'intelextrememasterscologne'),
+    'iem rio': ('iemrio', 'iemriomajor'),
+    'cs major': ('major', 'csmajor', 'csgomajor', 'cs2major'),
+    'cblol': ('cblol', 'campeonatobrasileirodelol', 'campeonatobrasileirodeleagueoflegends'),
+    'brasil game show': ('bgs', 'brasilgameshow', 'brazilgameshow'),
+    'gamers club': ('gc', 'gamersclub'),
+    'faceit': ('faceit',),
+    'furia': ('furia', 'furiaesports', 'furiagg'),
+}
+_ALIAS_LOOKUP = {alias: canonical for canonical, aliases in _ALIASES.items() for alias in aliases}
+_SPLIT_RE = re.compile(r'[,;\n]+')
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+
+fan_profile = sa.table('fan_profile', sa.column('id', sa.Integer), *(sa.column(field, sa.Text) for field in TAG_FIELDS))
+tag = sa.table('tag', sa.column('id', sa.Integer), sa.column('kind', sa.String), sa.column('name', sa.String))
+fan_profile_tag = sa.table('fan_profile_tag', sa.column('profile_id', sa.Integer), sa.column('tag_id', sa.Integer))
+
+
+def _canonicalize(term):
+    base = ''.join(c for c in unicodedata.normalize('NFKD', term) if not unicodedata.combining(c)).lower()
+    compact = _NON_WORD_RE.sub('', base)
+    if not compact:
+        return None
+    if compact in _ALIAS_LOOKUP:
+        return _ALIAS_LOOKUP[compact]
+    return ' '.join(_NON_WORD_RE.sub(' ', base).split())[:100]
+
+
+def _tag_keys(row):
+    keys = set()
+    for field, kind in TAG_FIELDS.items():
+        for term in _SPLIT_RE.split(row[field] or ''):
+            name = _canonicalize(term.strip()) if term.strip() else None
+            if name:
+                keys.add((kind, name))
+    return keys
+
+
+def _backfill_tags(conn, batch_size=1000):
+    # Tabelas recém-criadas: as tags novas de cada lote são inseridas e os ids ficam em memória
+    tag_ids = {}
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(fan_profile).where(fan_profile.c.id > last_id).order_by(fan_profile.c.id).limit(batch_size)
+        ).mappings().all()
+        if not rows:
+            break
+        desired = {row['id']: _tag_keys(row) for row in rows}
+        new_keys = sorted(set().union(*desired.values()) - tag_ids.keys())
+        if new_keys:
+            conn.execute(tag.insert(), [{'kind': kind, 'name': name} for kind, name in new_keys])
+            for start in range(0, len(new_keys), 500):
+                chunk = new_keys[start:start + 500]
+                found = conn.execute(
+                    sa.select(tag.c.id, tag.c.kind, tag.c.name).where(sa.tuple_(tag.c.kind, tag.c.name).in_(chunk))
+                )
+                tag_ids.update({(row.kind, row.name): row.id for row in found})
+        pairs = [{'profile_id': profile_id, 'tag_id': tag_ids[key]} for profile_id, keys in desired.items() for key in keys]
+        if pairs:
+            conn.execute(fan_profile_tag.insert(), pairs)
+        last_id = rows[-1]['id']
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('tag',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'name', name='uq_tag_kind_name')
+    )
+    op.create_table('fan_profile_tag',
+    sa.Column('profile_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['profile_id'], ['fan_profile.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['tag_id'], ['tag.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('profile_id', 'tag_id')
+    )
+    with op.batch_alter_table('fan_profile_tag', schema=None) as batch_op:
+        batch_op.create_index('ix_fan_profile_tag_tag_id_profile_id', ['tag_id', 'profile_id'], unique=False)
+
+    # ### end Alembic commands ###
+
+    # Backfill: gera as tags dos perfis existentes em lotes de 1000 (por faixa de id)
+    _backfill_tags(op.get_bind(), batch_size=1000)
+
+
+def downgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('fan_profile_tag', schema=None) as batch_op:
+        batch_op.drop_index('ix_fan_profile_tag_tag_id_profile_id')
+
+    op.drop_table('fan_profile_tag')
+    op.drop_table('tag')
+    # ### end Alembic commands ###
@@ -1,9 +1,7 @@
 # backend/run.py
 from app import create_app, db
-from flask_migrate import Migrate
 
-app = create_app()
-migrate = Migrate(app, db) # Certifique-se que o migrate está configurado aqui também
+app = create_app() # Flask-Migrate é registrado pela fábrica nos comandos `flask db ...`
 
 # Comandos úteis do Flask-Migrate (executar no terminal na pasta backend)
 # flask db init  (apenas na primeira vez)
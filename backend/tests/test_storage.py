@@ -0,0 +1,125 @@
+# backend/tests/test_storage.py
+# Storage de documentos (app/storage.py): backend S3 contra o moto e o
+# streaming de uploads restrito à rota de documentos.
+# Rodar a partir de backend/: python -m pytest tests
+import hashlib
+import io
+import os
+
+import pytest
+
+from app.storage import S3Storage, UploadWriter, content_key
+
+boto3 = pytest.importorskip('boto3')
+moto = pytest.importorskip('moto')
+
+BUCKET = 'kyf-documents'
+PART_SIZE = 5 * 1024 * 1024 # Mínimo do S3 para partes de multipart
+
+@pytest.fixture
+def s3_storage(monkeypatch):
+    # Credenciais falsas: o moto intercepta as chamadas do boto3
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN'):
+        monkeypatch.setenv(name, 'testing')
+    with moto.mock_aws():
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket=BUCKET)
+        yield S3Storage(BUCKET, prefix='kyf', region_name='us-east-1', part_size=PART_SIZE)
+
+def _upload(storage, data, chunk_size=64 * 1024):
+    writer = storage.open_upload(filename='doc.pdf', content_type='application/pdf')
+    for start in range(0, len(data), chunk_size):
+        writer.write(data[start:start + chunk_size])
+    return writer
+
+def _object_keys(storage):
+    response = storage.client.list_objects_v2(Bucket=BUCKET)
+    return sorted(item['Key'] for item in response.get('Contents', []))
+
+def _pending_multipart_uploads(storage):
+    return storage.client.list_multipart_uploads(Bucket=BUCKET).get('Uploads', [])
+
+def test_put_and_open(s3_storage):
+    s3_storage.put('documents/ab/derived.png', b'png-bytes', content_type='image/png')
+
+    assert s3_storage.exists('documents/ab/derived.png')
+    assert not s3_storage.exists('documents/ab/missing.png')
+    assert _object_keys(s3_storage) == ['kyf/documents/ab/derived.png']
+    assert s3_storage.open('documents/ab/derived.png').read() == b'png-bytes'
+    head = s3_storage.client.head_object(Bucket=BUCKET, Key='kyf/documents/ab/derived.png')
+    assert head['ContentType'] == 'image/png'
+
+def test_finalize_small_upload(s3_storage):
+    data = b'%PDF-1.4 small document'
+    writer = _upload(s3_storage, data)
+    key = writer.finalize('PDF')
+
+    sha256 = hashlib.sha256(data).hexdigest()
+    assert key == content_key(sha256, 'pdf')
+    assert (writer.sha256, writer.size, writer.deduplicated) == (sha256, len(data), False)
+    assert s3_storage.open(key).read() == data
+    assert _object_keys(s3_storage) == [f'kyf/{key}']
+    assert not _pending_multipart_uploads(s3_storage)
+
+def test_finalize_multipart_upload(s3_storage):
+    data = os.urandom(PART_SIZE * 2 + 1234)
+    writer = _upload(s3_storage, data, chunk_size=1024 * 1024)
+    assert len(_pending_multipart_uploads(s3_storage)) == 1 # Partes já enviadas antes do fim
+    key = writer.finalize('pdf')
+
+    assert key == content_key(hashlib.sha256(data).hexdigest(), 'pdf')
+    assert s3_storage.open(key).read() == data
+    # A chave temporária do multipart é removida após a cópia
+    assert _object_keys(s3_storage) == [f'kyf/{key}']
+    assert not _pending_multipart_uploads(s3_storage)
+
+def test_finalize_deduplicates_same_content(s3_storage):
+    small, large = b'same document', os.urandom(PART_SIZE + 10)
+    for data in (small, large):
+        first = _upload(s3_storage, data)
+        first.finalize('pdf')
+        second = _upload(s3_storage, data)
+        assert second.finalize('pdf') == first.key
+        assert (first.deduplicated, second.deduplicated) == (False, True)
+
+    assert len(_object_keys(s3_storage)) == 2
+    assert not _pending_multipart_uploads(s3_storage)
+
+def test_abort_discards_upload(s3_storage):
+    small = _upload(s3_storage, b'rejected document')
+    small.abort()
+    assert small.closed
+
+    large = _upload(s3_storage, os.urandom(PART_SIZE + 10))
+    assert len(_pending_multipart_uploads(s3_storage)) == 1
+    large.close() # close() sem finalize descarta, como no fim da requisição
+
+    assert _object_keys(s3_storage) == []
+    assert not _pending_multipart_uploads(s3_storage)
+
+# --- Streaming só na rota de upload ---
+
+@pytest.fixture
+def app(tmp_path):
+    from app import create_app
+    from config import Config
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'test.db')
+        UPLOAD_FOLDER = str(tmp_path / 'uploads')
+        STORAGE_BACKEND = 'local'
+        JOBS_EAGER = True
+
+    return create_app(TestConfig)
+
+def _file_stream(app, path, filename):
+    data = {'document': (io.BytesIO(b'content'), filename)}
+    with app.test_request_context(path, method='POST', data=data, content_type='multipart/form-data'):
+        from flask import request
+        stream = request.files['document'].stream
+        return isinstance(stream, UploadWriter)
+
+def test_streaming_limited_to_upload_route(app):
+    assert _file_stream(app, '/api/profile/12345678909/upload_document', 'doc.pdf')
+    # Extensão não permitida ou outra rota: arquivo temporário padrão do Werkzeug
+    assert not _file_stream(app, '/api/profile/12345678909/upload_document', 'doc.exe')
+    assert not _file_stream(app, '/api/profile/12345678909/link_social', 'doc.pdf')
@@ -8,7 +8,8 @@ import {
   uploadDocument,
   saveSocialLinks,
   saveEsportsLinks,
-  getProfile
+  getProfile,
+  waitForJob
 } from './services/api';
 
 // Importações do Header e Logo
@@ -113,8 +114,11 @@ function App() {
       // 2. Fazer upload do documento se selecionado
       if (documentFile) {
         const uploadResponse = await uploadDocument(formData.cpf, documentFile);
-        successMessage += ` ${uploadResponse.data.message}.`; // Concatena resultado do upload
-        setCurrentProfile(prev => ({...prev, document_path: uploadResponse.data.file_path, document_validated: uploadResponse.data.validated }));
+        // A validação roda em background: aguarda o job terminar (ou o tempo limite)
+        const documentJob = await waitForJob(uploadResponse.data.job.id);
+        const documentValidated = documentJob.status === 'succeeded' && documentJob.result?.validated === true;
+        successMessage += ` ${uploadResponse.data.message}. Validação do documento: ${documentJob.status}.`; // Concatena resultado do upload
+        setCurrentProfile(prev => ({...prev, document_path: uploadResponse.data.document_key, document_validated: documentValidated }));
         setDocumentFile(null); // Limpa o arquivo selecionado
       }
 
@@ -130,9 +134,12 @@ function App() {
       const validEsportsLinks = Object.fromEntries(Object.entries(esportsLinks).filter(([_, v]) => v && v.trim() !== ''));
        if (Object.keys(validEsportsLinks).length > 0) {
            const esportsResponse = await saveEsportsLinks(formData.cpf, validEsportsLinks);
+           // A validação roda em background: aguarda o job terminar (ou o tempo limite)
+           const esportsJob = await waitForJob(esportsResponse.data.job.id);
+           const esportsValidated = esportsJob.status === 'succeeded' && esportsJob.result?.validated === true;
            // Adiciona detalhes da validação à mensagem
-           successMessage += ` ${esportsResponse.data.message}. Detalhes validação: ${JSON.stringify(esportsResponse.data.validation_results)}.`;
-           setCurrentProfile(prev => ({...prev, esports_profile_links: esportsResponse.data.profile.esports_profile_links, esports_links_validated: esportsResponse.data.profile.esports_links_validated }));
+           successMessage += ` ${esportsResponse.data.message}. Detalhes validação: ${JSON.stringify(esportsJob.result?.validation_results ?? esportsJob.status)}.`;
+           setCurrentProfile(prev => ({...prev, esports_profile_links: esportsResponse.data.profile.esports_profile_links, esports_links_validated: esportsValidated }));
        }
 
       // Define a mensagem de sucesso acumulada
@@ -172,9 +179,11 @@ function App() {
                 interests: profile.interests || '', activities_last_year: profile.activities_last_year || '',
                 events_last_year: profile.events_last_year || '', purchases_last_year: profile.purchases_last_year || '',
             });
-             try { setSocialLinks(profile.social_media_links ? JSON.parse(profile.social_media_links) : { twitter: '', instagram: '', twitch: '' }); }
+             // A API retorna os links como objetos JSON (versões antigas retornavam strings)
+             const parseLinks = (links) => typeof links === 'string' ? JSON.parse(links) : links;
+             try { setSocialLinks(profile.social_media_links ? parseLinks(profile.social_media_links) : { twitter: '', instagram: '', twitch: '' }); }
              catch (e) { console.error("Parse social links error", e); setSocialLinks({ twitter: '', instagram: '', twitch: '' });}
-             try { setEsportsLinks(profile.esports_profile_links ? JSON.parse(profile.esports_profile_links) : { hltv: '', faceit: '', gametracker: '' }); }
+             try { setEsportsLinks(profile.esports_profile_links ? parseLinks(profile.esports_profile_links) : { hltv: '', faceit: '', gametracker: '' }); }
              catch (e) { console.error("Parse esports links error", e); setEsportsLinks({ hltv: '', faceit: '', gametracker: '' }); }
              setMessage("Perfil carregado. Você pode editar os dados.");
         } catch (err) {
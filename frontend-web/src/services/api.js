@@ -86,5 +86,30 @@ export const getProfile = (cpf) => {
   return apiClient.get(url);
 }
 
+/**
+ * Obtém o status de um job de validação em background.
+ * @param {string} jobId - ID retornado pelas rotas de upload/links (status 202).
+ * @returns {Promise<object>} - Resposta da API com status, progress e result do job.
+ */
+export const getJob = (jobId) => {
+  return apiClient.get(`/jobs/${jobId}`);
+};
+
+/**
+ * Consulta o job periodicamente até ele terminar (succeeded/failed) ou estourar o tempo limite.
+ * @param {string} jobId - ID do job.
+ * @param {object} options - { intervalMs, timeoutMs }
+ * @returns {Promise<object>} - Último estado conhecido do job.
+ */
+export const waitForJob = async (jobId, { intervalMs = 1000, timeoutMs = 30000 } = {}) => {
+  const deadline = Date.now() + timeoutMs;
+  let job = (await getJob(jobId)).data;
+  while (!['succeeded', 'failed'].includes(job.status) && Date.now() < deadline) {
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+    job = (await getJob(jobId)).data;
+  }
+  return job;
+};
+
 // Exporta a instância configurada do Axios
 export default apiClient;
\ No newline at end of file